@@ -0,0 +1,117 @@
+"""Parse amaun wang ('RM 1,234.50', '-12.3', '12.50-', '(12.50)', 'MYR 10', 45.1) kepada sen int64 yang tepat.
+
+Satu regex dijalankan sekali bagi setiap nilai unik (amaun dalam fail transaksi
+banyak berulang) dan hasilnya dipetakan semula ke setiap baris. Tiada perantaraan
+float: pembundaran ke 2 tempat perpuluhan ikut NUMERIC PostgreSQL (separuh
+menjauhi sifar), jadi nilai dalam DataFrame sama tepat dengan nilai dalam DB.
+"""
+import logging
+import re
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Kurungan (negatif perakaunan), tanda depan, kod/simbol mata wang (RM, MYR, USD, $; depan atau
+# belakang), digit dengan koma ribuan, pecahan, tanda tolak di belakang ('12.50-')
+AMOUNT_PATTERN = re.compile(
+    r'^\s*(?P<open>\()?\s*(?P<sign>[-+])?\s*(?P<cur>[a-z]{2,3}|[$])?\s*(?P<sign2>-)?\s*'
+    r'(?P<whole>[\d,]*)(?:\.(?P<frac>\d*))?\s*(?P<cur2>[a-z]{2,3})?\s*(?P<trail>-)?\s*(?P<close>\))?\s*$',
+    re.IGNORECASE
+)
+MAX_WHOLE_DIGITS = 15
+
+
+def parse_cents(values):
+    """Pulangkan (cents int64, bad bool) sejajar dengan `values`.
+
+    bad=True untuk nilai kosong/NULL atau yang tak boleh dibaca sebagai amaun;
+    cents bagi baris tersebut ialah 0.
+    """
+    codes, uniques = pd.factorize(pd.Series(values))
+    parsed = [_parse_one(value) for value in uniques]
+
+    # Kod -1 (NULL) menunjuk ke entri terakhir (0, bad)
+    unique_cents = np.array([cents or 0 for cents in parsed] + [0], dtype=np.int64)
+    unique_bad = np.array([cents is None for cents in parsed] + [True], dtype=bool)
+    return unique_cents[codes], unique_bad[codes]
+
+
+def cents_to_decimal(cents, bad=None):
+    """Sen -> array object Decimal 2 t.p. (None jika bad); Decimal dibina sekali per nilai unik.
+
+    Decimal dihantar tepat oleh COPY (to_csv) dan psycopg2 ke kolum DECIMAL.
+    """
+    codes, uniques = pd.factorize(np.asarray(cents, dtype=np.int64))
+    decimals = np.empty(len(uniques) + 1, dtype=object)
+    decimals[:-1] = [Decimal(int(value)).scaleb(-2) for value in uniques]
+    decimals[-1] = None
+    result = decimals[codes]
+    if bad is not None:
+        result[np.asarray(bad, dtype=bool)] = None
+    return result
+
+
+def parse_amount_cents(values, fill_bad=None):
+    """Series amaun mentah -> Series sen dengan index asal.
+
+    fill_bad: nilai (RM) untuk baris rosak/kosong, hasilnya int64; None = NA
+    (Int64 nullable, NULL dalam DB). Bilangan nilai yang ada tetapi tak boleh
+    dibaca dilog sebagai amaran; NULL dan string kosong/ruang sahaja dikira
+    tiada nilai, bukan tidak sah.
+    """
+    series = pd.Series(values)
+    cents, bad = parse_cents(series)
+
+    invalid = 0
+    if bad.any():
+        present = series[bad]
+        invalid = int((present.notna() & (present.astype(str).str.strip() != '')).sum())
+    if invalid:
+        logger.warning(f"{invalid} nilai amaun tidak sah dalam '{series.name}'")
+
+    if fill_bad is not None:
+        cents = np.where(bad, _parse_one(fill_bad), cents)
+        return pd.Series(cents, index=series.index, name=series.name)
+    return pd.Series(pd.arrays.IntegerArray(cents, bad), index=series.index, name=series.name)
+
+
+def _parse_one(value):
+    """Satu nilai -> sen (int) atau None."""
+    text = _as_text(value)
+    if text is None:
+        return None
+    match = AMOUNT_PATTERN.match(text)
+    if match is None or bool(match.group('open')) != bool(match.group('close')):
+        return None
+    signs = [match.group(name) for name in ('sign', 'sign2', 'trail') if match.group(name)]
+    # Paling banyak satu penanda tanda, dan satu kod mata wang
+    if len(signs) + bool(match.group('open')) > 1 or (match.group('cur') and match.group('cur2')):
+        return None
+
+    whole = match.group('whole').replace(',', '')
+    frac = match.group('frac') or ''
+    if not whole and not frac or len(whole) > MAX_WHOLE_DIGITS:
+        return None
+
+    cents = int(whole or 0) * 100 + int((frac + '00')[:2])
+    if len(frac) > 2 and frac[2] >= '5':
+        cents += 1
+    return -cents if match.group('open') or '-' in signs else cents
+
+
+def _as_text(value):
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, np.integer)):
+        return str(int(value))
+    if isinstance(value, (float, np.floating)):
+        # repr memberi perpuluhan terpendek yang mewakili float itu ('12.345', bukan 12.3449999...)
+        return None if np.isnan(value) else format(Decimal(repr(float(value))), 'f')
+    if isinstance(value, Decimal):
+        return None if not value.is_finite() else format(value, 'f')
+    return None if pd.isna(value) else str(value)
@@ -1,4 +1,4 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, Response
 import os
 from datetime import datetime, timedelta
 from werkzeug.utils import secure_filename
@@ -9,10 +9,15 @@ import uuid
 import re
 import glob
 from sqlalchemy import text, insert
+from psycopg2.extras import execute_values
 import logging
 
 # Import extensions
 from extensions import db, bcrypt
+from bulk_load import copy_upsert
+from partitioning import init_partitioned_tables, ensure_partitions
+from recon_summary import refresh_summary_for_dates, load_summary, backfill_summary
+from upload_reader import spool_upload, locate_header, find_header_row, iter_frames, fit_width
 
 app = Flask(__name__)
 
@@ -23,6 +28,14 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024
 app.config['ALLOWED_EXTENSIONS'] = {'csv', 'xlsx', 'xls'}
+app.config['UPLOAD_CHUNK_ROWS'] = 50000
+app.config['UPLOAD_ASYNC'] = True
+app.config['UPLOAD_WORKERS'] = 2
+app.config['EXPORT_CHUNK_ROWS'] = 50000
+app.config['SEARCH_TRIGRAM'] = True  # dikemas kini oleh upgrade_schema ikut ketersediaan pg_trgm
+app.config['RESPONSE_CACHE_TTL'] = 30
+app.config['RESPONSE_CACHE_SIZE'] = 1024
+app.config['RESPONSE_CACHE_REDIS_URL'] = os.environ.get('RESPONSE_CACHE_REDIS_URL')
 
 # Initialize extensions with app
 db.init_app(app)
@@ -36,20 +49,70 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Import models SETELAH db di-initialize
-from models import User, TransaksiEod, TransaksiEmerchant, UploadHistory, ReconciliationMatch
+from models import User, TransaksiEod, TransaksiEmerchant, UploadHistory
+from jobs import UploadJobQueue, job_status
+from recon_engine import ReconEngine
+from response_cache import ResponseCache
+from keyset import KeysetPage
+from search import setup_search_indexes, contains_filter, search_mode
+from date_parsing import parse_dates, EOD_DATE_FORMATS, EMERCHANT_DATE_FORMATS
+from amount_parsing import parse_amount_cents
+from frame_dtypes import compact_frame, with_decimal_amounts
+from recon_export import (EXPORT_FORMATS, RECON_EXPORT_SQL, RECON_EXPORT_COLUMNS, BATCH_REPORT_SQL,
+                          BATCH_REPORT_COLUMNS, check_format, iter_query_frames, export_stream,
+                          export_filename)
+
+# Worker pool untuk upload di background
+upload_jobs = UploadJobQueue(app)
+
+# Cache respons dashboard/stats yang di-poll oleh setiap tab
+response_cache = ResponseCache(app)
 
 
 
 # ==================== PROCESSOR CLASSES ====================
 
+# Kolum yang ditulis ke transaksi_eod (ikut susunan INSERT)
+EOD_COLUMNS = [
+    'terminal_name', 'tid', 'till_summary_no', 'till_closure_no',
+    'date_of_transaction', 'card_type', 'card_number', 'receipt',
+    'ref_number', 'stan_no', 'acquirer_mid', 'acquirer_tid',
+    'approval_code', 'amount_rm', 'uploaded_by', 'batch_id', 'file_name'
+]
+
+# Kolum yang ditulis ke transaksi_emerchant
+EMERCHANT_COLUMNS = [
+    'merchant_code', 'store_id', 'transaction_date', 'order_id',
+    'payment_method', 'amount', 'fee', 'net_amount', 'customer_email',
+    'status', 'settlement_date', 'uploaded_by', 'batch_id',
+    'file_name', 'reconciliation_status'
+]
+
+# Saiz batch default untuk multi-row INSERT e-merchant
+EMERCHANT_BATCH_SIZE = 1000
+
+# Bilangan baris setiap chunk bila upload dibaca secara streaming
+UPLOAD_CHUNK_ROWS = 50000
+
+# Header EOD dicari dalam baris-baris awal sahaja
+HEADER_SEARCH_ROWS = 50
+
 class EODProcessor:
-    def __init__(self, db_engine, folder_path=None, file_content=None, filename=None, user_id=None):
+    def __init__(self, db_engine, folder_path=None, file_content=None, filename=None, user_id=None, bulk_load=True,
+                 chunk_size=UPLOAD_CHUNK_ROWS, progress_callback=None, compact=True):
         self.engine = db_engine
         self.folder_path = folder_path
         self.file_content = file_content
         self.filename = filename
         self.user_id = user_id
+        self.bulk_load = bulk_load
+        # Frame hasil cleaning guna dtype padat (frame_dtypes.compact_frame)
+        self.compact = compact
+        self.chunk_size = chunk_size
+        self.progress_callback = progress_callback
         self.batch_id = f"EOD_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        # Hari transaksi yang menerima rekod baru (untuk recon_summary)
+        self.touched_days = set()
         
     def _insert_on_conflict_nothing(self, table, conn, keys, data_iter):
         """Internal helper: Handle Upsert logic."""
@@ -67,22 +130,33 @@ class EODProcessor:
         try:
             print(f"🚀 [EOD] Processing file: {self.filename}")
             
-            # Determine file type and read
+            if not self.filename.endswith(('.csv', '.xlsx', '.xls')):
+                return {'success': False, 'error': 'Unsupported file format'}
+            
+            # Cari header dari baris awal sahaja, kemudian baca data bermula selepas header
+            header_idx, header_values = locate_header(
+                self.file_content, 'terminal name', occurrence=2,
+                max_rows=HEADER_SEARCH_ROWS, filename=self.filename
+            )
+            if header_idx is None:
+                logger.warning("Header tidak lengkap")
+                return {'success': False, 'error': 'No valid data found in file'}
+            
             if self.filename.endswith('.csv'):
-                df = pd.read_csv(io.StringIO(self.file_content.decode('utf-8')), header=None)
-            elif self.filename.endswith(('.xlsx', '.xls')):
-                df = pd.read_excel(io.BytesIO(self.file_content), header=None)
+                df = pd.read_csv(io.BytesIO(self.file_content), header=None, skiprows=header_idx + 1,
+                                 names=list(range(len(header_values))), index_col=False, dtype=str)
             else:
-                return {'success': False, 'error': 'Unsupported file format'}
+                df = pd.read_excel(io.BytesIO(self.file_content), header=None, skiprows=header_idx + 1)
             
             # Clean and process the data
-            processed_df = self._clean_eod_data(df)
+            processed_df = self._clean_eod_rows(self._apply_header(df, header_values))
             
             if processed_df.empty:
                 return {'success': False, 'error': 'No valid data found in file'}
             
             # Save to database
-            records_saved = self._save_to_database(processed_df)
+            save_stats = self._save_to_database(processed_df)
+            records_saved = save_stats['inserted']
             
             # Save upload history
             self._save_upload_history(records_saved)
@@ -91,40 +165,104 @@ class EODProcessor:
                 'success': True,
                 'records_processed': len(processed_df),
                 'records_saved': records_saved,
+                'skipped_records': save_stats['duplicates'],
+                'failed_records': save_stats['failed'],
                 'batch_id': self.batch_id,
                 'filename': self.filename,
-                'total_amount': float(processed_df['amount_rm'].sum()) if 'amount_rm' in processed_df.columns else 0
+                'total_amount': int(processed_df['amount_rm_cents'].sum()) / 100 if 'amount_rm_cents' in processed_df.columns else 0
             }
             
         except Exception as e:
             logger.error(f"Error processing EOD file: {e}")
             return {'success': False, 'error': str(e)}
     
-    def _clean_eod_data(self, df):
-        """Clean and process EOD data."""
+    def process_from_file_path(self, file_path):
+        """Streaming mode: baca fail dari disk secara chunk, clean dan simpan setiap chunk."""
         try:
-            # Logic cari header
-            jumpa = []
-            for i in range(min(len(df), 50)):  # Limit search to first 50 rows
-                row_text = ' '.join(str(x) for x in df.iloc[i].values)
-                if 'Terminal Name' in row_text or 'terminal name' in row_text.lower():
-                    jumpa.append(i)
-            
-            if len(jumpa) < 2:
+            print(f"🚀 [EOD] Streaming file: {self.filename}")
+            
+            header_idx, header_values = locate_header(
+                file_path, 'terminal name', occurrence=2, max_rows=HEADER_SEARCH_ROWS
+            )
+            if header_idx is None:
                 logger.warning("Header tidak lengkap")
-                return pd.DataFrame()
+                return {'success': False, 'error': 'No valid data found in file'}
             
-            # Set header
-            new_header = [str(val).lower().replace(" ", "_").replace("(", "").replace(")", "").strip() 
-                         for val in df.iloc[jumpa[1]]]
-            df.columns = new_header
+            totals = {'inserted': 0, 'duplicates': 0, 'failed': 0}
+            records_processed = 0
+            total_amount = 0.0
             
-            # Remove nan columns
-            df = df.loc[:, ~df.columns.str.contains('nan')]
+            rows_parsed = 0
+            for chunk in iter_frames(file_path, self.chunk_size, skiprows=header_idx + 1, n_columns=len(header_values)):
+                rows_parsed += len(chunk)
+                processed_df = self._clean_eod_rows(self._apply_header(chunk, header_values))
+                if not processed_df.empty:
+                    save_stats = self._save_to_database(processed_df)
+                    for key in totals:
+                        totals[key] += save_stats[key]
+                    records_processed += len(processed_df)
+                    if 'amount_rm_cents' in processed_df.columns:
+                        total_amount += int(processed_df['amount_rm_cents'].sum()) / 100
+                
+                self._report_progress(rows_parsed, totals['inserted'])
+            
+            if records_processed == 0:
+                return {'success': False, 'error': 'No valid data found in file'}
+            
+            self._save_upload_history(totals['inserted'])
+            
+            return {
+                'success': True,
+                'records_processed': records_processed,
+                'records_saved': totals['inserted'],
+                'skipped_records': totals['duplicates'],
+                'failed_records': totals['failed'],
+                'batch_id': self.batch_id,
+                'filename': self.filename,
+                'total_amount': total_amount
+            }
+            
+        except Exception as e:
+            logger.error(f"Error processing EOD file: {e}")
+            return {'success': False, 'error': str(e)}
+    
+    @staticmethod
+    def _normalize_header(values):
+        """Tukar nilai baris header kepada nama kolum; sel kosong jadi 'nan'."""
+        header = []
+        for val in values:
+            if val is None or (isinstance(val, str) and not val.strip()) or pd.isna(val):
+                val = 'nan'
+            header.append(str(val).lower().replace(" ", "_").replace("(", "").replace(")", "").strip())
+        return header
+    
+    def _apply_header(self, df, header_values):
+        """Pasang header EOD pada frame data dan buang kolum 'nan'."""
+        df = fit_width(df, len(header_values))
+        df.columns = self._normalize_header(header_values)
+        return df.loc[:, ~df.columns.str.contains('nan')]
+    
+    def _clean_eod_data(self, df):
+        """Clean and process EOD data (DataFrame penuh termasuk preamble)."""
+        try:
+            # Logic cari header (limit search to first 50 rows)
+            header_idx = find_header_row(df.iloc[:HEADER_SEARCH_ROWS].values, 'terminal name', occurrence=2)
+            
+            if header_idx is None:
+                logger.warning("Header tidak lengkap")
+                return pd.DataFrame()
             
             # Get data after header
-            df = df.iloc[jumpa[1] + 1:].reset_index(drop=True)
+            data = df.iloc[header_idx + 1:].reset_index(drop=True)
+            return self._clean_eod_rows(self._apply_header(data, df.iloc[header_idx].tolist()))
             
+        except Exception as e:
+            logger.error(f"Error cleaning EOD data: {e}")
+            return pd.DataFrame()
+    
+    def _clean_eod_rows(self, df):
+        """Clean baris data EOD yang sudah ada header."""
+        try:
             # Filter Visa transactions
             if 'card_type' in df.columns:
                 df_visa = df[df['card_type'].astype(str).str.strip().str.lower() == 'visa'].copy()
@@ -133,14 +271,8 @@ class EODProcessor:
             
             # Clean amount column
             if 'amount_rm' in df_visa.columns:
-                df_visa['amount_rm'] = (
-                    df_visa['amount_rm']
-                    .astype(str)
-                    .str.replace('RM', '', case=False)
-                    .str.replace(',', '')
-                    .str.replace('[^0-9.]', '', regex=True)
-                )
-                df_visa['amount_rm'] = pd.to_numeric(df_visa['amount_rm'], errors='coerce').fillna(0.00)
+                # Sen int64 yang tepat (amount_rm_cents), nilai rosak jadi 0.00 seperti sebelum ini
+                df_visa['amount_rm_cents'] = parse_amount_cents(df_visa.pop('amount_rm'), fill_bad=0)
             
             # Clean receipt column
             if 'receipt' in df_visa.columns:
@@ -148,9 +280,9 @@ class EODProcessor:
             
             # Parse date
             if 'date_of_transaction' in df_visa.columns:
-                f1 = pd.to_datetime(df_visa['date_of_transaction'], format='%d/%m/%Y %H:%M', errors='coerce')
-                f2 = pd.to_datetime(df_visa['date_of_transaction'], format='%d %b %Y %H:%M:%S', errors='coerce')
-                df_visa['date_of_transaction'] = f1.fillna(f2)
+                df_visa['date_of_transaction'] = parse_dates(
+                    df_visa['date_of_transaction'], EOD_DATE_FORMATS, source='eod'
+                )
                 df_visa = df_visa.dropna(subset=['date_of_transaction'])
             
             # Validate card numbers
@@ -163,126 +295,152 @@ class EODProcessor:
             df_visa['file_name'] = self.filename
             df_visa['uploaded_at'] = datetime.now()
             
-            return df_visa
+            return compact_frame(df_visa) if self.compact else df_visa
             
         except Exception as e:
             logger.error(f"Error cleaning EOD data: {e}")
             return pd.DataFrame()
     
     def _save_to_database(self, df):
-        """Save processed data to database."""
+        """Save processed data to database. Returns inserted/duplicate/failed counts."""
         try:
-            # Ensure table exists
+            # Ensure table & partition bulanan untuk data ini wujud
             self._init_table()
+            ensure_partitions(self.engine, 'transaksi_eod', df['date_of_transaction'])
             
-            # Save using pandas to_sql with custom insert method
-            records_saved = len(df)
-            
-            # Convert to dictionary list for manual insertion
-            records = df.to_dict('records')
-            
-            # Insert records one by one to handle conflicts
-            with self.engine.connect() as conn:
-                for record in records:
-                    try:
-                        # Convert date to string for SQL
-                        if 'date_of_transaction' in record and pd.notna(record['date_of_transaction']):
-                            if isinstance(record['date_of_transaction'], pd.Timestamp):
-                                record['date_of_transaction'] = record['date_of_transaction'].to_pydatetime()
-                        
-                        # Insert into transaksi_eod table
-                        stmt = text("""
-                            INSERT INTO transaksi_eod (
-                                terminal_name, tid, till_summary_no, till_closure_no,
-                                date_of_transaction, card_type, card_number, receipt,
-                                ref_number, stan_no, acquirer_mid, acquirer_tid,
-                                approval_code, amount_rm, uploaded_by, batch_id, file_name
-                            ) VALUES (
-                                :terminal_name, :tid, :till_summary_no, :till_closure_no,
-                                :date_of_transaction, :card_type, :card_number, :receipt,
-                                :ref_number, :stan_no, :acquirer_mid, :acquirer_tid,
-                                :approval_code, :amount_rm, :uploaded_by, :batch_id, :file_name
-                            ) ON CONFLICT (tid, ref_number, date_of_transaction, amount_rm) DO NOTHING
-                        """)
-                        conn.execute(stmt, record)
-                        
-                    except Exception as e:
-                        logger.warning(f"Failed to insert record: {e}")
-                        records_saved -= 1
-                        continue
-                
-                conn.commit()
-            
-            return records_saved
+            if self.bulk_load:
+                stats = self._bulk_copy_to_database(df)
+            else:
+                stats = self._save_row_by_row(df)
+            if stats['inserted']:
+                self.touched_days.update(pd.to_datetime(df['date_of_transaction']).dt.date.dropna())
+            return stats
             
         except Exception as e:
             logger.error(f"Error saving to database: {e}")
-            return 0
+            return {'inserted': 0, 'duplicates': 0, 'failed': len(df)}
+    
+    def _bulk_copy_to_database(self, df):
+        """Bulk load: COPY ke staging table, kemudian satu INSERT ... SELECT ON CONFLICT DO NOTHING."""
+        raw_conn = self.engine.raw_connection()
+        try:
+            inserted, duplicates = copy_upsert(
+                raw_conn.cursor(), df, 'transaksi_eod', EOD_COLUMNS,
+                '(tid, ref_number, date_of_transaction, amount_rm)'
+            )
+            raw_conn.commit()
+        except Exception:
+            raw_conn.rollback()
+            raise
+        finally:
+            raw_conn.close()
+        
+        return {'inserted': inserted, 'duplicates': duplicates, 'failed': 0}
+    
+    def _save_row_by_row(self, df):
+        """Legacy path: satu INSERT untuk setiap rekod."""
+        inserted = 0
+        duplicates = 0
+        failed = 0
+        
+        # Convert to dictionary list for manual insertion (sen -> Decimal, NA -> None)
+        df_out = with_decimal_amounts(df, EOD_COLUMNS).astype(object)
+        records = df_out.where(pd.notna(df_out), None).to_dict('records')
+        
+        # Insert records one by one to handle conflicts
+        with self.engine.connect() as conn:
+            for record in records:
+                try:
+                    # Convert date to string for SQL
+                    if 'date_of_transaction' in record and pd.notna(record['date_of_transaction']):
+                        if isinstance(record['date_of_transaction'], pd.Timestamp):
+                            record['date_of_transaction'] = record['date_of_transaction'].to_pydatetime()
+                    
+                    # Insert into transaksi_eod table
+                    stmt = text("""
+                        INSERT INTO transaksi_eod (
+                            terminal_name, tid, till_summary_no, till_closure_no,
+                            date_of_transaction, card_type, card_number, receipt,
+                            ref_number, stan_no, acquirer_mid, acquirer_tid,
+                            approval_code, amount_rm, uploaded_by, batch_id, file_name
+                        ) VALUES (
+                            :terminal_name, :tid, :till_summary_no, :till_closure_no,
+                            :date_of_transaction, :card_type, :card_number, :receipt,
+                            :ref_number, :stan_no, :acquirer_mid, :acquirer_tid,
+                            :approval_code, :amount_rm, :uploaded_by, :batch_id, :file_name
+                        ) ON CONFLICT (tid, ref_number, date_of_transaction, amount_rm) DO NOTHING
+                    """)
+                    result = conn.execute(stmt, record)
+                    if result.rowcount:
+                        inserted += 1
+                    else:
+                        duplicates += 1
+                    
+                except Exception as e:
+                    logger.warning(f"Failed to insert record: {e}")
+                    failed += 1
+                    continue
+            
+            conn.commit()
+        
+        return {'inserted': inserted, 'duplicates': duplicates, 'failed': failed}
     
     def _init_table(self):
-        """Initialize EOD table if not exists."""
+        """Initialize EOD table if not exists (partition bulanan, lihat partitioning.py)."""
         try:
-            query = """
-            CREATE TABLE IF NOT EXISTS transaksi_eod (
-                id SERIAL PRIMARY KEY,
-                terminal_name TEXT,
-                tid VARCHAR(100),
-                till_summary_no VARCHAR(100),
-                till_closure_no VARCHAR(100),
-                date_of_transaction TIMESTAMP,
-                card_type VARCHAR(100),
-                card_number VARCHAR(100),
-                receipt VARCHAR(100),
-                ref_number VARCHAR(100),
-                stan_no VARCHAR(100),
-                acquirer_mid VARCHAR(100),
-                acquirer_tid VARCHAR(100),
-                approval_code VARCHAR(100),
-                amount_rm DECIMAL(12, 2),
-                uploaded_by INTEGER,
-                batch_id VARCHAR(100),
-                file_name VARCHAR(255),
-                uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                CONSTRAINT unique_transaction_ref UNIQUE (tid, ref_number, date_of_transaction, amount_rm)
-            );
-            
-            CREATE INDEX IF NOT EXISTS idx_ref_num ON transaksi_eod (ref_number);
-            CREATE INDEX IF NOT EXISTS idx_eod_date ON transaksi_eod (date_of_transaction);
-            CREATE INDEX IF NOT EXISTS idx_eod_batch ON transaksi_eod (batch_id);
-            """
-            
-            with self.engine.connect() as conn:
-                conn.execute(text(query))
-                conn.commit()
+            init_partitioned_tables(self.engine, ['transaksi_eod'])
                 
         except Exception as e:
             logger.error(f"Error initializing table: {e}")
     
+    def _report_progress(self, rows_parsed, rows_inserted):
+        """Hantar progress ke job runner (jika ada)."""
+        if self.progress_callback:
+            self.progress_callback(rows_parsed, rows_inserted)
+    
     def _save_upload_history(self, record_count):
-        """Save upload history."""
+        """Save upload history (update rekod 'processing' jika upload dibuat melalui job queue)."""
         try:
-            history = UploadHistory(
-                user_id=self.user_id,
-                file_name=self.filename,
-                file_type='eod',
-                record_count=record_count,
-                status='completed' if record_count > 0 else 'failed',
-                batch_id=self.batch_id
-            )
-            db.session.add(history)
+            # Upload selesai: kira semula ringkasan untuk hari yang menerima rekod baru
+            refresh_summary_for_dates(self.engine, self.user_id, self.touched_days)
+        except Exception as e:
+            logger.error(f"Error refreshing recon summary: {e}")
+        
+        try:
+            history = UploadHistory.query.filter_by(batch_id=self.batch_id).first()
+            if history is None:
+                history = UploadHistory(
+                    user_id=self.user_id,
+                    file_name=self.filename,
+                    file_type='eod',
+                    batch_id=self.batch_id
+                )
+                db.session.add(history)
+            history.record_count = record_count
+            history.status = 'completed' if record_count > 0 else 'failed'
             db.session.commit()
         except Exception as e:
             logger.error(f"Error saving upload history: {e}")
+        
+        response_cache.invalidate_user(self.user_id)
 
 
 class EMerchantProcessor:
-    def __init__(self, db_engine, file_content=None, filename=None, user_id=None, merchant_type='other'):
+    def __init__(self, db_engine, file_content=None, filename=None, user_id=None, merchant_type='other',
+                 batch_size=EMERCHANT_BATCH_SIZE, chunk_size=UPLOAD_CHUNK_ROWS, progress_callback=None,
+                 compact=True):
         self.engine = db_engine
         self.file_content = file_content
         self.filename = filename
         self.user_id = user_id
         self.merchant_type = merchant_type
+        self.compact = compact
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.progress_callback = progress_callback
         self.batch_id = f"EMERCH_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        # Hari transaksi yang menerima rekod baru (untuk recon_summary)
+        self.touched_days = set()
     
     def process_from_file_content(self):
         """Process E-Merchant from uploaded file content."""
@@ -304,18 +462,70 @@ class EMerchantProcessor:
                 return {'success': False, 'error': 'No valid data found in file'}
             
             # Save to database
-            records_saved = self._save_to_database(processed_df)
+            save_stats = self._save_to_database(processed_df)
+            records_saved = save_stats['inserted']
             
             # Save upload history
             self._save_upload_history(records_saved)
             
             # Calculate statistics
-            total_amount = float(processed_df['amount'].sum()) if 'amount' in processed_df.columns else 0
+            total_amount = int(processed_df['amount_cents'].sum()) / 100 if 'amount_cents' in processed_df.columns else 0
             
             return {
                 'success': True,
                 'records_processed': len(processed_df),
                 'records_saved': records_saved,
+                'valid_records': records_saved,
+                'skipped_records': save_stats['duplicates'],
+                'rejected_records': save_stats['rejected'],
+                'batches': save_stats['batches'],
+                'batch_id': self.batch_id,
+                'filename': self.filename,
+                'merchant_type': self.merchant_type,
+                'total_amount': total_amount
+            }
+            
+        except Exception as e:
+            logger.error(f"Error processing E-Merchant file: {e}")
+            return {'success': False, 'error': str(e)}
+    
+    def process_from_file_path(self, file_path):
+        """Streaming mode: baca fail dari disk secara chunk, clean dan simpan setiap chunk."""
+        try:
+            print(f"🚀 [E-MERCHANT] Streaming file: {self.filename}")
+            
+            totals = {'inserted': 0, 'duplicates': 0, 'rejected': 0, 'batches': []}
+            records_processed = 0
+            total_amount = 0.0
+            
+            rows_parsed = 0
+            for chunk in iter_frames(file_path, self.chunk_size, has_header=True):
+                rows_parsed += len(chunk)
+                processed_df = self._clean_emerchant_data(chunk)
+                if not processed_df.empty:
+                    save_stats = self._save_to_database(processed_df)
+                    for key in ('inserted', 'duplicates', 'rejected'):
+                        totals[key] += save_stats[key]
+                    totals['batches'].extend(save_stats['batches'])
+                    records_processed += len(processed_df)
+                    if 'amount_cents' in processed_df.columns:
+                        total_amount += int(processed_df['amount_cents'].sum()) / 100
+                
+                self._report_progress(rows_parsed, totals['inserted'])
+            
+            if records_processed == 0:
+                return {'success': False, 'error': 'No valid data found in file'}
+            
+            self._save_upload_history(totals['inserted'])
+            
+            return {
+                'success': True,
+                'records_processed': records_processed,
+                'records_saved': totals['inserted'],
+                'valid_records': totals['inserted'],
+                'skipped_records': totals['duplicates'],
+                'rejected_records': totals['rejected'],
+                'batches': totals['batches'],
                 'batch_id': self.batch_id,
                 'filename': self.filename,
                 'merchant_type': self.merchant_type,
@@ -329,10 +539,8 @@ class EMerchantProcessor:
     def _clean_emerchant_data(self, df):
         """Clean and process E-Merchant data."""
         try:
-            df_clean = df.copy()
-            
-            # Standardize column names
-            df_clean.columns = [col.strip().lower().replace(' ', '_') for col in df_clean.columns]
+            # Standardize column names (tanpa salin data)
+            df_clean = df.rename(columns=lambda col: col.strip().lower().replace(' ', '_'), copy=False)
             
             # Map common column names
             column_mapping = {
@@ -351,43 +559,35 @@ class EMerchantProcessor:
                 'net': 'net_amount'
             }
             
+            # Alias di-rename (bukan disalin); alias pertama yang wujud diguna
+            renames = {}
             for old_col, new_col in column_mapping.items():
-                if old_col in df_clean.columns and new_col not in df_clean.columns:
-                    df_clean[new_col] = df_clean[old_col]
+                if (old_col != new_col and old_col in df_clean.columns
+                        and new_col not in df_clean.columns and new_col not in renames.values()):
+                    renames[old_col] = new_col
+            df_clean = df_clean.rename(columns=renames, copy=False)
             
             # Convert date columns
             if 'transaction_date' in df_clean.columns:
-                try:
-                    df_clean['transaction_date'] = pd.to_datetime(df_clean['transaction_date']).dt.date
-                except:
-                    # Try different date formats
-                    for fmt in ['%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%Y%m%d', '%d-%b-%Y']:
-                        try:
-                            df_clean['transaction_date'] = pd.to_datetime(df_clean['transaction_date'], format=fmt).dt.date
-                            break
-                        except:
-                            continue
+                # Format dikesan dari sampel dan diingat per jenis merchant; nilai unik di-parse sekali
+                df_clean['transaction_date'] = parse_dates(
+                    df_clean['transaction_date'], EMERCHANT_DATE_FORMATS,
+                    source=f'emerchant:{self.merchant_type}', infer=True
+                ).dt.normalize()
             
             # Convert numeric columns
             numeric_cols = ['amount', 'fee', 'net_amount']
             for col in numeric_cols:
                 if col in df_clean.columns:
-                    # Remove currency symbols and commas
-                    df_clean[col] = (
-                        df_clean[col]
-                        .astype(str)
-                        .str.replace('RM', '', case=False)
-                        .str.replace(',', '')
-                        .str.replace('[^0-9.]', '', regex=True)
-                    )
-                    df_clean[col] = pd.to_numeric(df_clean[col], errors='coerce')
+                    # Sen Int64 yang tepat ({col}_cents); nilai rosak/kosong jadi NULL
+                    df_clean[f'{col}_cents'] = parse_amount_cents(df_clean.pop(col))
             
             # Add merchant type if not present
             if 'merchant_code' not in df_clean.columns:
                 df_clean['merchant_code'] = self.merchant_type
             
             # Remove rows with missing essential data
-            essential_cols = ['transaction_date', 'amount', 'order_id']
+            essential_cols = ['transaction_date', 'amount_cents', 'order_id']
             for col in essential_cols:
                 if col in df_clean.columns:
                     df_clean = df_clean.dropna(subset=[col])
@@ -399,68 +599,113 @@ class EMerchantProcessor:
             df_clean['uploaded_at'] = datetime.now()
             df_clean['reconciliation_status'] = 'PENDING'
             
-            return df_clean
+            return compact_frame(df_clean) if self.compact else df_clean
             
         except Exception as e:
             logger.error(f"Error cleaning E-Merchant data: {e}")
             return pd.DataFrame()
     
     def _save_to_database(self, df):
-        """Save processed data to database."""
+        """Save processed data to database in batches. Returns inserted/duplicate/rejected counts."""
+        totals = {'inserted': 0, 'duplicates': 0, 'rejected': 0, 'batches': []}
+        
+        # Tukar NaN/NaT kepada None supaya psycopg2 hantar NULL
+        df_out = with_decimal_amounts(df, EMERCHANT_COLUMNS).astype(object)
+        rows = list(df_out.where(pd.notna(df_out), None).itertuples(index=False, name=None))
+        
+        try:
+            ensure_partitions(self.engine, 'transaksi_emerchant', df_out['transaction_date'])
+            raw_conn = self.engine.raw_connection()
+        except Exception as e:
+            logger.error(f"Error saving E-Merchant to database: {e}")
+            totals['rejected'] = len(rows)
+            return totals
+        
         try:
-            records_saved = 0
-            
-            # Convert to dictionary list
-            records = df.to_dict('records')
-            
-            with self.engine.connect() as conn:
-                for record in records:
-                    try:
-                        # Insert into transaksi_emerchant table
-                        stmt = text("""
-                            INSERT INTO transaksi_emerchant (
-                                merchant_code, store_id, transaction_date, order_id,
-                                payment_method, amount, fee, net_amount, customer_email,
-                                status, settlement_date, uploaded_by, batch_id,
-                                file_name, reconciliation_status
-                            ) VALUES (
-                                :merchant_code, :store_id, :transaction_date, :order_id,
-                                :payment_method, :amount, :fee, :net_amount, :customer_email,
-                                :status, :settlement_date, :uploaded_by, :batch_id,
-                                :file_name, :reconciliation_status
-                            ) ON CONFLICT (order_id, transaction_date, amount) DO NOTHING
-                        """)
-                        conn.execute(stmt, record)
-                        records_saved += 1
-                        
-                    except Exception as e:
-                        logger.warning(f"Failed to insert E-Merchant record: {e}")
-                        continue
+            cursor = raw_conn.cursor()
+            for start in range(0, len(rows), self.batch_size):
+                page = rows[start:start + self.batch_size]
+                batch_stats = self._insert_batch(cursor, page)
+                raw_conn.commit()
                 
-                conn.commit()
-            
-            return records_saved
-            
+                for key in ('inserted', 'duplicates', 'rejected'):
+                    totals[key] += batch_stats[key]
+                totals['batches'].append(batch_stats)
         except Exception as e:
+            raw_conn.rollback()
             logger.error(f"Error saving E-Merchant to database: {e}")
-            return 0
+        finally:
+            raw_conn.close()
+        
+        if totals['inserted']:
+            self.touched_days.update(
+                pd.to_datetime(df_out['transaction_date'], errors='coerce').dt.date.dropna()
+            )
+        return totals
+    
+    def _insert_batch(self, cursor, page):
+        """Insert satu batch dengan multi-row VALUES ... RETURNING id."""
+        stmt = f"""
+            INSERT INTO transaksi_emerchant ({', '.join(EMERCHANT_COLUMNS)})
+            VALUES %s
+            ON CONFLICT (order_id, transaction_date, amount) DO NOTHING
+            RETURNING id
+        """
+        cursor.execute("SAVEPOINT emerchant_batch")
+        try:
+            returned = execute_values(cursor, stmt, page, page_size=len(page), fetch=True)
+            cursor.execute("RELEASE SAVEPOINT emerchant_batch")
+            return {'rows': len(page), 'inserted': len(returned),
+                    'duplicates': len(page) - len(returned), 'rejected': 0}
+        except Exception as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT emerchant_batch")
+            logger.warning(f"E-Merchant batch failed, retrying row by row: {e}")
+        
+        # Ada rekod rosak dalam batch: asingkan satu-satu supaya rekod lain tetap disimpan
+        stats = {'rows': len(page), 'inserted': 0, 'duplicates': 0, 'rejected': 0}
+        for row in page:
+            cursor.execute("SAVEPOINT emerchant_row")
+            try:
+                returned = execute_values(cursor, stmt, [row], fetch=True)
+                cursor.execute("RELEASE SAVEPOINT emerchant_row")
+                stats['inserted' if returned else 'duplicates'] += 1
+            except Exception as e:
+                cursor.execute("ROLLBACK TO SAVEPOINT emerchant_row")
+                logger.warning(f"Failed to insert E-Merchant record: {e}")
+                stats['rejected'] += 1
+        return stats
+    
+    def _report_progress(self, rows_parsed, rows_inserted):
+        """Hantar progress ke job runner (jika ada)."""
+        if self.progress_callback:
+            self.progress_callback(rows_parsed, rows_inserted)
     
     def _save_upload_history(self, record_count):
-        """Save upload history."""
+        """Save upload history (update rekod 'processing' jika upload dibuat melalui job queue)."""
         try:
-            history = UploadHistory(
-                user_id=self.user_id,
-                file_name=self.filename,
-                file_type='emerchant',
-                record_count=record_count,
-                status='completed' if record_count > 0 else 'failed',
-                batch_id=self.batch_id,
-                merchant_type=self.merchant_type
-            )
-            db.session.add(history)
+            # Upload selesai: kira semula ringkasan untuk hari yang menerima rekod baru
+            refresh_summary_for_dates(self.engine, self.user_id, self.touched_days)
+        except Exception as e:
+            logger.error(f"Error refreshing recon summary: {e}")
+        
+        try:
+            history = UploadHistory.query.filter_by(batch_id=self.batch_id).first()
+            if history is None:
+                history = UploadHistory(
+                    user_id=self.user_id,
+                    file_name=self.filename,
+                    file_type='emerchant',
+                    batch_id=self.batch_id,
+                    merchant_type=self.merchant_type
+                )
+                db.session.add(history)
+            history.record_count = record_count
+            history.status = 'completed' if record_count > 0 else 'failed'
             db.session.commit()
         except Exception as e:
             logger.error(f"Error saving upload history: {e}")
+        
+        response_cache.invalidate_user(self.user_id)
 
 # ==================== HELPER FUNCTIONS ====================
 
@@ -472,6 +717,58 @@ def validate_email(email):
     pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
     return re.match(pattern, email) is not None
 
+def queued_response(batch_id, filename):
+    """Response untuk upload yang sudah dihantar ke job queue."""
+    return {
+        'success': True,
+        'queued': True,
+        'batch_id': batch_id,
+        'filename': filename,
+        'status_url': url_for('get_job_status', batch_id=batch_id)
+    }
+
+def upgrade_schema():
+    """Tambah kolum baru pada table sedia ada (db.create_all tak buat ALTER TABLE)."""
+    query = """
+    ALTER TABLE upload_history ADD COLUMN IF NOT EXISTS stage VARCHAR(20);
+    ALTER TABLE upload_history ADD COLUMN IF NOT EXISTS rows_total INTEGER;
+    ALTER TABLE upload_history ADD COLUMN IF NOT EXISTS rows_parsed INTEGER DEFAULT 0;
+    ALTER TABLE upload_history ADD COLUMN IF NOT EXISTS error_message TEXT;
+    
+    ALTER TABLE transaksi_eod
+        ADD COLUMN IF NOT EXISTS tx_date DATE GENERATED ALWAYS AS (date_of_transaction::date) STORED;
+    CREATE INDEX IF NOT EXISTS idx_eod_recon_key ON transaksi_eod (tx_date, approval_code, amount_rm);
+    CREATE INDEX IF NOT EXISTS idx_emerchant_recon_key ON transaksi_emerchant (transaction_date, amount);
+    
+    ALTER TABLE transaksi_eod ADD COLUMN IF NOT EXISTS reconciliation_status VARCHAR(20) DEFAULT 'PENDING';
+    CREATE INDEX IF NOT EXISTS idx_eod_recon_open ON transaksi_eod (uploaded_by, tx_date, amount_rm)
+        WHERE reconciliation_status IN ('PENDING', 'UNMATCHED');
+    CREATE INDEX IF NOT EXISTS idx_emerchant_recon_open ON transaksi_emerchant (uploaded_by, transaction_date, amount)
+        WHERE reconciliation_status IN ('PENDING', 'UNMATCHED');
+    CREATE INDEX IF NOT EXISTS idx_emerchant_user_date ON transaksi_emerchant (uploaded_by, transaction_date);
+    CREATE INDEX IF NOT EXISTS idx_emerchant_user_merchant ON transaksi_emerchant (uploaded_by, merchant_code);
+    
+    CREATE INDEX IF NOT EXISTS idx_match_user_date ON reconciliation_matches (matched_by, matched_date);
+    
+    -- Jenis padanan auto dalam kolum sendiri (dahulu disimpan dalam notes)
+    ALTER TABLE reconciliation_matches ADD COLUMN IF NOT EXISTS match_type VARCHAR(10);
+    UPDATE reconciliation_matches SET match_type = notes, notes = NULL
+        WHERE match_type IS NULL AND notes IN ('exact', 'partial');
+    
+    CREATE INDEX IF NOT EXISTS idx_eod_user_seek ON transaksi_eod (uploaded_by, date_of_transaction DESC, id DESC);
+    CREATE INDEX IF NOT EXISTS idx_emerchant_user_seek ON transaksi_emerchant (uploaded_by, transaction_date DESC, id DESC);
+    """
+    with db.engine.connect() as conn:
+        conn.execute(text(query))
+        conn.commit()
+    
+    # Isi recon_summary sekali untuk data sedia ada
+    with db.engine.begin() as conn:
+        backfill_summary(conn)
+    
+    # Index carian terminal_name/merchant_code (pg_trgm + prefix; tanpa pg_trgm default mod prefix)
+    app.config['SEARCH_TRIGRAM'] = setup_search_indexes(db.engine)
+
 # ==================== ROUTES ====================
 
 @app.route('/')
@@ -557,21 +854,31 @@ def dashboard():
     
     user = User.query.get(session['user_id'])
     
-    # Get statistics
-    total_eod = TransaksiEod.query.filter_by(uploaded_by=user.id).count()
-    total_emerchant = TransaksiEmerchant.query.filter_by(uploaded_by=user.id).count()
+    def load_dashboard():
+        # Get statistics (recon_summary, satu lookup)
+        summary = load_summary(db.session, user.id, datetime.now().date())
+        
+        # Recent uploads (dict, bukan ORM object, supaya selamat disimpan dalam cache)
+        recent_uploads = UploadHistory.query.filter_by(user_id=user.id)\
+            .order_by(UploadHistory.upload_date.desc())\
+            .limit(5)\
+            .all()
+        
+        return {
+            'total_eod': summary['eod_count'],
+            'total_emerchant': summary['emerchant_count'],
+            'recent_uploads': [{
+                'file_name': upload.file_name or '',
+                'file_type': upload.file_type,
+                'record_count': upload.record_count,
+                'upload_date': upload.upload_date,
+                'status': upload.status
+            } for upload in recent_uploads]
+        }
     
-    # Recent uploads
-    recent_uploads = UploadHistory.query.filter_by(user_id=user.id)\
-        .order_by(UploadHistory.upload_date.desc())\
-        .limit(5)\
-        .all()
+    data = response_cache.get_or_set(user.id, 'dashboard', load_dashboard)
     
-    return render_template('dashboard.html',
-                         user=user,
-                         total_eod=total_eod,
-                         total_emerchant=total_emerchant,
-                         recent_uploads=recent_uploads)
+    return render_template('dashboard.html', user=user, **data)
 
 # ==================== UPLOAD ROUTES ====================
 
@@ -600,19 +907,26 @@ def upload_eod_api():
         if not allowed_file(file.filename):
             return jsonify({'success': False, 'error': 'Invalid file type'}), 400
         
-        # Read file content
-        file_content = file.read()
+        # Spool ke disk, kemudian proses secara chunk
         filename = secure_filename(file.filename)
+        file_path = spool_upload(file, app.config['UPLOAD_FOLDER'], filename)
         
         # Process with EODProcessor
         processor = EODProcessor(
             db_engine=db.engine,
-            file_content=file_content,
             filename=filename,
-            user_id=session['user_id']
+            user_id=session['user_id'],
+            chunk_size=app.config['UPLOAD_CHUNK_ROWS']
         )
         
-        result = processor.process_from_file_content()
+        if app.config['UPLOAD_ASYNC']:
+            batch_id = upload_jobs.submit(processor, file_path, 'eod')
+            return jsonify(queued_response(batch_id, filename)), 202
+        
+        try:
+            result = processor.process_from_file_path(file_path)
+        finally:
+            os.remove(file_path)
         
         if result['success']:
             return jsonify(result)
@@ -651,20 +965,27 @@ def upload_emerchant_api():
         # Get merchant type
         merchant_type = request.form.get('merchant_type', 'other')
         
-        # Read file content
-        file_content = file.read()
+        # Spool ke disk, kemudian proses secara chunk
         filename = secure_filename(file.filename)
+        file_path = spool_upload(file, app.config['UPLOAD_FOLDER'], filename)
         
         # Process with EMerchantProcessor
         processor = EMerchantProcessor(
             db_engine=db.engine,
-            file_content=file_content,
             filename=filename,
             user_id=session['user_id'],
-            merchant_type=merchant_type
+            merchant_type=merchant_type,
+            chunk_size=app.config['UPLOAD_CHUNK_ROWS']
         )
         
-        result = processor.process_from_file_content()
+        if app.config['UPLOAD_ASYNC']:
+            batch_id = upload_jobs.submit(processor, file_path, 'emerchant')
+            return jsonify(queued_response(batch_id, filename)), 202
+        
+        try:
+            result = processor.process_from_file_path(file_path)
+        finally:
+            os.remove(file_path)
         
         if result['success']:
             return jsonify(result)
@@ -683,7 +1004,6 @@ def view_eod():
         flash('Sila login terlebih dahulu', 'warning')
         return redirect(url_for('login'))
     
-    page = request.args.get('page', 1, type=int)
     per_page = 20
     
     query = TransaksiEod.query.filter_by(uploaded_by=session['user_id'])
@@ -693,29 +1013,61 @@ def view_eod():
     date_to = request.args.get('date_to')
     merchant_id = request.args.get('merchant_id')
     
-    if date_from:
-        query = query.filter(TransaksiEod.date_of_transaction >= date_from)
-    if date_to:
-        query = query.filter(TransaksiEod.date_of_transaction <= date_to)
+    # Julat separuh terbuka pada kolum partition: partition pruning + hari terakhir penuh
+    try:
+        if date_from:
+            query = query.filter(TransaksiEod.date_of_transaction >= datetime.strptime(date_from, '%Y-%m-%d'))
+        if date_to:
+            query = query.filter(TransaksiEod.date_of_transaction <
+                                 datetime.strptime(date_to, '%Y-%m-%d') + timedelta(days=1))
+    except ValueError:
+        flash('Format tarikh tidak sah (YYYY-MM-DD)', 'warning')
     if merchant_id:
-        query = query.filter(TransaksiEod.terminal_name.ilike(f'%{merchant_id}%'))
+        query = query.filter(text_search_filter(TransaksiEod.terminal_name, merchant_id))
     
     # Pagination
-    pagination = query.order_by(TransaksiEod.date_of_transaction.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    pagination = paginate_view(query, TransaksiEod.date_of_transaction, TransaksiEod.id, per_page)
     
     return render_template('view_eod.html',
                          data=pagination.items,
                          pagination=pagination)
 
+def text_search_filter(column, term):
+    """Penapis carian /view/*: ?match=contains|prefix; mod prefix dimaklumkan kepada pengguna."""
+    mode = search_mode(request.args.get('match'), app.config['SEARCH_TRIGRAM'])
+    if mode == 'prefix':
+        flash(f"Carian mod prefix: hanya nilai yang bermula dengan '{term.strip()}'", 'info')
+    return contains_filter(column, term, mode)
+
+def paginate_view(query, date_column, id_column, per_page):
+    """Pagination untuk /view/*: keyset (?after=/?before=) secara default.
+    
+    ?page=N kekal guna paginate() lama (COUNT + OFFSET) untuk link sedia ada.
+    ?approx_total=1 tambah anggaran jumlah dari statistik planner.
+    """
+    page = request.args.get('page', type=int)
+    if page is not None:
+        return query.order_by(date_column.desc(), id_column.desc()).paginate(
+            page=page, per_page=per_page, error_out=False
+        )
+    
+    try:
+        pagination = KeysetPage(query, date_column, id_column, per_page,
+                                after=request.args.get('after'), before=request.args.get('before'))
+    except ValueError:
+        flash('Cursor pagination tidak sah', 'warning')
+        pagination = KeysetPage(query, date_column, id_column, per_page)
+    
+    if request.args.get('approx_total'):
+        pagination.estimate_total(db.session)
+    return pagination
+
 @app.route('/view/emerchant')
 def view_emerchant():
     if 'user_id' not in session:
         flash('Sila login terlebih dahulu', 'warning')
         return redirect(url_for('login'))
     
-    page = request.args.get('page', 1, type=int)
     per_page = 20
     
     query = TransaksiEmerchant.query.filter_by(uploaded_by=session['user_id'])
@@ -730,12 +1082,10 @@ def view_emerchant():
     if date_to:
         query = query.filter(TransaksiEmerchant.transaction_date <= date_to)
     if merchant_code:
-        query = query.filter(TransaksiEmerchant.merchant_code.ilike(f'%{merchant_code}%'))
+        query = query.filter(text_search_filter(TransaksiEmerchant.merchant_code, merchant_code))
     
     # Pagination
-    pagination = query.order_by(TransaksiEmerchant.transaction_date.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    pagination = paginate_view(query, TransaksiEmerchant.transaction_date, TransaksiEmerchant.id, per_page)
     
     return render_template('view_emerchant.html',
                          data=pagination.items,
@@ -763,88 +1113,240 @@ def get_reconcile_stats():
         return jsonify({}), 401
     
     user_id = session['user_id']
-    today = datetime.now().date()
+    summary = response_cache.get_or_set(
+        user_id, 'reconcile_stats', lambda: load_summary(db.session, user_id, datetime.now().date())
+    )
     
-    # Get counts
-    total_eod = TransaksiEod.query.filter_by(uploaded_by=user_id).count()
-    total_emerchant = TransaksiEmerchant.query.filter_by(uploaded_by=user_id).count()
+    return jsonify({
+        'total_eod': summary['eod_count'],
+        'total_emerchant': summary['emerchant_count'],
+        'matched': summary['matched'],
+        'partial_matches': summary['partial_matches'],
+        'unmatched_eod': summary['unmatched_eod'],
+        'unmatched_emerchant': summary['unmatched_emerchant'],
+        'today_matches': summary['today_matches'],
+        'pending': summary['pending'],
+        'discrepancies': summary['discrepancies']
+    })
+
+@app.route('/api/reconcile/run', methods=['POST'])
+def run_reconciliation():
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
     
-    # Count matched transactions
-    matched_count = ReconciliationMatch.query.filter_by(matched_by=user_id).count()
+    payload = request.get_json(silent=True) or {}
+    incremental = bool(payload.get('incremental'))
     
-    # Count unmatched
-    unmatched_eod = total_eod - matched_count
-    unmatched_emerchant = total_emerchant - matched_count
+    start_date = end_date = None
+    # Run incremental boleh tanpa julat tarikh (hanya set terbuka diproses)
+    if not incremental or payload.get('start_date') or payload.get('end_date'):
+        try:
+            start_date = datetime.strptime(payload.get('start_date') or '', '%Y-%m-%d').date()
+            end_date = datetime.strptime(payload.get('end_date') or '', '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'error': 'Invalid start_date/end_date (YYYY-MM-DD)'}), 400
+        
+        if start_date > end_date:
+            return jsonify({'success': False, 'error': 'Start date cannot be after end date'}), 400
     
-    # Today's matches
-    today_matches = ReconciliationMatch.query.filter(
-        ReconciliationMatch.matched_by == user_id,
-        ReconciliationMatch.matched_date >= today
-    ).count()
+    try:
+        threshold = min(max(int(payload.get('threshold', 95)), 0), 100)
+        page = max(int(payload.get('page', 1)), 1)
+        per_page = min(max(int(payload.get('per_page', 100)), 1), 1000)
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'threshold, page dan per_page mesti integer'}), 400
     
-    # Pending reconciliation
-    pending_count = unmatched_eod + unmatched_emerchant
+    try:
+        engine = ReconEngine(db.engine, session['user_id'])
+        result = engine.run(
+            start_date,
+            end_date,
+            merchant_filter=payload.get('merchant_filter') or None,
+            criteria=payload.get('criteria'),
+            threshold=threshold,
+            incremental=incremental,
+            page=page,
+            per_page=per_page
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in run_reconciliation: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+    finally:
+        # Run mungkin sudah mengubah status/padanan walaupun respons gagal
+        response_cache.invalidate_user(session['user_id'])
     
-    return jsonify({
-        'total_eod': total_eod,
-        'total_emerchant': total_emerchant,
-        'matched': matched_count,
-        'partial_matches': 0,
-        'unmatched_eod': unmatched_eod,
-        'unmatched_emerchant': unmatched_emerchant,
-        'today_matches': today_matches,
-        'pending': pending_count,
-        'discrepancies': 0
-    })
+    return jsonify({'success': True, **result})
+
+def export_response(sql, columns, params, fmt, prefix):
+    """Response streaming: rekod dibaca dari server-side cursor dan ditulis terus ke klien."""
+    mimetype, _ = EXPORT_FORMATS[fmt]
+    frames = iter_query_frames(db.engine, sql, params, app.config['EXPORT_CHUNK_ROWS'])
+    return Response(
+        export_stream(frames, fmt, columns),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={export_filename(prefix, fmt)}'}
+    )
+
+@app.route('/api/reconcile/export')
+def export_reconciliation():
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+    
+    fmt = request.args.get('format', 'csv').lower()
+    try:
+        check_format(fmt)
+        start_date = datetime.strptime(request.args.get('start_date', ''), '%Y-%m-%d').date()
+        end_date = datetime.strptime(request.args.get('end_date', ''), '%Y-%m-%d').date()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    if start_date > end_date:
+        return jsonify({'success': False, 'error': 'Start date cannot be after end date'}), 400
+    
+    params = {'user_id': session['user_id'], 'start_date': start_date, 'end_date': end_date}
+    return export_response(RECON_EXPORT_SQL, RECON_EXPORT_COLUMNS, params, fmt, f'Recon_Result_{start_date}_{end_date}')
+
+@app.route('/api/emerchant/report/<batch_id>')
+def emerchant_batch_report(batch_id):
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+    
+    fmt = request.args.get('format', 'xlsx').lower()
+    try:
+        check_format(fmt)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    history = UploadHistory.query.filter_by(
+        batch_id=batch_id,
+        user_id=session['user_id'],
+        file_type='emerchant'
+    ).first()
+    if history is None:
+        return jsonify({'success': False, 'error': 'Batch not found'}), 404
+    
+    params = {'user_id': session['user_id'], 'batch_id': batch_id}
+    return export_response(BATCH_REPORT_SQL, BATCH_REPORT_COLUMNS, params, fmt, f'EMerchant_Report_{batch_id}')
+
+@app.route('/api/cache/stats')
+def get_cache_stats():
+    if 'user_id' not in session:
+        return jsonify({}), 401
+    
+    return jsonify(response_cache.stats())
 
 # ==================== API DATA ROUTES ====================
 
+@app.route('/api/jobs/<batch_id>')
+def get_job_status(batch_id):
+    if 'user_id' not in session:
+        return jsonify({}), 401
+    
+    history = UploadHistory.query.filter_by(
+        batch_id=batch_id,
+        user_id=session['user_id']
+    ).first()
+    
+    if history is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    
+    return jsonify(job_status(history))
+
 @app.route('/api/eod/uploads')
 def get_eod_uploads():
     if 'user_id' not in session:
         return jsonify([]), 401
     
-    uploads = UploadHistory.query.filter_by(
-        user_id=session['user_id'],
-        file_type='eod'
-    ).order_by(UploadHistory.upload_date.desc()).limit(10).all()
-    
-    result = []
-    for upload in uploads:
-        result.append({
-            'id': upload.id,
-            'file_name': upload.file_name,
-            'record_count': upload.record_count,
-            'upload_date': upload.upload_date.strftime('%Y-%m-%d %H:%M'),
-            'status': upload.status,
-            'batch_id': upload.batch_id
-        })
-    
-    return jsonify(result)
+    user_id = session['user_id']
+    
+    def load_uploads():
+        uploads = UploadHistory.query.filter_by(
+            user_id=user_id,
+            file_type='eod'
+        ).order_by(UploadHistory.upload_date.desc()).limit(10).all()
+        
+        result = []
+        for upload in uploads:
+            result.append({
+                'id': upload.id,
+                'file_name': upload.file_name,
+                'record_count': upload.record_count,
+                'upload_date': upload.upload_date.strftime('%Y-%m-%d %H:%M'),
+                'status': upload.status,
+                'batch_id': upload.batch_id
+            })
+        return result
+    
+    return jsonify(response_cache.get_or_set(user_id, 'eod_uploads', load_uploads))
 
 @app.route('/api/emerchant/uploads')
 def get_emerchant_uploads():
     if 'user_id' not in session:
         return jsonify([]), 401
     
-    uploads = UploadHistory.query.filter_by(
-        user_id=session['user_id'],
-        file_type='emerchant'
-    ).order_by(UploadHistory.upload_date.desc()).limit(10).all()
-    
-    result = []
-    for upload in uploads:
-        result.append({
-            'id': upload.id,
-            'file_name': upload.file_name,
-            'record_count': upload.record_count,
-            'upload_date': upload.upload_date.strftime('%Y-%m-%d %H:%M'),
-            'status': upload.status,
-            'batch_id': upload.batch_id,
-            'merchant_type': upload.merchant_type
-        })
-    
-    return jsonify(result)
+    user_id = session['user_id']
+    
+    def load_uploads():
+        uploads = UploadHistory.query.filter_by(
+            user_id=user_id,
+            file_type='emerchant'
+        ).order_by(UploadHistory.upload_date.desc()).limit(10).all()
+        
+        result = []
+        for upload in uploads:
+            result.append({
+                'id': upload.id,
+                'file_name': upload.file_name,
+                'record_count': upload.record_count,
+                'upload_date': upload.upload_date.strftime('%Y-%m-%d %H:%M'),
+                'status': upload.status,
+                'batch_id': upload.batch_id,
+                'merchant_type': upload.merchant_type
+            })
+        return result
+    
+    return jsonify(response_cache.get_or_set(user_id, 'emerchant_uploads', load_uploads))
+
+def emerchant_stats(user_id, today=None):
+    """Statistik e-merchant dalam satu query agregat (tanpa load rekod ke Python).
+
+    Stat hari ini guna index (uploaded_by, transaction_date) dan partition bulan
+    semasa; taburan merchant dikira dengan index-only scan (uploaded_by, merchant_code).
+    average_fee = jumlah fee / jumlah amaun (%), hanya rekod yang ada nilai fee.
+    """
+    today = today or datetime.now().date()
+    row = db.session.execute(text("""
+        WITH today AS (
+            SELECT COUNT(*) AS today_count,
+                   COALESCE(SUM(amount), 0) AS today_amount,
+                   SUM(fee) AS fee_total,
+                   SUM(amount) FILTER (WHERE fee IS NOT NULL) AS fee_base
+            FROM transaksi_emerchant
+            WHERE uploaded_by = :user_id AND transaction_date = :today
+        ),
+        distribution AS (
+            SELECT COALESCE(merchant_code, 'unknown') AS merchant, COUNT(*) AS total
+            FROM transaksi_emerchant
+            WHERE uploaded_by = :user_id
+            GROUP BY 1
+        )
+        SELECT t.today_count, t.today_amount, t.fee_total, t.fee_base,
+               (SELECT json_object_agg(merchant, total) FROM distribution) AS merchant_distribution
+        FROM today t
+    """), {'user_id': user_id, 'today': today}).mappings().one()
+    
+    average_fee = 0.0
+    if row['fee_base']:
+        average_fee = round(float(row['fee_total']) / float(row['fee_base']) * 100, 2)
+    
+    return {
+        'today_count': row['today_count'],
+        'today_amount': float(row['today_amount']),
+        'average_fee': average_fee,
+        'merchant_distribution': row['merchant_distribution'] or {}
+    }
 
 @app.route('/api/emerchant/stats')
 def get_emerchant_stats():
@@ -852,31 +1354,7 @@ def get_emerchant_stats():
         return jsonify({}), 401
     
     user_id = session['user_id']
-    today = datetime.now().date()
-    
-    # Calculate today's stats
-    today_transactions = TransaksiEmerchant.query.filter(
-        TransaksiEmerchant.uploaded_by == user_id,
-        TransaksiEmerchant.transaction_date == today
-    ).all()
-    
-    today_count = len(today_transactions)
-    today_amount = sum(float(t.amount or 0) for t in today_transactions)
-    
-    # Get merchant distribution
-    merchant_dist = {}
-    all_transactions = TransaksiEmerchant.query.filter_by(uploaded_by=user_id).all()
-    
-    for trans in all_transactions:
-        merchant = trans.merchant_code or 'unknown'
-        merchant_dist[merchant] = merchant_dist.get(merchant, 0) + 1
-    
-    return jsonify({
-        'today_count': today_count,
-        'today_amount': today_amount,
-        'average_fee': 2.5,
-        'merchant_distribution': merchant_dist
-    })
+    return jsonify(response_cache.get_or_set(user_id, 'emerchant_stats', lambda: emerchant_stats(user_id)))
 
 # ==================== LOGOUT ====================
 
@@ -900,7 +1378,11 @@ def internal_server_error(e):
 
 if __name__ == '__main__':
     with app.app_context():
+        # Table transaksi dicipta dahulu sebagai table partition; create_all skip table sedia ada.
+        # Table lama yang belum dimigrate kekal biasa (amaran dilog, ingest tetap jalan)
+        init_partitioned_tables(db.engine)
         db.create_all()
+        upgrade_schema()
         
         # Create admin user jika belum wujud
         if not User.query.filter_by(username='admin').first():
@@ -0,0 +1,133 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class FileSkipped(Exception):
+    """Dibangkitkan oleh prepare/write bila fail patut di-skip (bukan error)."""
+
+
+def run_files(files, prepare, write, workers=1, db_workers=1, on_skip=None):
+    """Proses senarai fail dan pulangkan summary per fail.
+
+    prepare(file_path) -> DataFrame: parse + clean. Mesti fungsi module-level
+    supaya boleh dihantar ke process pool.
+    write(file_path, df) -> (rekod disimpan, rekod duplicate yang di-skip).
+    on_skip(file_path): dipanggil untuk fail FileSkipped (cth. rekod dalam manifest
+    supaya fail yang sama tak diimbas semula pada run seterusnya).
+
+    workers <= 1 jalan secara serial. Jika tidak, parse berjalan dalam process
+    pool dan write dalam thread pool bersaiz db_workers (had sambungan DB).
+    Bilangan fail dalam proses pada satu masa dihadkan supaya DataFrame yang
+    menunggu giliran write tak menimbun dalam memori.
+    """
+    if workers <= 1:
+        return [_write_result(path, _timed_prepare(prepare, path), write, on_skip) for path in files]
+
+    summary = []
+    max_in_flight = workers + db_workers
+    pending_parse = {}
+    pending_write = set()
+    files_iter = iter(files)
+
+    with ProcessPoolExecutor(max_workers=workers) as parse_pool, \
+            ThreadPoolExecutor(max_workers=db_workers) as db_pool:
+        while True:
+            while len(pending_parse) + len(pending_write) < max_in_flight:
+                path = next(files_iter, None)
+                if path is None:
+                    break
+                pending_parse[parse_pool.submit(_timed_prepare, prepare, path)] = path
+
+            if not pending_parse and not pending_write:
+                break
+
+            done, _ = wait(set(pending_parse) | pending_write, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in pending_parse:
+                    path = pending_parse.pop(future)
+                    try:
+                        prepared = future.result()
+                    except Exception as e:
+                        # Contoh: worker process mati
+                        summary.append(file_result(path, 'error', message=str(e)))
+                        continue
+                    pending_write.add(db_pool.submit(_write_result, path, prepared, write, on_skip))
+                else:
+                    pending_write.discard(future)
+                    summary.append(future.result())
+
+    return sorted(summary, key=lambda r: r['file'])
+
+
+def _timed_prepare(prepare, path):
+    started = time.perf_counter()
+    try:
+        return 'ok', prepare(path), time.perf_counter() - started
+    except FileSkipped as e:
+        return 'skip', str(e), time.perf_counter() - started
+    except Exception as e:
+        return 'error', str(e), time.perf_counter() - started
+
+
+def _write_result(path, prepared, write, on_skip=None):
+    status, payload, parse_seconds = prepared
+    if status == 'skip':
+        _record_skip(on_skip, path)
+    if status != 'ok':
+        return file_result(path, status, message=payload, parse_seconds=parse_seconds)
+
+    started = time.perf_counter()
+    try:
+        rows, duplicates = write(path, payload)
+        return file_result(path, 'ok', rows=rows, duplicates=duplicates, parse_seconds=parse_seconds,
+                           write_seconds=time.perf_counter() - started)
+    except FileSkipped as e:
+        _record_skip(on_skip, path)
+        return file_result(path, 'skip', message=str(e), parse_seconds=parse_seconds,
+                           write_seconds=time.perf_counter() - started)
+    except Exception as e:
+        return file_result(path, 'error', message=str(e), parse_seconds=parse_seconds,
+                           write_seconds=time.perf_counter() - started)
+
+
+def _record_skip(on_skip, path):
+    if on_skip is None:
+        return
+    try:
+        on_skip(path)
+    except Exception as e:
+        # Gagal rekod manifest tak patut ubah status fail
+        print(f"   ⚠️  Gagal rekod fail skip dalam manifest {os.path.basename(path)}: {e}")
+
+
+def file_result(path, status, rows=0, duplicates=0, message=None, parse_seconds=0.0, write_seconds=0.0):
+    """Satu baris summary untuk satu fail."""
+    return {
+        'file': os.path.basename(path),
+        'status': status,
+        'rows': rows,
+        'duplicates': duplicates,
+        'message': message,
+        'parse_seconds': round(parse_seconds, 3),
+        'write_seconds': round(write_seconds, 3)
+    }
+
+
+def print_summary(label, summary, elapsed):
+    """Cetak ringkasan run: jumlah ok/skip/error dan fail yang bermasalah."""
+    counts = {'ok': 0, 'skip': 0, 'error': 0}
+    rows = 0
+    duplicates = 0
+    for item in summary:
+        counts[item['status']] += 1
+        rows += item['rows']
+        duplicates += item['duplicates']
+
+    rate = rows / elapsed if elapsed else 0
+    print(f"   📊 [{label}] {len(summary)} fail: {counts['ok']} OK, {counts['skip']} SKIP, "
+          f"{counts['error']} ERROR | {rows} rekod baru, {duplicates} duplicate "
+          f"dalam {elapsed:.1f}s ({rate:,.0f} rekod/s)")
+    for item in summary:
+        if item['status'] != 'ok':
+            print(f"      - {item['status'].upper()} {item['file']}: {item['message']}")
@@ -0,0 +1,126 @@
+"""Benchmark: pembersihan amaun lama (rantai str.replace + to_numeric, float64) vs parse_cents.
+
+Format amaun khas (tolak di belakang, kurungan, kod mata wang selain RM) disemak
+dahulu terhadap nilai jangkaan dan magnitud dari pembersihan lama.
+Ukur throughput pada kolum teks 1M baris ('RM1,234.50' dsb.), kemudian semak
+ketepatan: nilai ditulis ke kolum NUMERIC(12, 2) melalui COPY dan dibaca semula
+sebagai sen. Semakan DB dilangkau jika database tidak dapat dihubungi.
+
+    BENCH_DATABASE_URL=postgresql://... python benchmarks/bench_amount_parsing.py [rows] [unique_values]
+"""
+import io
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from synthetic import get_engine
+from amount_parsing import parse_cents, cents_to_decimal
+
+
+# nilai mentah -> sen jangkaan (None = rosak/kosong)
+FORMAT_CASES = {
+    'RM1,234.50': 123450,
+    '-RM 5.00': -500,
+    '12.50-': -1250,
+    '(12.50)': -1250,
+    '(RM 1,000.00)': -100000,
+    'MYR 10.00': 1000,
+    '10.00 MYR': 1000,
+    'USD 7.5': 750,
+    'N/A': None,
+    '': None,
+}
+
+
+def check_formats():
+    """parse_cents sama dengan jangkaan; magnitud sama dengan pembersihan lama (yang buang tanda)."""
+    column = pd.Series(list(FORMAT_CASES), name='amount_rm')
+    cents, bad = parse_cents(column)
+    parsed = [None if is_bad else int(value) for value, is_bad in zip(cents, bad)]
+    assert parsed == list(FORMAT_CASES.values()), f"Format amaun berbeza: {parsed}"
+
+    old = legacy(column)
+    for raw, expected, old_value in zip(FORMAT_CASES, FORMAT_CASES.values(), old):
+        if expected is not None:
+            assert abs(expected) == round(old_value * 100), f"Magnitud berbeza dari cara lama: {raw!r}"
+    print(f"Format khas: {len(FORMAT_CASES)} kes sama")
+
+
+def make_column(n_rows, n_unique, seed=0):
+    rng = np.random.default_rng(seed)
+    # Sebahagian nilai ada 3 t.p. (kes pembundaran) dan sebahagian rosak
+    values = rng.integers(100, 500000000, n_unique) / 1000
+    text_values = np.array([f'RM{value:,.3f}' if i % 10 == 0 else f'RM{value:,.2f}'
+                            for i, value in enumerate(values)], dtype=object)
+    text_values[::997] = 'N/A'
+    return pd.Series(text_values[rng.integers(0, n_unique, n_rows)], name='amount_rm')
+
+
+def legacy(column):
+    cleaned = (
+        column.astype(str)
+        .str.replace('RM', '', case=False)
+        .str.replace(',', '')
+        .str.replace('[^0-9.]', '', regex=True)
+    )
+    return pd.to_numeric(cleaned, errors='coerce')
+
+
+def db_cents(engine, decimals):
+    """Tulis Decimal ke NUMERIC(12, 2) melalui COPY dan baca semula sebagai sen."""
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute("CREATE TEMP TABLE bench_amount (i BIGINT, v NUMERIC(12, 2))")
+        buffer = io.StringIO()
+        pd.DataFrame({'i': np.arange(len(decimals)), 'v': decimals}).to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        cursor.copy_expert("COPY bench_amount (i, v) FROM STDIN WITH (FORMAT csv)", buffer)
+        cursor.execute("SELECT (v * 100)::bigint FROM bench_amount ORDER BY i")
+        return np.array([row[0] for row in cursor.fetchall()], dtype=np.int64)
+    finally:
+        raw.rollback()
+        raw.close()
+
+
+def run(n_rows, n_unique):
+    check_formats()
+    column = make_column(n_rows, n_unique)
+    print(f"{n_rows:,} baris, {n_unique:,} nilai unik")
+
+    started = time.perf_counter()
+    old = legacy(column)
+    old_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    cents, bad = parse_cents(column)
+    new_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    decimals = cents_to_decimal(cents, bad)
+    decimal_s = time.perf_counter() - started
+
+    print(f"lama   {old_s:6.2f}s ({n_rows / old_s:12,.0f} baris/s)")
+    print(f"baru   {new_s:6.2f}s ({n_rows / new_s:12,.0f} baris/s) + Decimal {decimal_s:5.2f}s "
+          f"| {int(bad.sum()):,} nilai rosak")
+
+    sample = np.random.default_rng(1).choice(n_rows, min(n_rows, 200000), replace=False)
+    try:
+        stored = db_cents(get_engine(), decimals[sample])
+    except Exception as e:
+        print(f"Semakan DB dilangkau: {e}")
+        return
+
+    valid = ~bad[sample]
+    exact = int((stored[valid] == cents[sample][valid]).sum())
+    legacy_cents = np.rint(old.to_numpy()[sample][valid] * 100)
+    drift = int((legacy_cents != stored[valid]).sum())
+    print(f"Semakan DB ({valid.sum():,} nilai): parse_cents sama tepat {exact:,}, "
+          f"float lama berbeza {drift:,}")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 50000)
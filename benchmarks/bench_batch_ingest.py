@@ -0,0 +1,48 @@
+"""Benchmark: eod_processor.EODProcessor.run serial vs parallel.
+
+    BENCH_DATABASE_URL=postgresql://... python benchmarks/bench_batch_ingest.py [files] [rows_per_file]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import text
+
+from synthetic import get_engine, make_eod_frame, write_eod_report
+from eod_processor import EODProcessor
+
+
+def run(n_files, rows_per_file):
+    engine = get_engine()
+    workers = os.cpu_count() or 2
+
+    with tempfile.TemporaryDirectory() as folder:
+        for i in range(n_files):
+            df = make_eod_frame(rows_per_file, seed=i + 1)
+            df['terminal_name'] = 'BENCH_BATCH'
+            write_eod_report(os.path.join(folder, f'eod_{i:04d}.csv'), df)
+
+        results = {}
+        for label, n_workers in (('serial', 1), (f'parallel x{workers}', workers)):
+            with engine.begin() as conn:
+                conn.execute(text("DELETE FROM transaksi_eod WHERE terminal_name = 'BENCH_BATCH'"))
+
+            processor = EODProcessor(engine, folder, workers=n_workers, db_workers=min(workers, 4), incremental=False)
+            started = time.perf_counter()
+            summary = processor.run()
+            elapsed = time.perf_counter() - started
+            rows = sum(item['rows'] for item in summary)
+            results[label] = elapsed
+            print(f"{label:>14}: {elapsed:.2f}s, {rows / elapsed:,.0f} rows/s, {n_files / elapsed:.1f} files/s")
+
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM transaksi_eod WHERE terminal_name = 'BENCH_BATCH'"))
+
+    serial, parallel = results.values()
+    print(f"speedup: {serial / parallel:.1f}x")
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:]]
+    run(*(args + [200, 5000][len(args):]))
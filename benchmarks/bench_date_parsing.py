@@ -0,0 +1,85 @@
+"""Benchmark: parse tarikh lama (to_datetime atas kolum penuh, satu kali per format) vs parse_dates.
+
+Kolum 1M baris dibina dari beberapa ribu nilai unik, seperti fail transaksi sebenar.
+Termasuk kolum e-merchant dengan tarikh slash yang taksa (01/02/2024) supaya
+susunan bulan-dahulu yang lama kekal. Tidak perlukan database.
+
+    python benchmarks/bench_date_parsing.py [rows] [unique_values]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import synthetic  # noqa: F401  (tambah ROOT ke sys.path)
+from date_parsing import parse_dates, EOD_DATE_FORMATS, EMERCHANT_DATE_FORMATS
+
+
+def make_columns(n_rows, n_unique, seed=0):
+    rng = np.random.default_rng(seed)
+    stamps = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 90 * 86400, n_unique), unit='s')
+    stamps = stamps.floor('min')
+    # EOD: dua format bercampur (seperti laporan terminal berbeza)
+    eod_unique = np.where(rng.random(n_unique) < 0.7,
+                          stamps.strftime('%d/%m/%Y %H:%M'), stamps.strftime('%d %b %Y %H:%M:%S'))
+    picks = rng.integers(0, n_unique, n_rows)
+    eod = pd.Series(eod_unique[picks])
+    emerchant = pd.Series(stamps.strftime('%d-%b-%Y').to_numpy()[picks])
+    # Hari <= 12: setiap nilai sah sebagai %m/%d/%Y dan %d/%m/%Y
+    ambiguous_unique = stamps[stamps.day <= 12].strftime('%m/%d/%Y').to_numpy()
+    ambiguous = pd.Series(ambiguous_unique[rng.integers(0, len(ambiguous_unique), n_rows)])
+    return eod, emerchant, ambiguous
+
+
+def legacy_eod(column):
+    f1 = pd.to_datetime(column, format='%d/%m/%Y %H:%M', errors='coerce')
+    f2 = pd.to_datetime(column, format='%d %b %Y %H:%M:%S', errors='coerce')
+    return f1.fillna(f2)
+
+
+def legacy_emerchant(column):
+    try:
+        return pd.to_datetime(column).dt.date
+    except Exception:
+        for fmt in ['%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%Y%m%d', '%d-%b-%Y']:
+            try:
+                return pd.to_datetime(column, format=fmt).dt.date
+            except Exception:
+                continue
+    return column
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def run(n_rows, n_unique):
+    eod, emerchant, ambiguous = make_columns(n_rows, n_unique)
+    print(f"{n_rows:,} baris, {n_unique:,} nilai unik")
+
+    old, old_s = timed(lambda: legacy_eod(eod))
+    new, first_s = timed(lambda: parse_dates(eod, EOD_DATE_FORMATS, source='bench_eod'))
+    _, warm_s = timed(lambda: parse_dates(eod, EOD_DATE_FORMATS, source='bench_eod'))
+    assert old.equals(new), "Hasil EOD berbeza"
+    print(f"EOD       lama {old_s:6.2f}s | baru {first_s:6.2f}s (format dipelajari: {warm_s:6.2f}s) "
+          f"| {old_s / warm_s:5.1f}x")
+
+    old, old_s = timed(lambda: legacy_emerchant(emerchant))
+    new, first_s = timed(lambda: parse_dates(emerchant, EMERCHANT_DATE_FORMATS, source='bench_em', infer=True).dt.date)
+    _, warm_s = timed(lambda: parse_dates(emerchant, EMERCHANT_DATE_FORMATS, source='bench_em', infer=True))
+    assert old.equals(new), "Hasil e-merchant berbeza"
+    print(f"eMerchant lama {old_s:6.2f}s | baru {first_s:6.2f}s (format dipelajari: {warm_s:6.2f}s) "
+          f"| {old_s / warm_s:5.1f}x")
+
+    old = legacy_emerchant(ambiguous)
+    new = parse_dates(ambiguous, EMERCHANT_DATE_FORMATS, source='bench_em_ambiguous', infer=True).dt.date
+    assert old.equals(new), "Tarikh slash taksa dibaca berbeza (bulan/hari tertukar)"
+    print(f"eMerchant taksa: sama ({ambiguous.iloc[0]} -> {new.iloc[0]})")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 5000)
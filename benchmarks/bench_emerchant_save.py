@@ -0,0 +1,36 @@
+"""Benchmark: throughput EMerchantProcessor._save_to_database ikut saiz batch.
+
+    BENCH_DATABASE_URL=postgresql://... python benchmarks/bench_emerchant_save.py [rows]
+"""
+import sys
+import time
+
+from sqlalchemy import text
+
+from synthetic import get_engine, make_emerchant_frame
+from app import EMerchantProcessor
+
+BATCH_SIZES = [10, 100, 1000, 5000, 20000]
+
+
+def run(n_rows):
+    engine = get_engine()
+    for seed, batch_size in enumerate(BATCH_SIZES, start=1):
+        batch_id = f'BENCH_EMERCH_{batch_size}'
+        df = make_emerchant_frame(n_rows, seed=seed, batch_id=batch_id)
+        processor = EMerchantProcessor(engine, filename='bench_emerchant.csv', batch_size=batch_size)
+
+        started = time.perf_counter()
+        stats = processor._save_to_database(df)
+        elapsed = time.perf_counter() - started
+
+        print(f"batch_size={batch_size:>6}: {elapsed:7.2f}s {n_rows / elapsed:>10,.0f} rows/s "
+              f"inserted={stats['inserted']} duplicates={stats['duplicates']} "
+              f"rejected={stats['rejected']} batches={len(stats['batches'])}")
+
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM transaksi_emerchant WHERE batch_id = :b"), {'b': batch_id})
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,73 @@
+"""Benchmark: /api/emerchant/stats lama (load semua ORM object) vs query agregat.
+
+Latency query agregat sepatutnya kekal rendah bila bilangan rekod pengguna naik.
+
+    BENCH_DATABASE_URL=postgresql://... python benchmarks/bench_emerchant_stats.py <user_id> [max_rows]
+"""
+import sys
+import time
+from datetime import date
+
+from sqlalchemy import text
+
+from synthetic import get_engine, make_emerchant_frame
+from app import app, db, emerchant_stats, EMerchantProcessor
+from models import TransaksiEmerchant
+
+BATCH_ID = 'BENCH_STATS'
+TODAY = date(2024, 1, 15)
+
+
+def legacy_stats(user_id, today):
+    """Logik asal get_emerchant_stats."""
+    today_transactions = TransaksiEmerchant.query.filter(
+        TransaksiEmerchant.uploaded_by == user_id,
+        TransaksiEmerchant.transaction_date == today
+    ).all()
+    merchant_dist = {}
+    for trans in TransaksiEmerchant.query.filter_by(uploaded_by=user_id).all():
+        merchant = trans.merchant_code or 'unknown'
+        merchant_dist[merchant] = merchant_dist.get(merchant, 0) + 1
+    return {
+        'today_count': len(today_transactions),
+        'today_amount': sum(float(t.amount or 0) for t in today_transactions),
+        'merchant_distribution': merchant_dist
+    }
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def run(user_id, max_rows):
+    engine = get_engine()
+    app.config['SQLALCHEMY_DATABASE_URI'] = str(engine.url)
+    sizes = [max_rows // 8, max_rows // 4, max_rows // 2, max_rows]
+
+    with app.app_context():
+        loaded = 0
+        for seed, size in enumerate(sizes, start=1):
+            df = make_emerchant_frame(size - loaded, seed=seed, batch_id=BATCH_ID, user_id=user_id)
+            EMerchantProcessor(engine, filename='bench_emerchant.csv', user_id=user_id)._save_to_database(df)
+            loaded = size
+            with engine.begin() as conn:
+                conn.execute(text("ANALYZE transaksi_emerchant"))
+
+            db.session.expunge_all()
+            old, old_s = timed(legacy_stats, user_id, TODAY)
+            db.session.expunge_all()
+            new, new_s = timed(emerchant_stats, user_id, TODAY)
+            same = (old['today_count'] == new['today_count']
+                    and abs(old['today_amount'] - new['today_amount']) < 0.01
+                    and old['merchant_distribution'] == new['merchant_distribution'])
+            print(f"rows={size:>9,}: lama {old_s:8.3f}s | agregat {new_s:8.3f}s "
+                  f"(x{old_s / new_s:,.0f}) average_fee={new['average_fee']}% sama={'YA' if same else 'TIDAK'}")
+
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM transaksi_emerchant WHERE batch_id = :b"), {'b': BATCH_ID})
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]), int(sys.argv[2]) if len(sys.argv) > 2 else 1000000)
@@ -0,0 +1,44 @@
+"""Benchmark: EODProcessor bulk COPY vs loop INSERT satu-satu.
+
+    BENCH_DATABASE_URL=postgresql://... python benchmarks/bench_eod_save.py [rows]
+"""
+import sys
+import time
+
+from sqlalchemy import text
+
+from synthetic import get_engine, make_eod_frame
+from app import EODProcessor
+
+
+def run(n_rows):
+    engine = get_engine()
+    results = {}
+    for mode, bulk in (('row_by_row', False), ('bulk_copy', True)):
+        batch_id = f'BENCH_EOD_{mode}'
+        # Seed berbeza supaya setiap mode masukkan rekod baru
+        df = make_eod_frame(n_rows, seed=1 if bulk else 2, batch_id=batch_id)
+        processor = EODProcessor(engine, filename='bench_eod.csv', bulk_load=bulk)
+        processor._init_table()
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM transaksi_eod WHERE batch_id = :b"), {'b': batch_id})
+
+        started = time.perf_counter()
+        stats = processor._save_to_database(df)
+        elapsed = time.perf_counter() - started
+
+        # Run kedua: semua rekod sepatutnya dikira duplicate
+        dup_stats = processor._save_to_database(df)
+
+        results[mode] = elapsed
+        print(f"{mode:>12}: {n_rows} rows in {elapsed:.2f}s "
+              f"({n_rows / elapsed:,.0f} rows/s) first={stats} rerun={dup_stats}")
+
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM transaksi_eod WHERE batch_id = :b"), {'b': batch_id})
+
+    print(f"speedup: {results['row_by_row'] / results['bulk_copy']:.1f}x")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
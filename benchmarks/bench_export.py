@@ -0,0 +1,55 @@
+"""Benchmark: export recon streaming vs muat semua ke DataFrame dahulu.
+
+Guna data sedia ada pengguna (cth. dari bench_view_search.py). Untuk setiap format,
+ukur masa, saiz fail dan puncak memori Python (tracemalloc).
+
+    BENCH_DATABASE_URL=postgresql://... python benchmarks/bench_export.py <user_id> <start> <end>
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+from sqlalchemy import text
+
+from synthetic import get_engine
+from recon_export import RECON_EXPORT_SQL, RECON_EXPORT_COLUMNS, check_format, export_to_file, iter_query_frames
+
+
+def measure(label, work):
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = work()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<22} {elapsed:8.2f}s  {size / 1e6:9.1f} MB fail  puncak {peak / 1e6:9.1f} MB")
+
+
+def run(user_id, start_date, end_date):
+    engine = get_engine()
+    params = {'user_id': user_id, 'start_date': start_date, 'end_date': end_date}
+    path = os.path.join(tempfile.gettempdir(), 'bench_export.out')
+
+    def legacy_csv():
+        df = pd.read_sql(text(RECON_EXPORT_SQL), engine, params=params)
+        df.to_csv(path, index=False)
+        return os.path.getsize(path)
+
+    measure('csv (muat penuh)', legacy_csv)
+    for fmt in ('csv', 'xlsx', 'parquet'):
+        try:
+            check_format(fmt)
+        except ValueError as e:
+            print(f"{fmt:<22} dilangkau: {e}")
+            continue
+        measure(f"{fmt} (stream)",
+                lambda: export_to_file(iter_query_frames(engine, RECON_EXPORT_SQL, params), path, fmt,
+                                       RECON_EXPORT_COLUMNS))
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]), sys.argv[2], sys.argv[3])
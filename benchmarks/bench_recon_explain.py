@@ -0,0 +1,56 @@
+"""Tangkap EXPLAIN (ANALYZE, BUFFERS) untuk join ReconProcessor sebelum dan selepas.
+
+Sebelum: join asal (cast ::date pada kedua-dua belah, tanpa julat tarikh).
+Selepas: ReconProcessor._build_query() (kolum generated + index komposit + julat tarikh).
+
+    BENCH_DATABASE_URL=postgresql://... python benchmarks/bench_recon_explain.py 2024-01-01 2024-01-31 [output.txt]
+"""
+import sys
+import time
+from datetime import date
+
+from sqlalchemy import text
+
+from synthetic import get_engine
+from recon_processor import ReconProcessor, init_recon_schema
+
+LEGACY_QUERY = """
+SELECT e.date_of_transaction, m.tran_date, e.card_number, e.receipt, e.approval_code,
+       m.auth_code, e.amount_rm, m.amount, m.card_number
+FROM transaksi_eod e
+FULL OUTER JOIN transaksi_merchant m
+ON e.date_of_transaction::date = m.tran_date::date
+AND e.approval_code = m.auth_code
+AND e.amount_rm = m.amount
+WHERE e.approval_code IS NULL OR m.auth_code IS NULL
+"""
+
+
+def explain(conn, query, params):
+    started = time.perf_counter()
+    rows = conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {query.rstrip().rstrip(';')}"), params).fetchall()
+    return '\n'.join(row[0] for row in rows), time.perf_counter() - started
+
+
+def run(start_date, end_date, output=None):
+    engine = get_engine()
+    init_recon_schema(engine)
+    processor = ReconProcessor(engine, start_date=start_date, end_date=end_date)
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE transaksi_eod; ANALYZE transaksi_merchant;"))
+        before, before_s = explain(conn, LEGACY_QUERY, {})
+        query, params = processor._build_query()
+        after, after_s = explain(conn, query, params)
+
+    report = (
+        f"=== BEFORE (cast join, full history) {before_s:.2f}s ===\n{before}\n\n"
+        f"=== AFTER (generated date + composite index, {start_date}..{end_date}) {after_s:.2f}s ===\n{after}\n"
+    )
+    print(report)
+    if output:
+        with open(output, 'w') as f:
+            f.write(report)
+
+
+if __name__ == '__main__':
+    run(date.fromisoformat(sys.argv[1]), date.fromisoformat(sys.argv[2]), sys.argv[3] if len(sys.argv) > 3 else None)
@@ -0,0 +1,75 @@
+"""Benchmark: pass fuzzy ReconEngine pada baki unmatched, ikut saiz data.
+
+Setiap transaksi e-merchant ialah salinan EOD dengan amaun/hari sedikit lari
+(jadi pass exact tak padan), ditambah noise yang tiada pasangan. Masa per baris
+sepatutnya hampir malar bila saiz naik (blocking hari + bucket amaun).
+
+    BENCH_DATABASE_URL=postgresql://... python benchmarks/bench_recon_fuzzy.py <user_id> [rows]
+"""
+import sys
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from synthetic import get_engine, make_eod_frame, make_emerchant_frame
+from app import EODProcessor, EMerchantProcessor
+from recon_engine import ReconEngine
+
+BATCH_ID = 'BENCH_FUZZY'
+
+
+def make_pairs(n_rows, user_id, seed=0):
+    """EOD + e-merchant 'hampir sama' (90%) dan noise e-merchant (10%)."""
+    rng = np.random.default_rng(seed)
+    eod = make_eod_frame(n_rows, seed=seed, batch_id=BATCH_ID, user_id=user_id)
+
+    n_pairs = int(n_rows * 0.9)
+    shifted = eod.iloc[:n_pairs]
+    cents = rng.integers(1, 50, n_pairs) * rng.choice([-1, 1], n_pairs) / 100
+    day_shift = pd.to_timedelta(rng.choice([0, 0, 0, 1], n_pairs), unit='D')
+    paired = make_emerchant_frame(n_pairs, seed=seed, batch_id=BATCH_ID, user_id=user_id)
+    paired['transaction_date'] = (shifted['date_of_transaction'] + day_shift).dt.date.values
+    paired['amount'] = np.round(shifted['amount_rm'].values + cents, 2)
+    paired['order_id'] = shifted['ref_number'].values
+
+    noise = make_emerchant_frame(n_rows - n_pairs, seed=seed + 1, batch_id=BATCH_ID, user_id=user_id)
+    return eod, pd.concat([paired, noise], ignore_index=True)
+
+
+def cleanup(engine):
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM transaksi_eod WHERE batch_id = :b"), {'b': BATCH_ID})
+        conn.execute(text("DELETE FROM transaksi_emerchant WHERE batch_id = :b"), {'b': BATCH_ID})
+
+
+def run(user_id, max_rows):
+    engine = get_engine()
+    sizes = [max_rows // 8, max_rows // 4, max_rows // 2, max_rows]
+    criteria = {'autoMatchExact': False, 'autoMatchPartial': False}
+
+    for size in sizes:
+        cleanup(engine)
+        eod, emerchant = make_pairs(size, user_id)
+        EODProcessor(engine, filename='bench_eod.csv', user_id=user_id)._save_to_database(eod)
+        EMerchantProcessor(engine, filename='bench_emerchant.csv', user_id=user_id)._save_to_database(emerchant)
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE transaksi_eod; ANALYZE transaksi_emerchant;"))
+
+        started = time.perf_counter()
+        result = ReconEngine(engine, user_id).run(
+            date(2024, 1, 1), date(2024, 2, 1), criteria=criteria, threshold=60, per_page=1
+        )
+        elapsed = time.perf_counter() - started
+        summary = result['summary']
+        print(f"rows={size:>8,}: {elapsed:7.2f}s {elapsed / size * 1e6:7.2f} us/row "
+              f"exact={summary['matched']} partial={summary['partial_matches']} "
+              f"unmatched_eod={summary['unmatched_eod']} unmatched_emerchant={summary['unmatched_emerchant']}")
+
+    cleanup(engine)
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]), int(sys.argv[2]) if len(sys.argv) > 2 else 500000)
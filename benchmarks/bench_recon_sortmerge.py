@@ -0,0 +1,67 @@
+"""Benchmark: SortMergeRecon (NumPy, dalam memori) vs ReconProcessor (FULL OUTER JOIN SQL).
+
+Semak hasil kedua-dua enjin sama (selepas disusun) dan laporkan speedup.
+Masa SortMergeRecon dipecah kepada load (sekali) dan merge (diulang untuk what-if).
+
+    BENCH_DATABASE_URL=postgresql://... python benchmarks/bench_recon_sortmerge.py 2024-01-01 2024-01-31 [repeat]
+"""
+import sys
+import time
+from datetime import date
+
+import pandas as pd
+
+from synthetic import get_engine
+from recon_processor import ReconProcessor, init_recon_schema
+from sortmerge_recon import SortMergeRecon, RECON_COLUMNS
+
+
+def canonical(df):
+    """Normalkan dtype (Decimal/float, tarikh) dan susunan baris untuk perbandingan."""
+    out = df[RECON_COLUMNS].copy()
+    for col in ('eod_amount', 'merch_amount'):
+        out[col] = pd.to_numeric(out[col]).round(2)
+    for col in ('eod_date', 'merch_date'):
+        out[col] = pd.to_datetime(out[col])
+    for col in ('eod_card', 'eod_receipt', 'eod_auth', 'merch_auth', 'merch_card'):
+        out[col] = out[col].astype(object).where(out[col].notna(), None)
+    return out.sort_values(RECON_COLUMNS, na_position='last').reset_index(drop=True)
+
+
+def run(start_date, end_date, repeat=3):
+    engine = get_engine()
+    init_recon_schema(engine)
+    sql = ReconProcessor(engine, start_date=start_date, end_date=end_date)
+
+    sql_times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        sql_result = sql.reconcile()
+        sql_times.append(time.perf_counter() - started)
+
+    memory = SortMergeRecon(engine, start_date=start_date, end_date=end_date)
+    started = time.perf_counter()
+    memory.load()
+    load_s = time.perf_counter() - started
+
+    merge_times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        memory_result = memory.run()
+        merge_times.append(time.perf_counter() - started)
+
+    identical = canonical(sql_result).equals(canonical(memory_result))
+    sql_s, merge_s = min(sql_times), min(merge_times)
+    print(f"rows: eod={len(memory.eod):,} merchant={len(memory.merchant):,} unmatched={len(memory_result):,}")
+    print(f"SQL full outer join : {sql_s:8.3f}s")
+    print(f"sort-merge load     : {load_s:8.3f}s (sekali)")
+    print(f"sort-merge run      : {merge_s:8.3f}s  speedup x{sql_s / merge_s:,.1f} "
+          f"(termasuk load x{sql_s / (load_s + merge_s):,.1f})")
+    print(f"hasil sama          : {'YA' if identical else 'TIDAK'}")
+    return identical
+
+
+if __name__ == '__main__':
+    ok = run(date.fromisoformat(sys.argv[1]), date.fromisoformat(sys.argv[2]),
+             int(sys.argv[3]) if len(sys.argv) > 3 else 3)
+    sys.exit(0 if ok else 1)
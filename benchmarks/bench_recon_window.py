@@ -0,0 +1,79 @@
+"""Benchmark: window join bertoleransi vs join tepat pada data sintetik yang condong.
+
+Belah merchant ialah salinan EOD dengan masa lari beberapa minit (sebahagian
+melintasi tengah malam) dan amaun ditolak fee kecil. Auth code diambil dari
+taburan Zipf supaya sesetengah kod sangat kerap (window besar). Tiada DB.
+
+Semakan regresi: merchant dengan tran_date tarikh sahaja (tengah malam) dan
+toleransi amaun/fee tanpa time_tolerance mesti padan pada hari yang sama.
+
+    python benchmarks/bench_recon_window.py [rows] [minit] [fee_pct]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import synthetic  # noqa: F401  (tambah ROOT ke sys.path)
+from sortmerge_recon import SortMergeRecon, recon_keys, unmatched_masks, window_unmatched_masks
+
+
+def make_skewed(n_rows, max_shift_minutes, fee_pct, seed=0):
+    rng = np.random.default_rng(seed)
+    start = np.datetime64('2024-01-01T00:00:00')
+    eod_time = pd.Series(start + rng.integers(0, 30 * 24 * 3600, n_rows).astype('timedelta64[s]'))
+    # Auth code condong: beberapa kod (contoh '000000') muncul beribu kali
+    auth = pd.Series(np.minimum(rng.zipf(1.3, n_rows), 999999)).astype(str).str.zfill(6)
+    amount = np.round(rng.uniform(1, 2000, n_rows), 2)
+
+    shift = rng.integers(-max_shift_minutes, max_shift_minutes + 1, n_rows).astype('timedelta64[m]')
+    fee = np.round(amount * rng.uniform(0, fee_pct, n_rows) / 100, 2)
+    merch_time = eod_time + pd.to_timedelta(shift)
+    return (eod_time, auth, amount), (merch_time, auth.copy(), np.round(amount - fee, 2))
+
+
+def run(n_rows, minutes, fee_pct):
+    (e_time, e_auth, e_amount), (m_time, m_auth, m_amount) = make_skewed(n_rows, minutes, fee_pct)
+    codes, _ = pd.factorize(pd.concat([e_auth, m_auth], ignore_index=True))
+
+    started = time.perf_counter()
+    exact_eod, exact_merch = unmatched_masks(
+        recon_keys(e_time, codes[:n_rows], e_amount), recon_keys(m_time, codes[n_rows:], m_amount)
+    )
+    exact_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    window_eod, window_merch = window_unmatched_masks(
+        recon_keys(e_time, codes[:n_rows], e_amount, unit='s'),
+        recon_keys(m_time, codes[n_rows:], m_amount, unit='s'),
+        time_tolerance=minutes * 60, amount_tolerance=1, fee_pct=fee_pct
+    )
+    window_s = time.perf_counter() - started
+
+    crossed_midnight = int((e_time.dt.date != m_time.dt.date).sum())
+    print(f"rows={n_rows:,} (±{minutes} minit, fee ≤{fee_pct}%), {crossed_midnight:,} lintas tengah malam")
+    print(f"join tepat  : {exact_s:7.3f}s  padan EOD {n_rows - exact_eod.sum():>10,} / {n_rows:,}")
+    print(f"window join : {window_s:7.3f}s  padan EOD {n_rows - window_eod.sum():>10,} / {n_rows:,} "
+          f"(merchant {n_rows - window_merch.sum():,})")
+    print(f"dipulihkan  : {int(exact_eod.sum() - window_eod.sum()):,} transaksi")
+
+
+def check_date_only(n_rows, fee_pct):
+    """Merchant tarikh sahaja + toleransi amaun/fee: semua pasangan hari yang sama mesti padan."""
+    (e_time, e_auth, e_amount), (_, m_auth, m_amount) = make_skewed(n_rows, 0, fee_pct, seed=1)
+    recon = SortMergeRecon(None, amount_tolerance=0.01, fee_pct=fee_pct)
+    recon.eod = pd.DataFrame({'date_of_transaction': e_time, 'card_number': None, 'receipt': None,
+                              'approval_code': e_auth, 'amount_rm': e_amount})
+    recon.merchant = pd.DataFrame({'tran_date': e_time.dt.normalize(), 'card_number': None,
+                                   'auth_code': m_auth, 'amount': m_amount})
+    unmatched = len(recon.run())
+    print(f"tarikh sahaja: {unmatched:,} tak padan (jangkaan 0)")
+    assert unmatched == 0, "merchant tarikh sahaja tidak padan pada hari yang sama"
+
+
+if __name__ == '__main__':
+    check_date_only(100000, float(sys.argv[3]) if len(sys.argv) > 3 else 2.0)
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 15,
+        float(sys.argv[3]) if len(sys.argv) > 3 else 2.0)
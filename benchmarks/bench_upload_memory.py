@@ -0,0 +1,78 @@
+"""Benchmark: memori cleaning upload dengan dtype object (sebelum) vs dtype padat (selepas).
+
+Fail laporan EOD dan CSV e-merchant sintetik dibaca dan dibersihkan seperti
+upload sebenar (tanpa simpan ke DB). Dilaporkan: puncak memori Python semasa
+baca + cleaning (tracemalloc) dan saiz frame hasil cleaning (memory_usage deep).
+Nota: buffer Arrow tidak dijejak oleh tracemalloc, jadi saiz frame lebih tepat
+untuk kolum string[pyarrow].
+
+    python benchmarks/bench_upload_memory.py [rows]
+"""
+import os
+import sys
+import tempfile
+import tracemalloc
+
+import pandas as pd
+
+from synthetic import make_eod_frame, make_emerchant_frame, write_eod_report
+from app import EODProcessor, EMerchantProcessor, HEADER_SEARCH_ROWS
+from upload_reader import locate_header
+
+
+def write_emerchant_csv(path, df):
+    """CSV e-merchant dengan nama kolum alias (diuji rename) dan amaun berformat RM."""
+    pd.DataFrame({
+        'Order Date': pd.to_datetime(df['transaction_date']).dt.strftime('%d-%b-%Y'),
+        'OrderID': df['order_id'],
+        'Merchant': df['merchant_code'],
+        'Store': df['store_id'],
+        'Payment': df['payment_method'],
+        'Total': df['amount'].map(lambda x: f'RM{x:,.2f}'),
+        'Fee Amount': df['fee'],
+        'Net': df['net_amount'],
+        'Status': df['status'],
+    }).to_csv(path, index=False)
+
+
+def clean_eod(path, compact):
+    processor = EODProcessor(None, filename=os.path.basename(path), compact=compact)
+    header_idx, header_values = locate_header(path, 'terminal name', occurrence=2, max_rows=HEADER_SEARCH_ROWS)
+    df = pd.read_csv(path, header=None, skiprows=header_idx + 1, names=list(range(len(header_values))),
+                     index_col=False, dtype=str)
+    return processor._clean_eod_rows(processor._apply_header(df, header_values))
+
+
+def clean_emerchant(path, compact):
+    processor = EMerchantProcessor(None, filename=os.path.basename(path), merchant_type='shopee', compact=compact)
+    return processor._clean_emerchant_data(pd.read_csv(path))
+
+
+def measure(clean, path, compact):
+    tracemalloc.start()
+    df = clean(path, compact)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1e6, df.memory_usage(deep=True).sum() / 1e6, len(df)
+
+
+def run(n_rows):
+    folder = tempfile.mkdtemp()
+    eod_path = os.path.join(folder, 'bench_eod.csv')
+    emerchant_path = os.path.join(folder, 'bench_emerchant.csv')
+    write_eod_report(eod_path, make_eod_frame(n_rows))
+    write_emerchant_csv(emerchant_path, make_emerchant_frame(n_rows))
+
+    for label, clean, path in (('EOD', clean_eod, eod_path), ('eMerchant', clean_emerchant, emerchant_path)):
+        before_peak, before_frame, rows = measure(clean, path, compact=False)
+        after_peak, after_frame, _ = measure(clean, path, compact=True)
+        print(f"{label:<10} {rows:,} baris | puncak {before_peak:8.1f} -> {after_peak:8.1f} MB "
+              f"| frame {before_frame:8.1f} -> {after_frame:8.1f} MB ({before_frame / after_frame:4.1f}x)")
+
+    for path in (eod_path, emerchant_path):
+        os.remove(path)
+    os.rmdir(folder)
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 500000)
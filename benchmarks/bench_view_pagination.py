@@ -0,0 +1,51 @@
+"""Benchmark: /view/eod paginate() (COUNT + OFFSET) vs keyset (seek) pada page dalam.
+
+Cursor untuk page N diambil sekali (di luar masa) dari baris terakhir page N-1.
+
+    BENCH_DATABASE_URL=postgresql://... python benchmarks/bench_view_pagination.py <user_id> [per_page]
+"""
+import sys
+import time
+
+from synthetic import get_engine
+from app import app, db
+from keyset import KeysetPage, encode_cursor
+from models import TransaksiEod
+
+PAGES = [1, 10, 100, 1000, 5000]
+
+
+def timed(func):
+    started = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - started
+
+
+def run(user_id, per_page):
+    app.config['SQLALCHEMY_DATABASE_URI'] = str(get_engine().url)
+    with app.app_context():
+        query = TransaksiEod.query.filter_by(uploaded_by=user_id)
+        ordered = query.order_by(TransaksiEod.date_of_transaction.desc(), TransaksiEod.id.desc())
+
+        for page in PAGES:
+            cursor = None
+            if page > 1:
+                anchor = ordered.offset((page - 1) * per_page - 1).first()
+                if anchor is None:
+                    print(f"page={page}: tiada data")
+                    break
+                cursor = encode_cursor(anchor.date_of_transaction, anchor.id)
+
+            offset_page, offset_s = timed(lambda: ordered.paginate(page=page, per_page=per_page, error_out=False))
+            keyset_page, keyset_s = timed(lambda: KeysetPage(
+                query, TransaksiEod.date_of_transaction, TransaksiEod.id, per_page, after=cursor
+            ))
+            _, approx_s = timed(lambda: keyset_page.estimate_total(db.session))
+            same = [r.id for r in offset_page.items] == [r.id for r in keyset_page.items]
+            print(f"page={page:>5}: offset {offset_s * 1000:8.1f}ms | keyset {keyset_s * 1000:6.1f}ms "
+                  f"| anggaran total {keyset_page.total:,} vs {offset_page.total:,} ({approx_s * 1000:.1f}ms) "
+                  f"sama={'YA' if same else 'TIDAK'}")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]), int(sys.argv[2]) if len(sys.argv) > 2 else 20)
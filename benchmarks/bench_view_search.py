@@ -0,0 +1,73 @@
+"""Benchmark: latency page /view/eod yang ditapis terminal_name, dengan dan tanpa index carian.
+
+Muatkan (jika perlu) rows EOD sintetik dengan ~10k nama terminal berbeza, kemudian
+masa satu page keyset untuk beberapa term: mod contains (ILIKE '%term%', index
+trigram), mod prefix (lower(kolum) LIKE 'term%', B-tree text_pattern_ops) dan
+imbasan tanpa index (enable_bitmapscan/indexscan off).
+
+    BENCH_DATABASE_URL=postgresql://... python benchmarks/bench_view_search.py <user_id> [rows]
+"""
+import sys
+import time
+
+import numpy as np
+from sqlalchemy import text
+
+from synthetic import get_engine, make_eod_frame
+from app import app, db, EODProcessor
+from keyset import KeysetPage
+from models import TransaksiEod
+from search import setup_search_indexes, contains_filter
+
+BATCH_ID = 'BENCH_SEARCH'
+LOAD_CHUNK = 500000
+TERMS = ['KEDAI 1234', 'RUNCIT', 'ab']
+
+
+def load_rows(engine, user_id, n_rows):
+    with engine.connect() as conn:
+        existing = conn.execute(text("SELECT COUNT(*) FROM transaksi_eod WHERE batch_id = :b"),
+                                {'b': BATCH_ID}).scalar()
+    rng = np.random.default_rng(0)
+    names = np.array([f"{kind} {i}" for i, kind in
+                      enumerate(rng.choice(['KEDAI', 'RUNCIT', 'STESEN', 'CAFE'], 10000))])
+    for seed, start in enumerate(range(existing, n_rows, LOAD_CHUNK), start=1):
+        df = make_eod_frame(min(LOAD_CHUNK, n_rows - start), seed=seed, batch_id=BATCH_ID, user_id=user_id)
+        df['terminal_name'] = rng.choice(names, len(df))
+        EODProcessor(engine, filename='bench_eod.csv', user_id=user_id)._save_to_database(df)
+        print(f"   dimuatkan {start + len(df):,} / {n_rows:,}")
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE transaksi_eod"))
+
+
+def page_ms(user_id, term, mode='contains', no_index=False):
+    if no_index:
+        db.session.execute(text("SET LOCAL enable_bitmapscan = off"))
+        db.session.execute(text("SET LOCAL enable_indexscan = off"))
+    query = TransaksiEod.query.filter_by(uploaded_by=user_id) \
+        .filter(contains_filter(TransaksiEod.terminal_name, term, mode))
+    started = time.perf_counter()
+    page = KeysetPage(query, TransaksiEod.date_of_transaction, TransaksiEod.id, 20)
+    elapsed = (time.perf_counter() - started) * 1000
+    db.session.rollback()
+    return elapsed, len(page.items)
+
+
+def run(user_id, n_rows):
+    engine = get_engine()
+    app.config['SQLALCHEMY_DATABASE_URI'] = str(engine.url)
+    load_rows(engine, user_id, n_rows)
+    trigram = setup_search_indexes(engine)
+    print(f"pg_trgm: {'ada' if trigram else 'tiada (mod contains tanpa index)'}")
+
+    with app.app_context():
+        for term in TERMS:
+            indexed, rows = page_ms(user_id, term)
+            prefix, prefix_rows = page_ms(user_id, term, 'prefix')
+            scan, _ = page_ms(user_id, term, no_index=True)
+            print(f"'{term}': contains {indexed:8.1f}ms ({rows} baris) | prefix {prefix:8.1f}ms "
+                  f"({prefix_rows} baris) | tanpa index {scan:8.1f}ms")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]), int(sys.argv[2]) if len(sys.argv) > 2 else 5000000)
@@ -0,0 +1,42 @@
+import io
+
+from frame_dtypes import with_decimal_amounts
+
+# Bilangan rekod setiap COPY chunk
+COPY_CHUNK_SIZE = 50000
+
+
+def copy_upsert(cursor, df, table, columns, conflict, chunk_size=COPY_CHUNK_SIZE):
+    """COPY DataFrame ke temp staging table, kemudian satu INSERT ... SELECT ON CONFLICT DO NOTHING.
+
+    cursor: cursor psycopg2 dalam transaksi pemanggil (commit/rollback oleh pemanggil).
+    conflict: sasaran ON CONFLICT, contoh "(tid, ref_number)" atau "ON CONSTRAINT uniq_x".
+    Pulangkan (inserted, duplicates). Rekod duplicate dalam fail yang sama pun dikira duplicate.
+    """
+    staging = f"{table}_staging"
+    column_list = ', '.join(columns)
+
+    cursor.execute(f"""
+        CREATE TEMP TABLE IF NOT EXISTS {staging} ON COMMIT DROP AS
+        SELECT {column_list} FROM {table} WITH NO DATA
+    """)
+    cursor.execute(f"TRUNCATE {staging}")
+
+    for start in range(0, len(df), chunk_size):
+        # Stream dalam chunk supaya buffer CSV tak sebesar keseluruhan DataFrame;
+        # kolum sen (*_cents) ditukar ke Decimal per chunk sahaja
+        buffer = io.StringIO()
+        with_decimal_amounts(df.iloc[start:start + chunk_size], columns).to_csv(
+            buffer, index=False, header=False, date_format='%Y-%m-%d %H:%M:%S'
+        )
+        buffer.seek(0)
+        cursor.copy_expert(f"COPY {staging} ({column_list}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+    cursor.execute(f"""
+        INSERT INTO {table} ({column_list})
+        SELECT {column_list} FROM {staging}
+        ON CONFLICT {conflict} DO NOTHING
+    """)
+    inserted = cursor.rowcount
+    cursor.execute(f"TRUNCATE {staging}")
+    return inserted, len(df) - inserted
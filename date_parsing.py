@@ -0,0 +1,99 @@
+"""Parse kolum tarikh dengan cache nilai unik dan format yang dipelajari per sumber.
+
+Fail transaksi mengulang beberapa ribu tarikh/masa yang sama berjuta kali, jadi
+hanya nilai unik di-parse sekali dan hasilnya dipetakan semula ke setiap baris.
+Format dikesan dari sampel nilai unik; format yang berjaya diingat per sumber
+(cth. 'eod', 'emerchant:shopee') dan dicuba dahulu pada fail seterusnya.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+EOD_DATE_FORMATS = ['%d/%m/%Y %H:%M', '%d %b %Y %H:%M:%S']
+MERCHANT_DATE_FORMATS = ['%d/%m/%y']
+# Tarikh slash yang taksa (01/02/2024) dibaca bulan dahulu seperti inferens pandas sebelum ini;
+# %d/%m/%Y hanya diutamakan bila sampel (atau format dipelajari jenis merchant itu) menunjukkannya
+EMERCHANT_DATE_FORMATS = ['%Y-%m-%d', '%m/%d/%Y', '%d/%m/%Y', '%Y%m%d', '%d-%b-%Y']
+
+SNIFF_SAMPLE = 200
+
+# sumber -> senarai format, yang terakhir berjaya di hadapan
+_learned_formats = {}
+_learned_lock = threading.Lock()
+
+
+def parse_dates(values, formats, source=None, infer=False, normalize=None):
+    """Parse Series tarikh; pulangkan Series datetime64 (NaT jika gagal) dengan index asal.
+
+    formats: format strptime calon, ikut keutamaan.
+    source: kunci cache format yang dipelajari (None = tiada cache).
+    infer: nilai yang tak padan mana-mana format cuba diteka oleh pandas.
+    normalize: fungsi Series -> Series (cth. strip) yang dijalankan pada nilai unik sahaja.
+    """
+    series = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+
+    codes, uniques = pd.factorize(series)
+    uniques = pd.Series(uniques, dtype=object)
+    if normalize is not None:
+        uniques = normalize(uniques.astype(str))
+
+    parsed = _parse_unique(uniques, formats, source, infer)
+    # Kod -1 (NaN) menunjuk ke NaT di hujung jadual
+    lookup = np.append(parsed, np.datetime64('NaT', 'ns'))
+    return pd.Series(lookup[codes], index=series.index, name=series.name)
+
+
+def learned_formats(source):
+    with _learned_lock:
+        return list(_learned_formats.get(source, []))
+
+
+def _parse_unique(uniques, formats, source, infer):
+    """Parse nilai unik: format terbaik dari sampel dahulu, baki dengan format seterusnya."""
+    result = np.full(len(uniques), np.datetime64('NaT', 'ns'), dtype='datetime64[ns]')
+    if uniques.empty:
+        return result
+
+    remaining = np.arange(len(uniques))
+    used = []
+    for fmt in _rank_formats(uniques, formats, source):
+        attempt = pd.to_datetime(uniques.iloc[remaining], format=fmt, errors='coerce').to_numpy('datetime64[ns]')
+        ok = ~np.isnat(attempt)
+        if ok.any():
+            result[remaining[ok]] = attempt[ok]
+            used.append((int(ok.sum()), fmt))
+            remaining = remaining[~ok]
+        if not len(remaining):
+            break
+
+    if infer and len(remaining):
+        attempt = pd.to_datetime(uniques.iloc[remaining], format='mixed', errors='coerce').to_numpy('datetime64[ns]')
+        result[remaining] = attempt
+
+    if source is not None and used:
+        _learn(source, [fmt for _, fmt in sorted(used, key=lambda item: -item[0])])
+    return result
+
+
+def _rank_formats(uniques, formats, source):
+    """Susun format: yang parse semua sampel dahulu (format dipelajari diutamakan), kemudian ikut bilangan berjaya.
+
+    Format yang gagal pada sampel masih dicuba di hujung untuk kolum bercampur.
+    """
+    learned = learned_formats(source) if source is not None else []
+    candidates = learned + [fmt for fmt in formats if fmt not in learned]
+    sample = uniques.iloc[:SNIFF_SAMPLE]
+    scores = {fmt: int(pd.to_datetime(sample, format=fmt, errors='coerce').notna().sum())
+              for fmt in candidates}
+    full = [fmt for fmt in candidates if scores[fmt] == len(sample)]
+    partial = sorted((fmt for fmt in candidates if fmt not in full), key=lambda fmt: -scores[fmt])
+    return full + partial
+
+
+def _learn(source, formats):
+    with _learned_lock:
+        previous = _learned_formats.get(source, [])
+        _learned_formats[source] = formats + [fmt for fmt in previous if fmt not in formats]
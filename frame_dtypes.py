@@ -0,0 +1,69 @@
+"""Jenis data padat untuk DataFrame transaksi selepas cleaning.
+
+Output cleaning (EOD, e-merchant, merchant) guna:
+- category untuk kolum teks berkardinaliti rendah (card_type, merchant_code, batch_id, ...),
+- string Arrow (string[pyarrow]) untuk teks lain jika pyarrow dipasang,
+- sen int64 / Int64 untuk kolum amaun (lihat amount_parsing),
+- datetime64 untuk tarikh.
+
+Kontrak amaun: kolum sen dinamakan dengan akhiran CENTS_SUFFIX (cth.
+amount_rm_cents). with_decimal_amounts() menukarnya ke Decimal tepat di bawah
+nama kolum DB (amount_rm) sejurus sebelum ditulis. Kolum amaun tanpa akhiran
+(cth. float RM dalam frame sintetik benchmark) ditulis seperti biasa.
+"""
+from amount_parsing import cents_to_decimal
+
+CENTS_SUFFIX = '_cents'
+
+# Kolum teks jadi category jika nilai unik <= nisbah ini daripada bilangan baris
+CATEGORY_MAX_RATIO = 0.5
+
+_string_dtype = None
+
+
+def string_dtype():
+    """'string[pyarrow]' jika pyarrow ada; None (kekal object) jika tiada."""
+    global _string_dtype
+    if _string_dtype is None:
+        try:
+            import pyarrow  # noqa: F401
+            _string_dtype = 'string[pyarrow]'
+        except ImportError:
+            _string_dtype = ''
+    return _string_dtype or None
+
+
+def compact_frame(df):
+    """Tukar kolum object kepada category atau string Arrow (in-place); pulangkan df."""
+    arrow_string = string_dtype()
+    for col in df.columns:
+        series = df[col]
+        if series.dtype != object:
+            continue
+        if series.nunique(dropna=True) <= max(len(series) * CATEGORY_MAX_RATIO, 1):
+            df[col] = series.astype('category')
+        elif arrow_string:
+            df[col] = series.astype(arrow_string)
+    return df
+
+
+def db_columns(columns):
+    """Nama kolum DB bagi kolum frame: 'amount_rm_cents' -> 'amount_rm'."""
+    return [col[:-len(CENTS_SUFFIX)] if col.endswith(CENTS_SUFFIX) else col for col in columns]
+
+
+def with_decimal_amounts(df, columns=None):
+    """Frame untuk ditulis ke DB: kolum *_cents jadi Decimal tepat di bawah nama kolum DB.
+
+    columns: nama kolum DB yang dikehendaki, ikut susunan (kolum tiada jadi NaN);
+    None = semua kolum df.
+    """
+    if columns is not None:
+        df = df.reindex(columns=[f'{col}{CENTS_SUFFIX}' if f'{col}{CENTS_SUFFIX}' in df.columns else col
+                                 for col in columns])
+    cents_cols = [col for col in df.columns if col.endswith(CENTS_SUFFIX)]
+    if not cents_cols:
+        return df
+    converted = {col: cents_to_decimal(df[col].to_numpy(dtype='int64', na_value=0), df[col].isna().to_numpy())
+                 for col in cents_cols}
+    return df.assign(**converted).rename(columns=dict(zip(cents_cols, db_columns(cents_cols))))
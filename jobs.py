@@ -0,0 +1,142 @@
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from extensions import db
+from models import UploadHistory
+from upload_reader import estimate_row_count
+
+logger = logging.getLogger(__name__)
+
+
+class UploadJobQueue:
+    """Worker pool tempatan untuk proses upload di luar request thread.
+
+    State setiap job disimpan dalam UploadHistory (status 'processing'),
+    jadi endpoint /api/jobs/<batch_id> boleh baca progress dari DB.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.executor = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.executor = ThreadPoolExecutor(
+            max_workers=app.config.get('UPLOAD_WORKERS', 2),
+            thread_name_prefix='upload-worker'
+        )
+
+    def submit(self, processor, file_path, file_type):
+        """Daftar job sebagai 'processing' dan hantar ke worker pool.
+
+        Jika job tak dapat dihantar, fail spool dibuang dan history ditanda
+        'failed' sebelum ralat dinaikkan semula.
+        """
+        history = UploadHistory(
+            user_id=processor.user_id,
+            file_name=processor.filename,
+            file_type=file_type,
+            merchant_type=getattr(processor, 'merchant_type', None),
+            record_count=0,
+            rows_parsed=0,
+            rows_total=estimate_row_count(file_path),
+            status='processing',
+            stage='queued',
+            batch_id=processor.batch_id
+        )
+        try:
+            db.session.add(history)
+            db.session.commit()
+            self._invalidate_cache(processor.user_id)
+            self.executor.submit(self._run, processor, file_path)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Upload job {processor.batch_id} not queued: {e}")
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            self._update(processor.batch_id, stage='failed', status='failed', error_message=str(e))
+            self._invalidate_cache(processor.user_id)
+            raise
+        return processor.batch_id
+
+    def _run(self, processor, file_path):
+        with self.app.app_context():
+            started = time.monotonic()
+            last_update = [0.0]
+            # Kiraan baris yang dibaca terakhir (bukan rekod selepas cleaning)
+            last_parsed = [0]
+
+            def on_progress(rows_parsed, rows_inserted):
+                last_parsed[0] = rows_parsed
+                # Had kadar tulis ke DB, cukup untuk polling dari browser
+                now = time.monotonic()
+                if now - last_update[0] >= 1.0:
+                    last_update[0] = now
+                    self._update(processor.batch_id, rows_parsed=rows_parsed, record_count=rows_inserted)
+
+            processor.progress_callback = on_progress
+            self._update(processor.batch_id, stage='parsing')
+
+            try:
+                result = processor.process_from_file_path(file_path)
+            except Exception as e:
+                logger.error(f"Upload job {processor.batch_id} crashed: {e}")
+                result = {'success': False, 'error': str(e)}
+            finally:
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+
+            fields = {'processing_time': timedelta(seconds=time.monotonic() - started),
+                      'rows_parsed': last_parsed[0]}
+            if result.get('success'):
+                fields.update(stage='done')
+            else:
+                fields.update(stage='failed', status='failed', error_message=result.get('error'))
+            self._update(processor.batch_id, **fields)
+            self._invalidate_cache(processor.user_id)
+
+    def _invalidate_cache(self, user_id):
+        # Senarai upload/dashboard pengguna ini berubah
+        cache = self.app.extensions.get('response_cache')
+        if cache is not None:
+            cache.invalidate_user(user_id)
+
+    def _update(self, batch_id, **fields):
+        try:
+            UploadHistory.query.filter_by(batch_id=batch_id).update(fields)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error updating job {batch_id}: {e}")
+
+
+def job_status(history):
+    """Bentuk JSON progress untuk satu UploadHistory, termasuk ETA."""
+    rows_parsed = history.rows_parsed or 0
+    elapsed = (datetime.utcnow() - history.upload_date).total_seconds() if history.upload_date else None
+    if history.processing_time is not None:
+        elapsed = history.processing_time.total_seconds()
+
+    eta = None
+    if history.status == 'processing' and rows_parsed and history.rows_total and elapsed:
+        remaining = max(history.rows_total - rows_parsed, 0)
+        eta = round(elapsed / rows_parsed * remaining, 1)
+
+    return {
+        'batch_id': history.batch_id,
+        'file_name': history.file_name,
+        'file_type': history.file_type,
+        'status': history.status,
+        'stage': history.stage,
+        'rows_total': history.rows_total,
+        'rows_parsed': rows_parsed,
+        'rows_inserted': history.record_count or 0,
+        'elapsed_seconds': round(elapsed, 1) if elapsed is not None else None,
+        'eta_seconds': eta,
+        'error': history.error_message
+    }
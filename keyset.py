@@ -0,0 +1,71 @@
+from datetime import date, datetime
+
+from sqlalchemy import tuple_
+
+CURSOR_SEPARATOR = '_'
+
+
+class KeysetPage:
+    """Satu page hasil pagination keyset (seek) pada (kolum tarikh, id), menurun.
+
+    Setiap page ialah satu index range scan bermula dari cursor, tanpa OFFSET
+    dan tanpa COUNT(*), jadi page ke-5000 sama laju dengan page pertama.
+    Atribut serasi dengan Pagination Flask-SQLAlchemy (items, has_next, has_prev,
+    total, per_page) dan tambah next_cursor/prev_cursor untuk link ?after=/?before=.
+    Baris dengan tarikh NULL tak termasuk (perbandingan row value dengan NULL).
+    """
+
+    def __init__(self, query, date_column, id_column, per_page=20, after=None, before=None):
+        self.per_page = per_page
+        self.total = None
+        self.approximate = False
+
+        query = query.filter(date_column.isnot(None))
+        self._count_query = query
+        key = tuple_(date_column, id_column)
+
+        if before:
+            # Page sebelum: imbas ke atas dari cursor, kemudian terbalikkan
+            rows = query.filter(key > decode_cursor(before, date_column)) \
+                .order_by(date_column.asc(), id_column.asc()).limit(per_page + 1).all()
+            self.has_prev = len(rows) > per_page
+            self.items = list(reversed(rows[:per_page]))
+            self.has_next = True
+        else:
+            if after:
+                query = query.filter(key < decode_cursor(after, date_column))
+            rows = query.order_by(date_column.desc(), id_column.desc()).limit(per_page + 1).all()
+            self.has_next = len(rows) > per_page
+            self.items = rows[:per_page]
+            self.has_prev = after is not None
+
+        first, last = (self.items[0], self.items[-1]) if self.items else (None, None)
+        attr = date_column.key
+        self.prev_cursor = encode_cursor(getattr(first, attr), first.id) if first is not None and self.has_prev else None
+        self.next_cursor = encode_cursor(getattr(last, attr), last.id) if last is not None and self.has_next else None
+
+    def estimate_total(self, session):
+        """Anggaran bilangan baris dari statistik planner (EXPLAIN), bukan COUNT(*)."""
+        statement = self._count_query.order_by(None).statement
+        compiled = statement.compile(dialect=session.get_bind().dialect)
+        plan = session.connection().exec_driver_sql(
+            f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+        ).scalar()
+        self.total = int(plan[0]['Plan']['Plan Rows'])
+        self.approximate = True
+        return self.total
+
+
+def encode_cursor(value, row_id):
+    return f"{value.isoformat()}{CURSOR_SEPARATOR}{row_id}"
+
+
+def decode_cursor(cursor, date_column):
+    """Cursor 'YYYY-MM-DD[THH:MM:SS]_id' -> (tarikh, id). ValueError jika rosak."""
+    value, _, row_id = cursor.rpartition(CURSOR_SEPARATOR)
+    if not value:
+        raise ValueError(f"Cursor tidak sah: {cursor}")
+    parsed = datetime.fromisoformat(value)
+    if date_column.type.python_type is date:
+        parsed = parsed.date()
+    return parsed, int(row_id)
@@ -0,0 +1,118 @@
+import hashlib
+import os
+
+from sqlalchemy import text
+
+from batch_runner import file_result
+
+
+class FileManifest:
+    """Rekod fail yang sudah di-ingest (hash kandungan, saiz, mtime) untuk run incremental.
+
+    Fail yang saiz dan mtime-nya sama dengan manifest di-skip tanpa dibuka.
+    Jika saiz/mtime berubah, hash kandungan dikira; kandungan yang sudah pernah
+    di-ingest (walaupun nama lain) juga di-skip. Manifest ditulis dalam transaksi
+    yang sama dengan data supaya kedua-duanya commit atau rollback bersama.
+    """
+
+    def __init__(self, db_engine, source):
+        self.engine = db_engine
+        self.source = source
+        self.pending = {}
+
+    def init_table(self):
+        query = """
+        CREATE TABLE IF NOT EXISTS ingest_manifest (
+            id SERIAL PRIMARY KEY,
+            source VARCHAR(50) NOT NULL,
+            file_path TEXT NOT NULL,
+            file_name VARCHAR(255),
+            size_bytes BIGINT NOT NULL,
+            mtime DOUBLE PRECISION NOT NULL,
+            content_hash CHAR(64) NOT NULL,
+            row_count INTEGER,
+            ingested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            CONSTRAINT uniq_manifest_file UNIQUE (source, file_path)
+        );
+        CREATE INDEX IF NOT EXISTS idx_manifest_hash ON ingest_manifest (source, content_hash);
+        """
+        with self.engine.connect() as conn:
+            conn.execute(text(query))
+            conn.commit()
+
+    def plan(self, files):
+        """Pulangkan (fail yang perlu diproses, summary untuk fail yang di-skip)."""
+        with self.engine.connect() as conn:
+            rows = conn.execute(text("""
+                SELECT file_path, size_bytes, mtime, content_hash
+                FROM ingest_manifest WHERE source = :source
+            """), {'source': self.source}).fetchall()
+
+        known = {row.file_path: (row.size_bytes, row.mtime) for row in rows}
+        known_hashes = {row.content_hash for row in rows}
+
+        to_process = []
+        skipped = []
+        for path in files:
+            key = os.path.abspath(path)
+            stat = os.stat(path)
+            if known.get(key) == (stat.st_size, stat.st_mtime):
+                skipped.append(file_result(path, 'skip', message='Tiada perubahan sejak run lepas.'))
+                continue
+
+            fingerprint = (stat.st_size, stat.st_mtime, hash_file(path))
+            if fingerprint[2] in known_hashes:
+                # Kandungan sama (cuma di-touch atau disalin): kemas kini stat sahaja
+                with self.engine.begin() as conn:
+                    self._upsert(conn, key, fingerprint, None)
+                skipped.append(file_result(path, 'skip', message='Kandungan sudah pernah diproses.'))
+                continue
+
+            self.pending[key] = fingerprint
+            to_process.append(path)
+
+        return to_process, skipped
+
+    def record(self, conn, path, row_count):
+        """Tulis manifest untuk fail yang baru di-ingest, guna connection transaksi data."""
+        key = os.path.abspath(path)
+        fingerprint = self.pending.get(key)
+        if fingerprint is None:
+            stat = os.stat(path)
+            fingerprint = (stat.st_size, stat.st_mtime, hash_file(path))
+        self._upsert(conn, key, fingerprint, row_count)
+
+    def record_skipped(self, path):
+        """Rekod fail yang di-skip (cth. tiada header) dengan row_count=0 supaya tak diimbas semula."""
+        with self.engine.begin() as conn:
+            self.record(conn, path, 0)
+
+    def _upsert(self, conn, key, fingerprint, row_count):
+        size_bytes, mtime, content_hash = fingerprint
+        conn.execute(text("""
+            INSERT INTO ingest_manifest (source, file_path, file_name, size_bytes, mtime, content_hash, row_count)
+            VALUES (:source, :file_path, :file_name, :size_bytes, :mtime, :content_hash, :row_count)
+            ON CONFLICT (source, file_path) DO UPDATE SET
+                size_bytes = EXCLUDED.size_bytes,
+                mtime = EXCLUDED.mtime,
+                content_hash = EXCLUDED.content_hash,
+                row_count = COALESCE(EXCLUDED.row_count, ingest_manifest.row_count),
+                ingested_at = CURRENT_TIMESTAMP
+        """), {
+            'source': self.source,
+            'file_path': key,
+            'file_name': os.path.basename(key),
+            'size_bytes': size_bytes,
+            'mtime': mtime,
+            'content_hash': content_hash,
+            'row_count': row_count
+        })
+
+
+def hash_file(path, block_size=1024 * 1024):
+    """SHA-256 kandungan fail, dibaca secara block."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
@@ -1,24 +1,49 @@
 import pandas as pd
 import os
 import glob
+import time
 from sqlalchemy import text
+from upload_reader import locate_header
+from batch_runner import run_files, print_summary, FileSkipped
+from manifest import FileManifest
+from bulk_load import copy_upsert
+from date_parsing import parse_dates, MERCHANT_DATE_FORMATS
+from amount_parsing import parse_amount_cents
+from frame_dtypes import compact_frame, db_columns
+from recon_processor import init_recon_schema
 
 class MerchantProcessor:
-    def __init__(self, db_engine, folder_path):
+    def __init__(self, db_engine, folder_path, workers=1, db_workers=4, incremental=True):
         self.engine = db_engine
         self.folder_path = folder_path
+        self.incremental = incremental
+        self.manifest = FileManifest(db_engine, 'merchant')
         self.table_name = 'transaksi_merchant'
+        self.workers = workers
+        self.db_workers = db_workers
 
     def run(self):
         """Main execution flow untuk Merchant."""
         print(f"\n🚀 [MERCHANT] Memulakan proses data Merchant dari: {self.folder_path}")
         self._init_table()
         
-        files = glob.glob(os.path.join(self.folder_path, "*.csv"))
-        for file_path in files:
-            self._process_single_file(file_path)
+        files = sorted(glob.glob(os.path.join(self.folder_path, "*.csv")))
+        started = time.perf_counter()
+        
+        # Incremental: fail yang tak berubah sejak run lepas tak dibuka langsung
+        skipped = []
+        self.manifest.init_table()
+        if self.incremental:
+            files, skipped = self.manifest.plan(files)
+        
+        # workers > 1: parse selari dalam process pool
+        summary = skipped + run_files(files, prepare_merchant_file, self._write_frame,
+                                      workers=self.workers, db_workers=self.db_workers,
+                                      on_skip=self.manifest.record_skipped)
+        print_summary('MERCHANT', summary, time.perf_counter() - started)
             
         print("✅ [MERCHANT] Semua fail Merchant selesai diproses.")
+        return summary
 
     def _init_table(self):
         query = f"""
@@ -27,6 +52,7 @@ class MerchantProcessor:
             card_number VARCHAR(20),
             amount DECIMAL(15, 2),
             tran_date TIMESTAMP,
+            tran_day DATE GENERATED ALWAYS AS (tran_date::date) STORED,
             auth_code VARCHAR(50),
             tran_id VARCHAR(100),
             reference_no VARCHAR(100),
@@ -42,50 +68,71 @@ class MerchantProcessor:
         with self.engine.connect() as conn:
             conn.execute(text(query))
             conn.commit()
+        # Kolum tran_day/index join untuk table lama (DDL hanya jika tiada)
+        init_recon_schema(self.engine)
 
     def _process_single_file(self, file_path):
-        file_name = os.path.basename(file_path)
-        try:
-
-            df = pd.read_csv(
-                file_path, 
-                header=None
-            )           
-            # Cari Header 'card number'
-            card_rows = [i for i in range(len(df)) if 'card number' in ' '.join(df.iloc[i].astype(str).values).lower()]
-            if not card_rows:
-                return
-
-            target_row = card_rows[0]
-            df.columns = [str(val).lower().strip().replace(" ", "_").replace("(","").replace(")","") for val in df.iloc[target_row]]
-            df = df.iloc[target_row + 1:].reset_index(drop=True)
-
-            # Filter Visa & 16 Digit
-            col_type = [c for c in df.columns if 'card_type' in c]
-            if col_type:
-                df = df[df[col_type[0]].str.contains('VISA', case=False, na=False)].copy()
-            
-            df['card_number'] = df['card_number'].astype(str).str.strip()
-            df = df[df['card_number'].str.len() == 16].copy()
-
-            if df.empty:
-                return
-
-            # Cleanup
-            df.columns = [col.replace('.', '').strip() for col in df.columns]
-            df['amount'] = pd.to_numeric(df['amount'], errors='coerce').fillna(0)
-            df['tran_date'] = df['tran_date'].astype(str).str.replace('-', '/').str.strip()
-            df['tran_date'] = pd.to_datetime(df['tran_date'], format='%d/%m/%y', errors='coerce')
-            df['file_source'] = file_name
-
-            cols = ['card_number', 'amount', 'tran_date', 'auth_code', 'tran_id', 'reference_no', 'terminal_no', 'batch_no', 'card_type', 'ezypay_term', 'interchange_fee', 'file_source']
-            df_final = df[[c for c in cols if c in df.columns]].copy()
-
-            try:
-                df_final.to_sql(self.table_name, self.engine, if_exists='append', index=False)
-                print(f"   💾 [OK] {file_name}: +{len(df_final)} rekod.")
-            except Exception:
-                print(f"   ⏭️ [SKIP] {file_name}: Duplicate detected.")
-                
-        except Exception as e:
-            print(f"   🔥 [ERROR] {file_name}: {e}")
\ No newline at end of file
+        """Proses satu fail secara serial (parse + simpan)."""
+        return run_files([file_path], prepare_merchant_file, self._write_frame)[0]
+
+    def _write_frame(self, file_path, df_final):
+        """Simpan DataFrame yang sudah clean + manifest dalam satu transaksi.
+
+        Rekod yang langgar uniq_transaction di-skip satu-satu (ON CONFLICT DO NOTHING),
+        rekod baru dalam fail yang sama tetap disimpan. Pulangkan (inserted, duplicates).
+        """
+        inserted, duplicates = 0, 0
+        with self.engine.begin() as conn:
+            if not df_final.empty:
+                inserted, duplicates = copy_upsert(
+                    conn.connection.cursor(), df_final, self.table_name, db_columns(df_final.columns),
+                    'ON CONSTRAINT uniq_transaction'
+                )
+            self.manifest.record(conn, file_path, inserted)
+        return inserted, duplicates
+
+
+def prepare_merchant_file(file_path):
+    """Parse + clean satu fail Merchant (tanpa DB, boleh jalan dalam process pool)."""
+    file_name = os.path.basename(file_path)
+
+    # Cari Header 'card number' dari baris mentah, berhenti pada padanan pertama
+    target_row, header_values = locate_header(file_path, 'card number')
+    if target_row is None:
+        raise FileSkipped("Header 'card number' tidak dijumpai.")
+
+    df = pd.read_csv(
+        file_path,
+        header=None,
+        skiprows=target_row + 1,
+        names=list(range(len(header_values))),
+        index_col=False,
+        dtype=str
+    )
+    df.columns = [str(val or 'nan').lower().strip().replace(" ", "_").replace("(","").replace(")","") for val in header_values]
+
+    # Filter Visa & 16 Digit
+    col_type = [c for c in df.columns if 'card_type' in c]
+    if col_type:
+        df = df[df[col_type[0]].str.contains('VISA', case=False, na=False)].copy()
+    
+    df['card_number'] = df['card_number'].astype(str).str.strip()
+    df = df[df['card_number'].str.len() == 16].copy()
+
+    if df.empty:
+        return df
+
+    # Cleanup
+    df.columns = [col.replace('.', '').strip() for col in df.columns]
+    df['amount_cents'] = parse_amount_cents(df.pop('amount'), fill_bad=0)
+    df['tran_date'] = parse_dates(df['tran_date'], MERCHANT_DATE_FORMATS, source='merchant',
+                                  normalize=_normalize_tran_date)
+    df['file_source'] = file_name
+
+    cols = ['card_number', 'amount_cents', 'tran_date', 'auth_code', 'tran_id', 'reference_no', 'terminal_no', 'batch_no', 'card_type', 'ezypay_term', 'interchange_fee', 'file_source']
+    return compact_frame(df[[c for c in cols if c in df.columns]].copy())
+
+
+def _normalize_tran_date(values):
+    """'15-01-24' -> '15/01/24' (dijalankan pada nilai unik sahaja)."""
+    return values.str.replace('-', '/').str.strip()
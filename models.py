@@ -30,6 +30,17 @@ class User(db.Model):
 
 class TransaksiEod(db.Model):
     __tablename__ = 'transaksi_eod'
+    # Table sebenar dicipta oleh partitioning.init_partitioned_tables (partition bulanan)
+    __table_args__ = (
+        # Sama dengan partitioning.TABLE_DDL, diperlukan oleh ON CONFLICT
+        db.UniqueConstraint('tid', 'ref_number', 'date_of_transaction', 'amount_rm', name='unique_transaction_ref'),
+        db.Index('idx_eod_recon_key', 'tx_date', 'approval_code', 'amount_rm'),
+        # Keyset pagination /view/eod: (tarikh, id) menurun
+        db.Index('idx_eod_user_seek', 'uploaded_by', db.text('date_of_transaction DESC'), db.text('id DESC')),
+        # Set terbuka untuk reconciliation incremental (belum dipadankan)
+        db.Index('idx_eod_recon_open', 'uploaded_by', 'tx_date', 'amount_rm',
+                 postgresql_where=db.text("reconciliation_status IN ('PENDING', 'UNMATCHED')")),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     terminal_name = db.Column(db.String(255))
@@ -37,6 +48,8 @@ class TransaksiEod(db.Model):
     till_summary_no = db.Column(db.String(100))
     till_closure_no = db.Column(db.String(100))
     date_of_transaction = db.Column(db.DateTime)
+    # Tarikh sahaja, dijana oleh DB untuk join/penapis yang boleh guna index
+    tx_date = db.Column(db.Date, db.Computed('date_of_transaction::date', persisted=True))
     card_type = db.Column(db.String(100))
     card_number = db.Column(db.String(100))
     receipt = db.Column(db.String(100))
@@ -50,9 +63,13 @@ class TransaksiEod(db.Model):
     batch_id = db.Column(db.String(100))
     file_name = db.Column(db.String(255))
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
+    reconciliation_status = db.Column(db.String(20), default='PENDING', server_default='PENDING')
     
-    # Relationships
-    matches = db.relationship('ReconciliationMatch', backref='eod_transaction', lazy=True)
+    # Relationships (tanpa FK di DB: table dipartition, lihat partitioning.py)
+    matches = db.relationship(
+        'ReconciliationMatch', backref='eod_transaction', lazy=True,
+        primaryjoin='TransaksiEod.id == foreign(ReconciliationMatch.eod_transaction_id)'
+    )
     
     def to_dict(self):
         return {
@@ -75,6 +92,19 @@ class TransaksiEod(db.Model):
 
 class TransaksiEmerchant(db.Model):
     __tablename__ = 'transaksi_emerchant'
+    # Table sebenar dicipta oleh partitioning.init_partitioned_tables (partition bulanan)
+    __table_args__ = (
+        # Diperlukan oleh ON CONFLICT dalam EMerchantProcessor._save_to_database
+        db.UniqueConstraint('order_id', 'transaction_date', 'amount', name='uniq_emerchant_order'),
+        db.Index('idx_emerchant_recon_key', 'transaction_date', 'amount'),
+        db.Index('idx_emerchant_recon_open', 'uploaded_by', 'transaction_date', 'amount',
+                 postgresql_where=db.text("reconciliation_status IN ('PENDING', 'UNMATCHED')")),
+        # Untuk /api/emerchant/stats
+        db.Index('idx_emerchant_user_date', 'uploaded_by', 'transaction_date'),
+        db.Index('idx_emerchant_user_merchant', 'uploaded_by', 'merchant_code'),
+        # Keyset pagination /view/emerchant: (tarikh, id) menurun
+        db.Index('idx_emerchant_user_seek', 'uploaded_by', db.text('transaction_date DESC'), db.text('id DESC')),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     merchant_code = db.Column(db.String(100))
@@ -94,8 +124,11 @@ class TransaksiEmerchant(db.Model):
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
     reconciliation_status = db.Column(db.String(20), default='PENDING')
     
-    # Relationships
-    matches = db.relationship('ReconciliationMatch', backref='emerchant_transaction', lazy=True)
+    # Relationships (tanpa FK di DB: table dipartition, lihat partitioning.py)
+    matches = db.relationship(
+        'ReconciliationMatch', backref='emerchant_transaction', lazy=True,
+        primaryjoin='TransaksiEmerchant.id == foreign(ReconciliationMatch.emerchant_transaction_id)'
+    )
     
     def to_dict(self):
         return {
@@ -135,21 +168,56 @@ class UploadHistory(db.Model):
     batch_id = db.Column(db.String(100))
     processing_time = db.Column(db.Interval)
     
+    # Progress untuk upload yang diproses di background
+    stage = db.Column(db.String(20))  # 'queued', 'parsing', 'done', 'failed'
+    rows_total = db.Column(db.Integer)  # anggaran, untuk kira ETA
+    rows_parsed = db.Column(db.Integer, default=0)
+    error_message = db.Column(db.Text)
+    
     def __repr__(self):
         return f'<UploadHistory {self.file_name} {self.status}>'
 
 
 class ReconciliationMatch(db.Model):
     __tablename__ = 'reconciliation_matches'
+    __table_args__ = (
+        # Untuk recon_summary.matches_made (padanan dibuat pada hari tertentu)
+        db.Index('idx_match_user_date', 'matched_by', 'matched_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    eod_transaction_id = db.Column(db.Integer, db.ForeignKey('transaksi_eod.id'))
-    emerchant_transaction_id = db.Column(db.Integer, db.ForeignKey('transaksi_emerchant.id'))
+    # Rujuk transaksi_eod.id / transaksi_emerchant.id (table partition tak boleh jadi sasaran FK)
+    eod_transaction_id = db.Column(db.Integer, index=True)
+    emerchant_transaction_id = db.Column(db.Integer, index=True)
     match_score = db.Column(db.Integer)
     match_status = db.Column(db.String(20), default='pending')  # pending, confirmed, rejected
+    match_type = db.Column(db.String(10))  # exact, partial (padanan auto ReconEngine)
     matched_by = db.Column(db.Integer, db.ForeignKey('users.id'))
     matched_date = db.Column(db.DateTime, default=datetime.utcnow)
     notes = db.Column(db.Text)
     
     def __repr__(self):
-        return f'<ReconciliationMatch {self.eod_transaction_id} - {self.emerchant_transaction_id}>'
\ No newline at end of file
+        return f'<ReconciliationMatch {self.eod_transaction_id} - {self.emerchant_transaction_id}>'
+
+class ReconSummary(db.Model):
+    """Ringkasan per pengguna per hari transaksi; diselenggara oleh recon_summary.refresh_summary."""
+    __tablename__ = 'recon_summary'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    eod_count = db.Column(db.Integer, default=0)
+    eod_amount = db.Column(db.Numeric(18, 2), default=0)
+    emerchant_count = db.Column(db.Integer, default=0)
+    emerchant_amount = db.Column(db.Numeric(18, 2), default=0)
+    matched = db.Column(db.Integer, default=0)
+    partial_matches = db.Column(db.Integer, default=0)
+    discrepancies = db.Column(db.Integer, default=0)  # padanan partial dengan amaun berbeza
+    unmatched_eod = db.Column(db.Integer, default=0)
+    unmatched_emerchant = db.Column(db.Integer, default=0)
+    pending_eod = db.Column(db.Integer, default=0)
+    pending_emerchant = db.Column(db.Integer, default=0)
+    matches_made = db.Column(db.Integer, default=0)  # ikut tarikh padanan dibuat, bukan tarikh transaksi
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ReconSummary {self.user_id} {self.day}>'
@@ -0,0 +1,283 @@
+"""Partition bulanan (RANGE) untuk transaksi_eod dan transaksi_emerchant.
+
+Table induk dicipta sebagai PARTITION BY RANGE pada kolum tarikh, dengan satu
+partition DEFAULT untuk tarikh NULL. Partition bulanan dicipta semasa ingest
+(ensure_partitions) sebelum data ditulis, jadi penapis tarikh dalam view dan
+reconcile hanya imbas bulan yang berkaitan (partition pruning).
+
+Table sedia ada yang belum dipartition boleh dipindahkan dengan:
+
+    python partitioning.py migrate [transaksi_eod] [transaksi_emerchant]
+
+Nota: PostgreSQL tak benarkan FOREIGN KEY merujuk id table partition (kunci
+unik mesti termasuk kolum partition), jadi reconciliation_matches menyimpan
+id transaksi tanpa FK.
+
+Selagi table sedia ada belum dimigrate, DDL partition dilangkau dengan amaran
+dan ingest terus menulis ke table biasa.
+"""
+import logging
+import sys
+import threading
+
+import pandas as pd
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Table yang dipartition ikut bulan: nama table -> kolum kunci partition
+PARTITIONED_TABLES = {
+    'transaksi_eod': 'date_of_transaction',
+    'transaksi_emerchant': 'transaction_date',
+}
+
+TABLE_DDL = {
+    'transaksi_eod': """
+        CREATE TABLE IF NOT EXISTS transaksi_eod (
+            id SERIAL NOT NULL,
+            terminal_name TEXT,
+            tid VARCHAR(100),
+            till_summary_no VARCHAR(100),
+            till_closure_no VARCHAR(100),
+            date_of_transaction TIMESTAMP,
+            tx_date DATE GENERATED ALWAYS AS (date_of_transaction::date) STORED,
+            card_type VARCHAR(100),
+            card_number VARCHAR(100),
+            receipt VARCHAR(100),
+            ref_number VARCHAR(100),
+            stan_no VARCHAR(100),
+            acquirer_mid VARCHAR(100),
+            acquirer_tid VARCHAR(100),
+            approval_code VARCHAR(100),
+            amount_rm DECIMAL(12, 2),
+            uploaded_by INTEGER,
+            batch_id VARCHAR(100),
+            file_name VARCHAR(255),
+            uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            reconciliation_status VARCHAR(20) DEFAULT 'PENDING',
+            CONSTRAINT unique_transaction_ref UNIQUE (tid, ref_number, date_of_transaction, amount_rm)
+        ) PARTITION BY RANGE (date_of_transaction);
+        CREATE TABLE IF NOT EXISTS transaksi_eod_default PARTITION OF transaksi_eod DEFAULT;
+
+        CREATE INDEX IF NOT EXISTS idx_eod_id ON transaksi_eod (id);
+        CREATE INDEX IF NOT EXISTS idx_ref_num ON transaksi_eod (ref_number);
+        CREATE INDEX IF NOT EXISTS idx_eod_date ON transaksi_eod (date_of_transaction);
+        CREATE INDEX IF NOT EXISTS idx_eod_batch ON transaksi_eod (batch_id);
+        CREATE INDEX IF NOT EXISTS idx_eod_recon_key ON transaksi_eod (tx_date, approval_code, amount_rm);
+        CREATE INDEX IF NOT EXISTS idx_eod_user_seek ON transaksi_eod (uploaded_by, date_of_transaction DESC, id DESC);
+        CREATE INDEX IF NOT EXISTS idx_eod_recon_open ON transaksi_eod (uploaded_by, tx_date, amount_rm)
+            WHERE reconciliation_status IN ('PENDING', 'UNMATCHED');
+    """,
+    'transaksi_emerchant': """
+        CREATE TABLE IF NOT EXISTS transaksi_emerchant (
+            id SERIAL NOT NULL,
+            merchant_code VARCHAR(100),
+            store_id VARCHAR(100),
+            transaction_date DATE,
+            order_id VARCHAR(100),
+            payment_method VARCHAR(100),
+            amount DECIMAL(15, 2),
+            fee DECIMAL(15, 2),
+            net_amount DECIMAL(15, 2),
+            customer_email VARCHAR(255),
+            status VARCHAR(50),
+            settlement_date DATE,
+            uploaded_by INTEGER,
+            batch_id VARCHAR(100),
+            file_name VARCHAR(255),
+            uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            reconciliation_status VARCHAR(20) DEFAULT 'PENDING',
+            CONSTRAINT uniq_emerchant_order UNIQUE (order_id, transaction_date, amount)
+        ) PARTITION BY RANGE (transaction_date);
+        CREATE TABLE IF NOT EXISTS transaksi_emerchant_default PARTITION OF transaksi_emerchant DEFAULT;
+
+        CREATE INDEX IF NOT EXISTS idx_emerchant_id ON transaksi_emerchant (id);
+        CREATE INDEX IF NOT EXISTS idx_emerchant_batch ON transaksi_emerchant (batch_id);
+        CREATE INDEX IF NOT EXISTS idx_emerchant_recon_key ON transaksi_emerchant (transaction_date, amount);
+        CREATE INDEX IF NOT EXISTS idx_emerchant_recon_open ON transaksi_emerchant (uploaded_by, transaction_date, amount)
+            WHERE reconciliation_status IN ('PENDING', 'UNMATCHED');
+        CREATE INDEX IF NOT EXISTS idx_emerchant_user_date ON transaksi_emerchant (uploaded_by, transaction_date);
+        CREATE INDEX IF NOT EXISTS idx_emerchant_user_merchant ON transaksi_emerchant (uploaded_by, merchant_code);
+        CREATE INDEX IF NOT EXISTS idx_emerchant_user_seek ON transaksi_emerchant (uploaded_by, transaction_date DESC, id DESC);
+    """,
+}
+
+# Partition yang sudah dipastikan wujud dalam proses ini (elak DDL berulang setiap chunk)
+_known_partitions = set()
+# Table sedia ada yang belum dimigrate (tiada DDL partition untuknya)
+_plain_tables = set()
+_known_lock = threading.Lock()
+
+
+def init_partitioned_tables(db_engine, tables=None):
+    """Cipta table induk (jika belum wujud) sebagai table partition bulanan.
+
+    Table sedia ada yang belum dipartition dibiarkan (amaran sahaja); jalankan
+    `python partitioning.py migrate` untuk memindahkannya.
+    """
+    with db_engine.begin() as conn:
+        for table in tables or PARTITIONED_TABLES:
+            if _is_plain_table(conn, table):
+                continue
+            conn.execute(text(TABLE_DDL[table]))
+
+
+def _is_plain_table(conn, table):
+    """True (dan amaran sekali) jika table wujud tetapi belum dipartition."""
+    with _known_lock:
+        if table in _plain_tables:
+            return True
+    exists = conn.execute(text("SELECT to_regclass(:table) IS NOT NULL"), {'table': table}).scalar()
+    if not exists or is_partitioned(conn, table):
+        return False
+    with _known_lock:
+        _plain_tables.add(table)
+    logger.warning(f"{table} belum dipartition; DDL partition dilangkau "
+                   f"(jalankan: python partitioning.py migrate {table})")
+    return True
+
+
+def partition_name(table, month):
+    return f"{table}_p{month:%Y%m}"
+
+
+def ensure_partitions(db_engine, table, dates):
+    """Pastikan partition bulanan wujud untuk semua tarikh dalam `dates`.
+
+    Dijalankan dalam transaksi sendiri sebelum data ditulis: CREATE ... PARTITION OF
+    perlu lock eksklusif pada table induk, jadi ia dipendekkan sebanyak mungkin.
+    Advisory lock elak dua ingest serentak mencipta partition yang sama.
+    Table yang belum dimigrate (tak dipartition) dilangkau.
+    """
+    months = {period.start_time.date() for period in
+              pd.to_datetime(pd.Series(dates), errors='coerce').dropna().dt.to_period('M').unique()}
+    with _known_lock:
+        missing = sorted(month for month in months if (table, month) not in _known_partitions)
+    if not missing:
+        return []
+
+    with db_engine.begin() as conn:
+        if _is_plain_table(conn, table):
+            return []
+        conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:table))"), {'table': table})
+        for month in missing:
+            _create_partition(conn, table, month)
+
+    with _known_lock:
+        _known_partitions.update((table, month) for month in missing)
+    return missing
+
+
+def _create_partition(conn, table, month):
+    next_month = (pd.Timestamp(month) + pd.offsets.MonthBegin(1)).date()
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {partition_name(table, month)}
+        PARTITION OF {table} FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{next_month:%Y-%m-%d}')
+    """))
+
+
+def is_partitioned(conn, table):
+    return conn.execute(text("""
+        SELECT relkind = 'p' FROM pg_class
+        WHERE oid = to_regclass(:table)
+    """), {'table': table}).scalar() is True
+
+
+def migrate_to_partitioned(db_engine, table):
+    """Pindahkan table sedia ada (tak dipartition) ke table partition bulanan.
+
+    Table lama (berserta index dan sequence) di-rename kepada {table}_legacy,
+    data disalin bulan demi bulan dengan id asal, dan sequence id diteruskan.
+    Table legacy tidak dibuang; DROP secara manual selepas disemak.
+    Pulangkan bilangan rekod yang disalin.
+    """
+    column = PARTITIONED_TABLES[table]
+    legacy = f"{table}_legacy"
+
+    with db_engine.begin() as conn:
+        if is_partitioned(conn, table):
+            print(f"   ⏭️  {table} sudah dipartition.")
+            return 0
+        with _known_lock:
+            _plain_tables.discard(table)
+
+        _drop_referencing_foreign_keys(conn, table)
+        _rename_to_legacy(conn, table, legacy)
+        conn.execute(text(TABLE_DDL[table]))
+
+        columns = [row[0] for row in conn.execute(text("""
+            SELECT c.column_name
+            FROM information_schema.columns c
+            JOIN information_schema.columns n
+              ON n.table_name = :table AND n.column_name = c.column_name AND n.is_generated = 'NEVER'
+            WHERE c.table_name = :legacy AND c.is_generated = 'NEVER'
+            ORDER BY c.ordinal_position
+        """), {'table': table, 'legacy': legacy})]
+        column_list = ', '.join(columns)
+
+        months = [row[0] for row in conn.execute(text(f"""
+            SELECT DISTINCT date_trunc('month', {column})::date FROM {legacy}
+            WHERE {column} IS NOT NULL ORDER BY 1
+        """))]
+
+        copied = 0
+        for month in months:
+            _create_partition(conn, table, month)
+            copied += conn.execute(text(f"""
+                INSERT INTO {table} ({column_list})
+                SELECT {column_list} FROM {legacy}
+                WHERE {column} >= :month AND {column} < (:month + INTERVAL '1 month')
+            """), {'month': month}).rowcount
+            print(f"   📦 {partition_name(table, month)}: {copied} rekod setakat ini")
+        copied += conn.execute(text(f"""
+            INSERT INTO {table} ({column_list})
+            SELECT {column_list} FROM {legacy} WHERE {column} IS NULL
+        """)).rowcount
+
+        conn.execute(text(f"""
+            SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 0) + 1, false)
+            FROM {table}
+        """))
+
+    with _known_lock:
+        _known_partitions.update((table, month) for month in months)
+    print(f"✅ {table}: {copied} rekod dipindahkan ke {len(months)} partition. Table lama: {legacy}")
+    return copied
+
+
+def _drop_referencing_foreign_keys(conn, table):
+    rows = conn.execute(text("""
+        SELECT conrelid::regclass::text, conname
+        FROM pg_constraint
+        WHERE contype = 'f' AND confrelid = to_regclass(:table)
+    """), {'table': table}).fetchall()
+    for referencing_table, constraint in rows:
+        conn.execute(text(f'ALTER TABLE {referencing_table} DROP CONSTRAINT "{constraint}"'))
+
+
+def _rename_to_legacy(conn, table, legacy):
+    """Rename table, index dan sequence supaya nama asal boleh diguna oleh table baru."""
+    sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {'table': table}).scalar()
+    indexes = [row[0] for row in conn.execute(text("""
+        SELECT indexname FROM pg_indexes WHERE tablename = :table
+    """), {'table': table})]
+
+    conn.execute(text(f"ALTER TABLE {table} RENAME TO {legacy}"))
+    for index in indexes:
+        # Rename index unik turut rename constraint-nya
+        conn.execute(text(f'ALTER INDEX "{index}" RENAME TO "{index[:55]}_legacy"'))
+    if sequence:
+        conn.execute(text(f"ALTER SEQUENCE {sequence} RENAME TO {table}_id_seq_legacy"))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] != 'migrate':
+        print(__doc__)
+        sys.exit(1)
+
+    from app import app
+    from extensions import db
+
+    with app.app_context():
+        for name in sys.argv[2:] or list(PARTITIONED_TABLES):
+            migrate_to_partitioned(db.engine, name)
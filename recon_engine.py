@@ -0,0 +1,417 @@
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+from recon_summary import refresh_summary
+from search import escape_like
+
+# Pemberat skor padanan fuzzy (jumlah 100)
+FUZZY_WEIGHTS = {'amount': 50, 'date': 30, 'reference': 20}
+
+# Toleransi pass fuzzy: beza amaun (RM) dan beza hari maksimum
+FUZZY_AMOUNT_TOLERANCE = 1.00
+FUZZY_DAY_TOLERANCE = 1
+
+# Kriteria default ikut checkbox dalam reconcile.html
+DEFAULT_CRITERIA = {
+    'matchAmount': True,
+    'matchDate': True,
+    'matchMerchant': False,
+    'autoMatchExact': True,
+    'autoMatchPartial': False
+}
+
+
+class ReconEngine:
+    """Reconciliation EOD vs e-merchant secara set-based dalam PostgreSQL.
+
+    FULL OUTER JOIN dibuat sepenuhnya di server ke dalam temp table
+    recon_result; Python hanya terima ringkasan dan satu page hasil.
+    Rekod dengan kunci yang sama dipadankan 1:1 ikut ROW_NUMBER(), jadi
+    dua transaksi RM10 pada hari yang sama tak dipadankan dua kali.
+
+    Mod incremental hanya ambil set terbuka (reconciliation_status PENDING
+    atau UNMATCHED) di kedua-dua belah melalui partial index. Jika tarikh ialah
+    kunci padanan, set terbuka dihadkan lagi kepada hari yang ada rekod PENDING
+    (± FUZZY_DAY_TOLERANCE): baki UNMATCHED pada hari lain sudah gagal dipadankan
+    sesama sendiri, jadi kos run ikut hari batch baru, bukan seluruh backlog.
+    Tanpa kunci tarikh (padanan amaun sahaja), kos ikut saiz backlog terbuka.
+    """
+
+    def __init__(self, db_engine, user_id):
+        self.engine = db_engine
+        self.user_id = user_id
+
+    def run(self, start_date=None, end_date=None, merchant_filter=None, criteria=None, threshold=95,
+            incremental=False, page=1, per_page=100):
+        criteria = {**DEFAULT_CRITERIA, **(criteria or {})}
+        if criteria.get('matchMerchant'):
+            # terminal_name (EOD) dan merchant_code (e-merchant) bukan pengecam yang sama
+            raise ValueError('Padanan ikut Merchant ID belum disokong: tiada kunci merchant yang sama '
+                             'antara EOD dan e-merchant')
+        keys = [key for flag, key in (('matchDate', 'tx_date'), ('matchAmount', 'amount')) if criteria.get(flag)]
+        if not keys:
+            raise ValueError('Pilih sekurang-kurangnya satu kriteria padanan (amount atau date)')
+        has_dates = start_date is not None and end_date is not None
+        if not incremental and not has_dates:
+            raise ValueError('start_date dan end_date diperlukan untuk run penuh')
+
+        params = {
+            'user_id': self.user_id,
+            'start_date': start_date,
+            'end_date': end_date,
+            # Julat timestamp separuh terbuka supaya index pada date_of_transaction boleh digunakan
+            'start_ts': start_date,
+            'end_ts': end_date + timedelta(days=1) if has_dates else None,
+            'merchant': f"{escape_like(merchant_filter)}%" if merchant_filter else None,
+            'threshold': threshold
+        }
+        save_exact = bool(criteria.get('autoMatchExact'))
+        save_partial = bool(criteria.get('autoMatchPartial'))
+        saved_types = [t for t, save in (('exact', save_exact), ('partial', save_partial)) if save]
+        params['saved_types'] = saved_types
+
+        started = time.perf_counter()
+        with self.engine.begin() as conn:
+            cleared_days = set()
+            if saved_types and not incremental:
+                cleared_days = self._clear_pending_matches(conn, params)
+            pending_days = incremental and 'tx_date' in keys
+            if pending_days:
+                self._pending_days(conn, params)
+            conn.execute(text(self._result_table_sql(keys, bool(merchant_filter), incremental, has_dates,
+                                                     pending_days)), params)
+            self._fuzzy_pass(conn, params)
+            if saved_types:
+                self._save_matches(conn, params, saved_types)
+                self._update_status(conn, saved_types)
+                self._refresh_summary(conn, cleared_days)
+
+            summary = self._summary(conn)
+            data = self._pages(conn, page, per_page, save_exact, save_partial)
+
+        summary['elapsed_seconds'] = round(time.perf_counter() - started, 3)
+        return {'summary': summary, 'data': data, 'page': page, 'per_page': per_page}
+
+    def _clear_pending_matches(self, conn, params):
+        """Padanan auto ('pending') jenis yang disimpan run ini dijana semula.
+
+        Hanya padanan yang kedua-dua belahnya dalam skop run dibuang: EOD dan
+        e-merchant dalam julat tarikh, dan e-merchant padan merchant_filter.
+        'confirmed', jenis lain dan padanan yang separuh di luar skop dikekalkan
+        (dan kekal di luar recon_result). Kedua-dua belah padanan yang dibuang
+        di-reset ke UNMATCHED; yang masih dalam skop ditulis semula oleh
+        _update_status.
+
+        Pulangkan hari yang terjejas (hari padanan dan hari transaksi kedua-dua belah).
+        """
+        merchant_clause = "AND em.merchant_code ILIKE :merchant ESCAPE '\\'" if params.get('merchant') else ""
+        rows = conn.execute(text(f"""
+            DELETE FROM reconciliation_matches r
+            USING transaksi_eod e, transaksi_emerchant em
+            WHERE r.eod_transaction_id = e.id
+              AND r.emerchant_transaction_id = em.id
+              AND r.matched_by = :user_id
+              AND r.match_status = 'pending'
+              AND r.match_type = ANY(:saved_types)
+              AND e.date_of_transaction >= :start_ts
+              AND e.date_of_transaction < :end_ts
+              AND em.transaction_date BETWEEN :start_date AND :end_date
+              {merchant_clause}
+            RETURNING r.eod_transaction_id, r.emerchant_transaction_id,
+                      r.matched_date::date, e.tx_date, em.transaction_date
+        """), params).fetchall()
+        if not rows:
+            return set()
+
+        # Tanpa padanan tinggal, kedua-dua belah kembali ke set terbuka
+        reset_sql = """
+            UPDATE {table} t SET reconciliation_status = 'UNMATCHED'
+            WHERE t.id = ANY(:ids) AND t.uploaded_by = :user_id
+              AND NOT EXISTS (
+                  SELECT 1 FROM reconciliation_matches r
+                  WHERE r.{column} = t.id AND r.match_status IN ('confirmed', 'pending')
+              )
+        """
+        conn.execute(text(reset_sql.format(table='transaksi_eod', column='eod_transaction_id')),
+                     {'ids': [row[0] for row in rows], 'user_id': self.user_id})
+        conn.execute(text(reset_sql.format(table='transaksi_emerchant', column='emerchant_transaction_id')),
+                     {'ids': [row[1] for row in rows], 'user_id': self.user_id})
+        return {day for row in rows for day in row[2:] if day is not None}
+
+    def _refresh_summary(self, conn, extra_days):
+        """Kemas kini recon_summary untuk hari transaksi yang disentuh run ini dan hari ini."""
+        days = {row[0] for row in conn.execute(text("""
+            SELECT e.tx_date FROM recon_result r JOIN transaksi_eod e ON e.id = r.eod_id
+            UNION
+            SELECT m.transaction_date FROM recon_result r JOIN transaksi_emerchant m ON m.id = r.emerchant_id
+        """))}
+        refresh_summary(conn, self.user_id, days | extra_days | {date.today()})
+
+    def _pending_days(self, conn, params):
+        """Temp table recon_days: hari yang ada rekod PENDING (batch baru) di mana-mana belah, ± toleransi hari."""
+        conn.execute(text("""
+            CREATE TEMP TABLE recon_days ON COMMIT DROP AS
+            SELECT DISTINCT p.day + nd.d AS day
+            FROM (
+                SELECT tx_date AS day FROM transaksi_eod
+                WHERE uploaded_by = :user_id AND reconciliation_status = 'PENDING'
+                UNION
+                SELECT transaction_date FROM transaksi_emerchant
+                WHERE uploaded_by = :user_id AND reconciliation_status = 'PENDING'
+            ) p
+            CROSS JOIN generate_series(-CAST(:day_tol AS int), CAST(:day_tol AS int)) AS nd(d)
+            WHERE p.day IS NOT NULL
+        """), {**params, 'day_tol': FUZZY_DAY_TOLERANCE})
+
+    def _result_table_sql(self, keys, has_merchant_filter, incremental=False, has_dates=True, pending_days=False):
+        partition = ', '.join(keys)
+        join_on = ' AND '.join(f"e.{key} = m.{key}" for key in keys)
+        eod_scope = []
+        emerchant_scope = []
+        if has_dates:
+            eod_scope += ["date_of_transaction >= :start_ts", "date_of_transaction < :end_ts"]
+            emerchant_scope.append("transaction_date BETWEEN :start_date AND :end_date")
+        if has_merchant_filter:
+            emerchant_scope.append("merchant_code ILIKE :merchant ESCAPE '\\'")
+        if incremental:
+            # Baris yang sudah MATCHED/PARTIAL tak disentuh; padanan 'confirmed' sentiasa MATCHED
+            open_set = "reconciliation_status IN ('PENDING', 'UNMATCHED')"
+            eod_scope.append(open_set)
+            emerchant_scope.append(open_set)
+            if pending_days:
+                eod_scope.append("tx_date IN (SELECT day FROM recon_days)")
+                emerchant_scope.append("transaction_date IN (SELECT day FROM recon_days)")
+        else:
+            # Padanan yang dijana semula sudah dibuang oleh _clear_pending_matches; yang tinggal
+            # ('confirmed', 'pending' jenis lain atau separuh di luar skop) dikekalkan
+            kept = "r.match_status IN ('confirmed', 'pending')"
+            eod_scope.append(f"""NOT EXISTS (
+                      SELECT 1 FROM reconciliation_matches r
+                      WHERE r.eod_transaction_id = t.id AND {kept}
+                  )""")
+            emerchant_scope.append(f"""NOT EXISTS (
+                      SELECT 1 FROM reconciliation_matches r
+                      WHERE r.emerchant_transaction_id = t.id AND {kept}
+                  )""")
+        eod_where = ''.join(f"\n                  AND {clause}" for clause in eod_scope)
+        emerchant_where = ''.join(f"\n                  AND {clause}" for clause in emerchant_scope)
+        return f"""
+            CREATE TEMP TABLE recon_result ON COMMIT DROP AS
+            WITH e AS (
+                SELECT id,
+                       tx_date,
+                       amount_rm AS amount,
+                       ROW_NUMBER() OVER (PARTITION BY {partition} ORDER BY date_of_transaction, id) AS rn
+                FROM transaksi_eod t
+                WHERE uploaded_by = :user_id{eod_where}
+            ),
+            m AS (
+                SELECT id,
+                       transaction_date AS tx_date,
+                       amount,
+                       ROW_NUMBER() OVER (PARTITION BY {partition} ORDER BY id) AS rn
+                FROM transaksi_emerchant t
+                WHERE uploaded_by = :user_id{emerchant_where}
+            )
+            SELECT e.id AS eod_id,
+                   m.id AS emerchant_id,
+                   CASE WHEN e.id IS NOT NULL AND m.id IS NOT NULL THEN 100 END AS match_score,
+                   CASE WHEN e.id IS NOT NULL AND m.id IS NOT NULL THEN 'exact' END::varchar(10) AS match_type
+            FROM e
+            FULL OUTER JOIN m ON {join_on} AND e.rn = m.rn
+        """
+
+    def _fuzzy_pass(self, conn, params):
+        """Pass kedua untuk baki unmatched: skor calon dan simpan pasangan >= threshold.
+
+        Calon di-block ikut hari dan bucket amaun (lebar = toleransi amaun). Belah
+        e-merchant dikembangkan ke bucket/hari jiran (3 x 3), jadi join ialah hash
+        join kesamaan dan kos kekal hampir linear, bukan cross product n x m.
+        Pasangan dipilih 1:1 secara mutual-best (skor tertinggi di kedua-dua belah).
+
+        transaksi_emerchant tiada nombor kad atau masa transaksi, jadi skor guna
+        beza amaun, beza hari, dan persamaan order_id dengan ref_number/receipt.
+        """
+        fuzzy_params = {
+            **params,
+            'tol': FUZZY_AMOUNT_TOLERANCE,
+            'day_tol': FUZZY_DAY_TOLERANCE,
+            'w_amount': FUZZY_WEIGHTS['amount'],
+            'w_date': FUZZY_WEIGHTS['date'],
+            'w_ref': FUZZY_WEIGHTS['reference']
+        }
+        conn.execute(text("""
+            CREATE TEMP TABLE recon_fuzzy ON COMMIT DROP AS
+            WITH eu AS (
+                SELECT e.id, e.tx_date, e.amount_rm AS amount, e.ref_number, e.receipt,
+                       FLOOR(e.amount_rm / :tol)::bigint AS bucket
+                FROM recon_result r
+                JOIN transaksi_eod e ON e.id = r.eod_id
+                WHERE r.emerchant_id IS NULL
+            ),
+            mu AS (
+                SELECT m.id, m.transaction_date AS tx_date, m.amount, m.order_id,
+                       FLOOR(m.amount / :tol)::bigint + nb.d AS bucket,
+                       m.transaction_date + nd.d AS block_day
+                FROM recon_result r
+                JOIN transaksi_emerchant m ON m.id = r.emerchant_id
+                CROSS JOIN (VALUES (-1), (0), (1)) AS nb(d)
+                CROSS JOIN generate_series(-CAST(:day_tol AS int), CAST(:day_tol AS int)) AS nd(d)
+                WHERE r.eod_id IS NULL
+            ),
+            candidates AS (
+                SELECT eu.id AS eod_id,
+                       mu.id AS emerchant_id,
+                       ROUND(
+                           :w_amount * GREATEST(0, 1 - ABS(eu.amount - mu.amount) / :tol)
+                         + :w_date * (1 - ABS(eu.tx_date - mu.tx_date) / (:day_tol + 1.0))
+                         + :w_ref * CASE
+                               WHEN mu.order_id IN (eu.ref_number, eu.receipt) THEN 1
+                               WHEN RIGHT(mu.order_id, 4) IN (RIGHT(eu.ref_number, 4), RIGHT(eu.receipt, 4)) THEN 0.5
+                               ELSE 0
+                           END
+                       )::int AS score
+                FROM eu
+                JOIN mu ON mu.block_day = eu.tx_date AND mu.bucket = eu.bucket
+                WHERE ABS(eu.amount - mu.amount) <= :tol
+            ),
+            ranked AS (
+                SELECT eod_id, emerchant_id, score,
+                       ROW_NUMBER() OVER (PARTITION BY eod_id ORDER BY score DESC, emerchant_id) AS eod_rank,
+                       ROW_NUMBER() OVER (PARTITION BY emerchant_id ORDER BY score DESC, eod_id) AS emerchant_rank
+                FROM candidates
+                WHERE score >= :threshold
+            )
+            SELECT eod_id, emerchant_id, score
+            FROM ranked
+            WHERE eod_rank = 1 AND emerchant_rank = 1
+        """), fuzzy_params)
+
+        # Gabungkan dua baris unmatched menjadi satu baris padanan 'partial'
+        conn.execute(text("""
+            DELETE FROM recon_result r
+            WHERE (r.emerchant_id IS NULL AND r.eod_id IN (SELECT eod_id FROM recon_fuzzy))
+               OR (r.eod_id IS NULL AND r.emerchant_id IN (SELECT emerchant_id FROM recon_fuzzy))
+        """))
+        conn.execute(text("""
+            INSERT INTO recon_result (eod_id, emerchant_id, match_score, match_type)
+            SELECT eod_id, emerchant_id, score, 'partial' FROM recon_fuzzy
+        """))
+
+    def _save_matches(self, conn, params, match_types):
+        conn.execute(text("""
+            INSERT INTO reconciliation_matches
+                (eod_transaction_id, emerchant_transaction_id, match_score, match_status, matched_by, matched_date, match_type)
+            SELECT eod_id, emerchant_id, match_score, 'pending', :user_id, NOW(), match_type
+            FROM recon_result
+            WHERE match_type = ANY(:match_types)
+        """), {**params, 'match_types': match_types})
+
+    def _update_status(self, conn, saved_types):
+        """Kemas kini reconciliation_status di kedua-dua belah ikut hasil run.
+
+        Pasangan yang tak disimpan (preview) kekal UNMATCHED supaya masih dalam
+        set terbuka untuk run incremental seterusnya.
+        """
+        status_sql = """
+            SET reconciliation_status = CASE
+                WHEN r.match_type IS NULL OR r.match_type <> ALL(:saved_types) THEN 'UNMATCHED'
+                WHEN r.match_type = 'partial' THEN 'PARTIAL'
+                ELSE 'MATCHED'
+            END
+            FROM recon_result r
+        """
+        params = {'saved_types': saved_types}
+        conn.execute(text(f"UPDATE transaksi_eod t {status_sql} WHERE r.eod_id = t.id"), params)
+        conn.execute(text(f"UPDATE transaksi_emerchant t {status_sql} WHERE r.emerchant_id = t.id"), params)
+
+    def _summary(self, conn):
+        row = conn.execute(text("""
+            SELECT COUNT(*) FILTER (WHERE match_type = 'exact') AS matched,
+                   COUNT(*) FILTER (WHERE match_type = 'partial') AS partial_matches,
+                   COUNT(*) FILTER (WHERE emerchant_id IS NULL) AS unmatched_eod,
+                   COUNT(*) FILTER (WHERE eod_id IS NULL) AS unmatched_emerchant
+            FROM recon_result
+        """)).mappings().one()
+        return dict(row)
+
+    def _pages(self, conn, page, per_page, save_exact, save_partial):
+        limits = {'limit': per_page, 'offset': (page - 1) * per_page}
+
+        matched = conn.execute(text("""
+            SELECT r.eod_id, r.emerchant_id, r.match_score, r.match_type,
+                   e.terminal_name, e.tid, e.date_of_transaction, e.amount_rm,
+                   m.order_id, m.merchant_code, m.transaction_date, m.amount
+            FROM recon_result r
+            JOIN transaksi_eod e ON e.id = r.eod_id
+            JOIN transaksi_emerchant m ON m.id = r.emerchant_id
+            ORDER BY r.eod_id
+            LIMIT :limit OFFSET :offset
+        """), limits).mappings().all()
+
+        unmatched_eod = conn.execute(text("""
+            SELECT e.id, e.terminal_name, e.tid, e.date_of_transaction, e.amount_rm, e.card_number
+            FROM recon_result r
+            JOIN transaksi_eod e ON e.id = r.eod_id
+            WHERE r.emerchant_id IS NULL
+            ORDER BY r.eod_id
+            LIMIT :limit OFFSET :offset
+        """), limits).mappings().all()
+
+        unmatched_emerchant = conn.execute(text("""
+            SELECT m.id, m.order_id, m.merchant_code, m.amount, m.transaction_date, m.customer_email
+            FROM recon_result r
+            JOIN transaksi_emerchant m ON m.id = r.emerchant_id
+            WHERE r.eod_id IS NULL
+            ORDER BY r.emerchant_id
+            LIMIT :limit OFFSET :offset
+        """), limits).mappings().all()
+
+        return {
+            'matched': [{
+                'eod_id': row['eod_id'],
+                'emerchant_id': row['emerchant_id'],
+                'eod_merchant_id': row['terminal_name'],
+                'eod_terminal_id': row['tid'],
+                'eod_transaction_date': _fmt_ts(row['date_of_transaction']),
+                'eod_date': _fmt_date(row['date_of_transaction']),
+                'eod_amount': _to_float(row['amount_rm']),
+                'emerchant_order_id': row['order_id'],
+                'emerchant_merchant_code': row['merchant_code'],
+                'emerchant_date': _fmt_date(row['transaction_date']),
+                'emerchant_amount': _to_float(row['amount']),
+                'confidence': row['match_score'],
+                'match_type': row['match_type'],
+                'status': 'pending' if (save_exact if row['match_type'] == 'exact' else save_partial) else 'preview'
+            } for row in matched],
+            'unmatchedEod': [{
+                'id': row['id'],
+                'transaction_date': _fmt_ts(row['date_of_transaction']),
+                'merchant_id': row['terminal_name'],
+                'terminal_id': row['tid'],
+                'amount': _to_float(row['amount_rm']),
+                'card_number': row['card_number']
+            } for row in unmatched_eod],
+            'unmatchedEmerchant': [{
+                'id': row['id'],
+                'order_id': row['order_id'],
+                'merchant_code': row['merchant_code'],
+                'amount': _to_float(row['amount']),
+                'transaction_date': _fmt_date(row['transaction_date']),
+                'customer_email': row['customer_email']
+            } for row in unmatched_emerchant]
+        }
+
+
+def _fmt_ts(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value else None
+
+
+def _fmt_date(value):
+    return value.strftime('%Y-%m-%d') if value else None
+
+
+def _to_float(value):
+    return float(value) if value is not None else None
@@ -0,0 +1,303 @@
+"""Export hasil reconciliation secara streaming (CSV, XLSX, Parquet).
+
+Rekod dibaca dari server-side cursor dalam chunk DataFrame dan terus ditulis
+ke output, jadi export berjuta baris tidak pernah dimuatkan sekaligus ke RAM:
+
+- CSV: generator teks, satu chunk setiap kali.
+- XLSX: openpyxl write-only (baris ditulis ke fail sementara, bukan objek sel).
+- Parquet: satu row group setiap chunk (perlukan pakej pyarrow), dengan skema
+  yang diisytihar per query supaya kolum yang NULL dalam satu chunk tetap
+  sama jenis di setiap row group.
+"""
+import io
+import os
+import re
+import tempfile
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from amount_parsing import cents_to_decimal
+
+EXPORT_CHUNK_ROWS = 50000
+EXCEL_MAX_ROWS = 1048576  # had baris satu sheet Excel (termasuk header)
+FILE_CHUNK_BYTES = 1024 * 1024
+
+# format -> (mimetype, sambungan fail)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+# Semua rekod EOD dalam julat + padanan e-merchant, kemudian e-merchant tanpa padanan
+RECON_EXPORT_SQL = """
+    SELECT 'EOD' AS source,
+           t.id AS eod_id, t.date_of_transaction, t.terminal_name, t.approval_code, t.amount_rm,
+           em.id AS emerchant_id, em.transaction_date, em.merchant_code, em.order_id, em.amount,
+           rm.match_type, rm.match_score, rm.match_status,
+           t.reconciliation_status
+    FROM transaksi_eod t
+    LEFT JOIN reconciliation_matches rm
+           ON rm.eod_transaction_id = t.id AND rm.match_status <> 'rejected'
+    LEFT JOIN transaksi_emerchant em ON em.id = rm.emerchant_transaction_id
+    WHERE t.uploaded_by = :user_id
+      AND t.date_of_transaction >= :start_date
+      AND t.date_of_transaction < CAST(:end_date AS date) + 1
+    UNION ALL
+    SELECT 'EMERCHANT',
+           NULL, NULL, NULL, NULL, NULL,
+           em.id, em.transaction_date, em.merchant_code, em.order_id, em.amount,
+           NULL, NULL, NULL,
+           em.reconciliation_status
+    FROM transaksi_emerchant em
+    WHERE em.uploaded_by = :user_id
+      AND em.transaction_date BETWEEN :start_date AND :end_date
+      AND NOT EXISTS (
+          SELECT 1 FROM reconciliation_matches rm
+          WHERE rm.emerchant_transaction_id = em.id AND rm.match_status <> 'rejected'
+      )
+"""
+
+# Skema Parquet (kolum -> jenis) ikut susunan SELECT; jenis ikut kolum DB
+RECON_EXPORT_COLUMNS = {
+    'source': 'string',
+    'eod_id': 'int64',
+    'date_of_transaction': 'timestamp',
+    'terminal_name': 'string',
+    'approval_code': 'string',
+    'amount_rm': 'decimal(12,2)',
+    'emerchant_id': 'int64',
+    'transaction_date': 'date',
+    'merchant_code': 'string',
+    'order_id': 'string',
+    'amount': 'decimal(15,2)',
+    'match_type': 'string',
+    'match_score': 'int64',
+    'match_status': 'string',
+    'reconciliation_status': 'string',
+}
+
+# Laporan satu batch upload e-merchant, dengan transaksi EOD yang dipadankan
+BATCH_REPORT_SQL = """
+    SELECT em.id AS emerchant_id, em.merchant_code, em.store_id, em.transaction_date,
+           em.order_id, em.payment_method, em.amount, em.fee, em.net_amount, em.status,
+           em.settlement_date, em.reconciliation_status,
+           t.id AS eod_id, t.date_of_transaction, t.terminal_name, t.approval_code, t.amount_rm,
+           rm.match_type, rm.match_score, rm.match_status
+    FROM transaksi_emerchant em
+    LEFT JOIN reconciliation_matches rm
+           ON rm.emerchant_transaction_id = em.id AND rm.match_status <> 'rejected'
+    LEFT JOIN transaksi_eod t ON t.id = rm.eod_transaction_id
+    WHERE em.batch_id = :batch_id AND em.uploaded_by = :user_id
+"""
+
+BATCH_REPORT_COLUMNS = {
+    'emerchant_id': 'int64',
+    'merchant_code': 'string',
+    'store_id': 'string',
+    'transaction_date': 'date',
+    'order_id': 'string',
+    'payment_method': 'string',
+    'amount': 'decimal(15,2)',
+    'fee': 'decimal(15,2)',
+    'net_amount': 'decimal(15,2)',
+    'status': 'string',
+    'settlement_date': 'date',
+    'reconciliation_status': 'string',
+    'eod_id': 'int64',
+    'date_of_transaction': 'timestamp',
+    'terminal_name': 'string',
+    'approval_code': 'string',
+    'amount_rm': 'decimal(12,2)',
+    'match_type': 'string',
+    'match_score': 'int64',
+    'match_status': 'string',
+}
+
+
+def iter_query_frames(db_engine, sql, params, chunk_size=EXPORT_CHUNK_ROWS):
+    """DataFrame demi DataFrame dari server-side cursor (stream_results).
+
+    Sambungan dibuka hanya semasa generator digunakan dan ditutup bila habis
+    atau bila klien putus (GeneratorExit).
+    """
+    with db_engine.connect() as conn:
+        conn = conn.execution_options(stream_results=True, max_row_buffer=chunk_size)
+        for chunk in pd.read_sql(text(sql), conn, params=params, chunksize=chunk_size):
+            yield chunk
+
+
+def export_stream(frames, fmt, columns=None):
+    """Pulangkan generator bytes untuk format yang diminta.
+
+    columns: skema kolum -> jenis (cth. RECON_EXPORT_COLUMNS), wajib untuk Parquet.
+    """
+    if fmt == 'csv':
+        return iter_csv(frames)
+    if fmt == 'xlsx':
+        return iter_xlsx(frames)
+    if fmt == 'parquet':
+        if columns is None:
+            raise ValueError("Export Parquet perlukan skema kolum")
+        return iter_parquet(frames, columns)
+    raise ValueError(f"Format export tidak disokong: {fmt}")
+
+
+def check_format(fmt):
+    """ValueError jika format tak disokong atau pakej yang diperlukan tiada."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Format export tidak disokong: {fmt} (pilih {', '.join(EXPORT_FORMATS)})")
+    if fmt == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ValueError("Export Parquet perlukan pakej pyarrow")
+
+
+def export_to_file(frames, path, fmt, columns=None):
+    """Tulis export ke fail (untuk CLI); pulangkan bilangan bytes."""
+    written = 0
+    with open(path, 'wb') as handle:
+        for block in export_stream(frames, fmt, columns):
+            handle.write(block)
+            written += len(block)
+    return written
+
+
+def iter_csv(frames):
+    header = True
+    for chunk in frames:
+        yield chunk.to_csv(index=False, header=header).encode('utf-8')
+        header = False
+
+
+def iter_xlsx(frames):
+    """XLSX constant-memory: workbook write-only ke fail sementara, kemudian distream.
+
+    Sheet baru dibuka bila had baris Excel dicapai.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet, sheet_rows, columns = None, 0, None
+    for chunk in frames:
+        if columns is None:
+            columns = list(chunk.columns)
+        chunk = chunk.astype(object).where(chunk.notna(), None)
+        for row in chunk.itertuples(index=False, name=None):
+            if sheet is None or sheet_rows >= EXCEL_MAX_ROWS:
+                sheet = workbook.create_sheet(f"Recon_{len(workbook.worksheets) + 1}")
+                sheet.append(columns)
+                sheet_rows = 1
+            sheet.append(row)
+            sheet_rows += 1
+    if sheet is None:
+        workbook.create_sheet('Recon_1')
+
+    fd, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(fd)
+    try:
+        workbook.save(path)
+        with open(path, 'rb') as handle:
+            while True:
+                block = handle.read(FILE_CHUNK_BYTES)
+                if not block:
+                    break
+                yield block
+    finally:
+        os.remove(path)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Sink tulis sahaja untuk ParquetWriter; bytes diambil selepas setiap row group."""
+
+    def __init__(self):
+        self.blocks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self.blocks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b''.join(self.blocks)
+        self.blocks = []
+        return data
+
+
+def iter_parquet(frames, columns):
+    """Parquet dengan satu row group setiap chunk, skema tetap dari `columns`.
+
+    Setiap chunk ditukar ke jenis yang diisytihar (kolum yang semuanya NULL
+    dalam satu chunk tetap sama jenis). Tanpa rekod, fail Parquet kosong yang
+    sah dengan skema yang sama tetap ditulis.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = parquet_schema(pa, columns)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for chunk in frames:
+            if len(chunk):
+                writer.write_table(_arrow_table(pa, chunk, schema))
+                yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def parquet_schema(pa, columns):
+    """Skema pyarrow dari kolum -> jenis ('string', 'int64', 'timestamp', 'date', 'decimal(p,s)')."""
+    return pa.schema([(name, _arrow_type(pa, kind)) for name, kind in columns.items()])
+
+
+def _arrow_type(pa, kind):
+    decimal = re.fullmatch(r'decimal\((\d+),\s*(\d+)\)', kind)
+    if decimal:
+        return pa.decimal128(int(decimal.group(1)), int(decimal.group(2)))
+    return {
+        'string': pa.string(),
+        'int64': pa.int64(),
+        'float64': pa.float64(),
+        'timestamp': pa.timestamp('us'),
+        'date': pa.date32(),
+    }[kind]
+
+
+def _arrow_table(pa, chunk, schema):
+    return pa.Table.from_arrays([_arrow_array(pa, chunk[field.name], field.type) for field in schema],
+                                schema=schema)
+
+
+def _arrow_array(pa, series, arrow_type):
+    """Satu kolum chunk -> array pyarrow berjenis `arrow_type` (NULL kekal NULL)."""
+    if pa.types.is_decimal(arrow_type):
+        if pd.api.types.is_numeric_dtype(series):
+            # read_sql beri DECIMAL sebagai float; dibundar ke sen dan dibina semula sebagai Decimal
+            values = pd.to_numeric(series).to_numpy(dtype=float)
+            missing = np.isnan(values)
+            values = cents_to_decimal(np.rint(np.where(missing, 0, values) * 100), missing)
+        else:
+            values = series.astype(object).where(series.notna(), None)
+        return pa.array(values, type=arrow_type)
+    if pa.types.is_timestamp(arrow_type) or pa.types.is_date(arrow_type):
+        return pa.array(pd.to_datetime(series), from_pandas=True).cast(arrow_type, safe=False)
+    if pa.types.is_integer(arrow_type) or pa.types.is_floating(arrow_type):
+        return pa.array(pd.to_numeric(series), from_pandas=True).cast(arrow_type)
+    return pa.array(series.astype('string'), type=arrow_type)
+
+
+def export_filename(prefix, fmt):
+    return f"{prefix}_{pd.Timestamp.now():%Y%m%d_%H%M%S}.{EXPORT_FORMATS[fmt][1]}"
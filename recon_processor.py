@@ -1,16 +1,139 @@
+import os
+
 import pandas as pd
 from sqlalchemy import text
 
+from recon_export import EXPORT_CHUNK_ROWS, iter_query_frames, export_to_file
+
+RESULT_FOLDER = 'result'
+
+# Kolum tarikh stored (generated) + composite index ikut kunci join:
+# (table, kolum, DDL kolum, index, DDL index)
+RECON_SCHEMA = [
+    ('transaksi_eod', 'tx_date',
+     "ALTER TABLE transaksi_eod ADD COLUMN tx_date DATE GENERATED ALWAYS AS (date_of_transaction::date) STORED",
+     'idx_eod_recon_key',
+     "CREATE INDEX IF NOT EXISTS idx_eod_recon_key ON transaksi_eod (tx_date, approval_code, amount_rm)"),
+    ('transaksi_merchant', 'tran_day',
+     "ALTER TABLE transaksi_merchant ADD COLUMN tran_day DATE GENERATED ALWAYS AS (tran_date::date) STORED",
+     'idx_merchant_recon_key',
+     "CREATE INDEX IF NOT EXISTS idx_merchant_recon_key ON transaksi_merchant (tran_day, auth_code, amount)"),
+]
+
+# Skema Parquet df_recon (SQL join dan SortMergeRecon)
+RECON_RESULT_COLUMNS = {
+    'eod_date': 'timestamp',
+    'merch_date': 'timestamp',
+    'eod_card': 'string',
+    'eod_receipt': 'string',
+    'eod_auth': 'string',
+    'merch_auth': 'string',
+    'eod_amount': 'decimal(12,2)',
+    'merch_amount': 'decimal(15,2)',
+    'merch_card': 'string',
+    'status': 'string',
+}
+
 class ReconProcessor:
-    def __init__(self, db_engine):
+    def __init__(self, db_engine, start_date=None, end_date=None,
+                 time_tolerance=None, amount_tolerance=0.0, fee_pct=0.0):
         self.engine = db_engine
+        self.start_date = start_date
+        self.end_date = end_date
+        # Toleransi: timedelta untuk masa, RM untuk amaun, peratus untuk fee band
+        self.time_tolerance = time_tolerance
+        self.amount_tolerance = amount_tolerance
+        self.fee_pct = fee_pct
         self.df_recon = None
 
     def run(self):
         """Logic Full Outer Join."""
         print("\n⚖️  [RECON] Sedang menjalankan Full Outer Join...")
+        self.reconcile()
+        print(f"✅ [RECON] Selesai! {len(self.df_recon)} transaksi dipadankan.")
+        self._export_menu()
+
+    def reconcile(self):
+        """Jalankan join dalam PostgreSQL dan pulangkan df_recon (tanpa menu export).
+
+        Jika ada toleransi masa/amaun, padanan dibuat dengan window join dalam
+        memori (SortMergeRecon) kerana join kesamaan SQL tak boleh guna index.
+        """
+        if self.has_tolerance:
+            from sortmerge_recon import SortMergeRecon
+            self.df_recon = SortMergeRecon(
+                self.engine, start_date=self.start_date, end_date=self.end_date,
+                time_tolerance=self.time_tolerance, amount_tolerance=self.amount_tolerance,
+                fee_pct=self.fee_pct
+            ).run()
+            return self.df_recon
+        
+        query, params = self._build_query()
+        self.df_recon = tag_status(pd.read_sql(text(query), self.engine, params=params))
+        return self.df_recon
+
+    def count(self):
+        """Bilangan baris hasil recon tanpa memuatkan df_recon (COUNT(*) di server).
+
+        Dengan toleransi, window join perlu dalam memori: df_recon dikira dan
+        disimpan untuk export seterusnya.
+        """
+        if self.has_tolerance:
+            return len(self.df_recon if self.df_recon is not None else self.reconcile())
+
+        query, params = self._build_query()
+        with self.engine.connect() as conn:
+            return conn.execute(text(f"SELECT COUNT(*) FROM ({query.rstrip().rstrip(';')}) recon"),
+                                params).scalar()
+
+    def iter_chunks(self, chunk_size=EXPORT_CHUNK_ROWS):
+        """Hasil recon chunk demi chunk.
+
+        Jika df_recon sudah dikira (atau ada toleransi, yang perlu window join dalam
+        memori), ia dipotong; selain itu query join distream dari server-side cursor.
+        """
+        if self.df_recon is None and self.has_tolerance:
+            self.reconcile()
+        if self.df_recon is not None:
+            for start in range(0, len(self.df_recon), chunk_size):
+                yield self.df_recon.iloc[start:start + chunk_size]
+            return
         
-        query = """
+        query, params = self._build_query()
+        for chunk in iter_query_frames(self.engine, query, params, chunk_size):
+            yield tag_status(chunk)
+
+    def export(self, fmt, path=None):
+        """Tulis hasil recon ke fail (csv/xlsx/parquet) secara streaming; pulangkan path."""
+        if path is None:
+            os.makedirs(RESULT_FOLDER, exist_ok=True)
+            path = os.path.join(RESULT_FOLDER, f"Recon_Result.{fmt}")
+        export_to_file(self.iter_chunks(), path, fmt, RECON_RESULT_COLUMNS)
+        return path
+
+    @property
+    def has_tolerance(self):
+        return bool(self.time_tolerance or self.amount_tolerance > 0 or self.fee_pct > 0)
+
+    def _build_query(self):
+        """Query full outer join; julat tarikh ditapis dalam setiap belah sebelum join."""
+        params = {}
+        eod_where = []
+        merch_where = []
+        if self.start_date:
+            params['start_date'] = self.start_date
+            # transaksi_eod ditapis pada kolum partition (date_of_transaction) untuk partition pruning
+            eod_where.append("date_of_transaction >= :start_date")
+            merch_where.append("tran_day >= :start_date")
+        if self.end_date:
+            params['end_date'] = self.end_date
+            eod_where.append("date_of_transaction < CAST(:end_date AS date) + 1")
+            merch_where.append("tran_day <= :end_date")
+
+        eod_filter = f"WHERE {' AND '.join(eod_where)}" if eod_where else ""
+        merch_filter = f"WHERE {' AND '.join(merch_where)}" if merch_where else ""
+
+        query = f"""
         SELECT 
             e.date_of_transaction AS eod_date,
             m.tran_date AS merch_date,
@@ -27,23 +150,14 @@ class ReconProcessor:
                 WHEN m.auth_code IS NULL THEN 'Missing in Merchant'
                 ELSE 'Matched'
             END AS status
-            FROM transaksi_eod e
-            FULL OUTER JOIN transaksi_merchant m 
-            ON e.date_of_transaction::date = m.tran_date::date
+            FROM (SELECT * FROM transaksi_eod {eod_filter}) e
+            FULL OUTER JOIN (SELECT * FROM transaksi_merchant {merch_filter}) m 
+            ON e.tx_date = m.tran_day
             AND e.approval_code = m.auth_code
             AND e.amount_rm = m.amount
             WHERE e.approval_code IS NULL OR m.auth_code IS NULL;
         """
-        
-        self.df_recon = pd.read_sql(text(query), self.engine)
-        
-        # Tagging Status
-        self.df_recon['status'] = 'MATCH'
-        self.df_recon.loc[self.df_recon['eod_card'].isnull(), 'status'] = 'MERCH_ONLY'
-        self.df_recon.loc[self.df_recon['merch_card'].isnull(), 'status'] = 'EOD_ONLY'
-        
-        print(f"✅ [RECON] Selesai! {len(self.df_recon)} transaksi dipadankan.")
-        self._export_menu()
+        return query, params
 
     def _export_menu(self):
         """Menu interaktif untuk export."""
@@ -51,22 +165,54 @@ class ReconProcessor:
             print("\n--- 📥 RECON OUTPUT MENU ---")
             print("1. Export ke Excel (.xlsx)")
             print("2. Export ke CSV (.csv)")
-            print("3. Papar di skrin (Head 50)")
-            print("4. Kembali ke menu utama")
+            print("3. Export ke Parquet (.parquet)")
+            print("4. Papar di skrin (Head 50)")
+            print("5. Kembali ke menu utama")
             
             pilihan = input(">> Pilihan: ")
             
-            if pilihan == '1':
-                self.df_recon.to_excel("result/Recon_Result.xlsx", index=False)
-                print("💾 Saved: Recon_Result.xlsx")
-                break
-            elif pilihan == '2':
-                self.df_recon.to_csv("result/Recon_Result.csv", index=False)
-                print("💾 Saved: Recon_Result.csv")
+            formats = {'1': 'xlsx', '2': 'csv', '3': 'parquet'}
+            if pilihan in formats:
+                try:
+                    print(f"💾 Saved: {self.export(formats[pilihan])}")
+                except ImportError as e:
+                    print(f"⚠️ {e}")
+                    continue
                 break
-            elif pilihan == '3':
-                print(self.df_recon.head(50))
             elif pilihan == '4':
+                print(self.df_recon.head(50))
+            elif pilihan == '5':
                 break
             else:
-                print("⚠️ Input salah.")
\ No newline at end of file
+                print("⚠️ Input salah.")
+
+
+def init_recon_schema(db_engine):
+    """Bootstrap sekali (ingest/pipeline), bukan setiap query: kolum tarikh stored + index join.
+
+    Join asal cast kedua-dua belah (::date) jadi PostgreSQL tak boleh guna index.
+    Dengan kolum generated, join dan penapis julat tarikh jadi sargable.
+    ALTER TABLE ambil ACCESS EXCLUSIVE lock (semua partition) walaupun tiada
+    perubahan, jadi katalog disemak dahulu dan DDL hanya dijalankan bila perlu.
+    Table yang belum wujud dilangkau.
+    """
+    with db_engine.begin() as conn:
+        for table, column, add_column, index, create_index in RECON_SCHEMA:
+            if conn.execute(text("SELECT to_regclass(:name)"), {'name': table}).scalar() is None:
+                continue
+            has_column = conn.execute(text("""
+                SELECT 1 FROM information_schema.columns
+                WHERE table_schema = current_schema() AND table_name = :table AND column_name = :column
+            """), {'table': table, 'column': column}).first()
+            if not has_column:
+                conn.execute(text(add_column))
+            if conn.execute(text("SELECT to_regclass(:name)"), {'name': index}).scalar() is None:
+                conn.execute(text(create_index))
+
+
+def tag_status(df):
+    """Tagging status MATCH / MERCH_ONLY / EOD_ONLY ikut belah yang kosong."""
+    df['status'] = 'MATCH'
+    df.loc[df['eod_card'].isnull(), 'status'] = 'MERCH_ONLY'
+    df.loc[df['merch_card'].isnull(), 'status'] = 'EOD_ONLY'
+    return df
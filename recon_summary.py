@@ -0,0 +1,110 @@
+import pandas as pd
+from sqlalchemy import text
+
+# Kolum kiraan dalam recon_summary (selain user_id, day, updated_at)
+SUMMARY_COLUMNS = [
+    'eod_count', 'eod_amount', 'emerchant_count', 'emerchant_amount',
+    'matched', 'partial_matches', 'discrepancies', 'unmatched_eod',
+    'unmatched_emerchant', 'pending_eod', 'pending_emerchant', 'matches_made'
+]
+
+# Kira semula baris ringkasan untuk hari yang terlibat sahaja, terus dari table asal.
+# Setiap LATERAL ialah agregat pada satu hari (index + partition pruning), jadi kos
+# ikut bilangan rekod pada hari tersebut, bukan keseluruhan sejarah.
+REFRESH_SQL = f"""
+    INSERT INTO recon_summary (user_id, day, {', '.join(SUMMARY_COLUMNS)}, updated_at)
+    SELECT :user_id, d.day,
+           e.eod_count, e.eod_amount, m.emerchant_count, m.emerchant_amount,
+           e.matched, e.partial_matches, x.discrepancies, e.unmatched_eod,
+           m.unmatched_emerchant, e.pending_eod, m.pending_emerchant, r.matches_made,
+           NOW()
+    FROM unnest(CAST(:days AS date[])) AS d(day)
+    CROSS JOIN LATERAL (
+        SELECT COUNT(*) AS eod_count,
+               COALESCE(SUM(amount_rm), 0) AS eod_amount,
+               COUNT(*) FILTER (WHERE reconciliation_status = 'MATCHED') AS matched,
+               COUNT(*) FILTER (WHERE reconciliation_status = 'PARTIAL') AS partial_matches,
+               COUNT(*) FILTER (WHERE reconciliation_status = 'UNMATCHED') AS unmatched_eod,
+               COUNT(*) FILTER (WHERE reconciliation_status = 'PENDING') AS pending_eod
+        FROM transaksi_eod
+        WHERE uploaded_by = :user_id
+          AND date_of_transaction >= d.day AND date_of_transaction < d.day + 1
+    ) e
+    CROSS JOIN LATERAL (
+        SELECT COUNT(*) AS emerchant_count,
+               COALESCE(SUM(amount), 0) AS emerchant_amount,
+               COUNT(*) FILTER (WHERE reconciliation_status = 'UNMATCHED') AS unmatched_emerchant,
+               COUNT(*) FILTER (WHERE reconciliation_status = 'PENDING') AS pending_emerchant
+        FROM transaksi_emerchant
+        WHERE uploaded_by = :user_id AND transaction_date = d.day
+    ) m
+    CROSS JOIN LATERAL (
+        SELECT COUNT(*) AS discrepancies
+        FROM transaksi_eod t
+        JOIN reconciliation_matches rm ON rm.eod_transaction_id = t.id AND rm.match_status <> 'rejected'
+        JOIN transaksi_emerchant em ON em.id = rm.emerchant_transaction_id
+        WHERE t.uploaded_by = :user_id
+          AND t.date_of_transaction >= d.day AND t.date_of_transaction < d.day + 1
+          AND t.reconciliation_status = 'PARTIAL'
+          AND em.amount <> t.amount_rm
+    ) x
+    CROSS JOIN LATERAL (
+        SELECT COUNT(*) AS matches_made
+        FROM reconciliation_matches
+        WHERE matched_by = :user_id
+          AND matched_date >= d.day AND matched_date < d.day + 1
+    ) r
+    ON CONFLICT (user_id, day) DO UPDATE SET
+        {', '.join(f'{col} = EXCLUDED.{col}' for col in SUMMARY_COLUMNS)},
+        updated_at = EXCLUDED.updated_at
+"""
+
+
+def refresh_summary(conn, user_id, days):
+    """Kira semula recon_summary untuk (user_id, hari) yang terlibat, dalam transaksi pemanggil."""
+    days = sorted({day for day in days if day is not None})
+    if user_id is None or not days:
+        return 0
+    conn.execute(text(REFRESH_SQL), {'user_id': user_id, 'days': days})
+    return len(days)
+
+
+def refresh_summary_for_dates(db_engine, user_id, dates):
+    """Versi untuk laluan ingest: hari diambil dari kolum tarikh DataFrame yang baru disimpan."""
+    days = set(pd.to_datetime(pd.Series(dates), errors='coerce').dropna().dt.date.unique())
+    if user_id is None or not days:
+        return 0
+    with db_engine.begin() as conn:
+        return refresh_summary(conn, user_id, days)
+
+
+def load_summary(conn, user_id, today):
+    """Jumlah ringkasan seorang pengguna: satu index range scan pada primary key."""
+    row = conn.execute(text(f"""
+        SELECT {', '.join(f'COALESCE(SUM({col}), 0) AS {col}' for col in SUMMARY_COLUMNS)},
+               COALESCE(SUM(matches_made) FILTER (WHERE day = :today), 0) AS today_matches
+        FROM recon_summary
+        WHERE user_id = :user_id
+    """), {'user_id': user_id, 'today': today}).mappings().one()
+    summary = {key: (float(value) if key.endswith('_amount') else int(value)) for key, value in row.items()}
+    summary['pending'] = summary['pending_eod'] + summary['pending_emerchant']
+    return summary
+
+
+def backfill_summary(conn):
+    """Isi recon_summary dari data sedia ada (sekali, bila table masih kosong)."""
+    if conn.execute(text("SELECT EXISTS (SELECT 1 FROM recon_summary)")).scalar():
+        return 0
+    keys = conn.execute(text("""
+        SELECT uploaded_by, tx_date FROM transaksi_eod WHERE uploaded_by IS NOT NULL
+        UNION
+        SELECT uploaded_by, transaction_date FROM transaksi_emerchant WHERE uploaded_by IS NOT NULL
+        UNION
+        SELECT matched_by, matched_date::date FROM reconciliation_matches WHERE matched_by IS NOT NULL
+    """)).fetchall()
+    days_by_user = {}
+    for user_id, day in keys:
+        days_by_user.setdefault(user_id, set()).add(day)
+    for user_id, days in days_by_user.items():
+        refresh_summary(conn, user_id, days)
+    return len(keys)
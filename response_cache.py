@@ -0,0 +1,155 @@
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """Cache data respons per (pengguna, endpoint) dengan TTL dan had LRU.
+
+    Backend default ialah dalam proses. Jika RESPONSE_CACHE_REDIS_URL diset,
+    Redis digunakan supaya semua worker berkongsi cache dan invalidation.
+    Entri pengguna dibuang bila upload selesai atau reconciliation dijalankan.
+    """
+
+    def __init__(self, app=None):
+        self.ttl = 30
+        self.backend = None
+        self.counters = {'hits': 0, 'misses': 0, 'invalidations': 0}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.get('RESPONSE_CACHE_TTL', 30)
+        maxsize = app.config.get('RESPONSE_CACHE_SIZE', 1024)
+        redis_url = app.config.get('RESPONSE_CACHE_REDIS_URL')
+
+        self.backend = None
+        if redis_url:
+            try:
+                self.backend = RedisBackend(redis_url)
+            except ImportError:
+                logger.warning("Pakej redis tiada; guna cache dalam proses")
+        if self.backend is None:
+            self.backend = LocalBackend(maxsize)
+        app.extensions['response_cache'] = self
+
+    def get_or_set(self, user_id, endpoint, compute):
+        """Pulangkan data dari cache, atau panggil compute() dan simpan hasilnya."""
+        key = self._key(user_id, endpoint)
+        try:
+            found, value = self.backend.get(key)
+        except Exception as e:
+            # Cache tak boleh jadi punca endpoint gagal
+            logger.warning(f"Response cache get failed: {e}")
+            found, value = False, None
+
+        self._count('hits' if found else 'misses')
+        if found:
+            return value
+
+        value = compute()
+        try:
+            self.backend.set(key, value, self.ttl)
+        except Exception as e:
+            logger.warning(f"Response cache set failed: {e}")
+        return value
+
+    def invalidate_user(self, user_id):
+        """Buang semua entri seorang pengguna (semua endpoint)."""
+        if user_id is None or self.backend is None:
+            return
+        try:
+            self.backend.delete_prefix(self._key(user_id, ''))
+            self._count('invalidations')
+        except Exception as e:
+            logger.warning(f"Response cache invalidate failed: {e}")
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        lookups = counters['hits'] + counters['misses']
+        return {
+            **counters,
+            **self.backend.stats(),
+            'hit_ratio': round(counters['hits'] / lookups, 3) if lookups else None,
+            'ttl_seconds': self.ttl
+        }
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    @staticmethod
+    def _key(user_id, endpoint):
+        return f"{user_id}:{endpoint}"
+
+
+class LocalBackend:
+    """LRU dalam proses dengan masa tamat per entri."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self.entries[key]
+                return False, None
+            self.entries.move_to_end(key)
+            return True, value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [key for key in self.entries if key.startswith(prefix)]:
+                del self.entries[key]
+
+    def stats(self):
+        return {'backend': 'local', 'size': len(self.entries), 'maxsize': self.maxsize,
+                'evictions': self.evictions}
+
+
+class RedisBackend:
+    """Backend kongsi (Redis); TTL dan eviction diurus oleh Redis (maxmemory-policy)."""
+
+    PREFIX = 'recon:response:'
+
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        raw = self.client.get(self.PREFIX + key)
+        if raw is None:
+            return False, None
+        return True, pickle.loads(raw)
+
+    def set(self, key, value, ttl):
+        self.client.setex(self.PREFIX + key, ttl, pickle.dumps(value))
+
+    def delete_prefix(self, prefix):
+        keys = list(self.client.scan_iter(match=f"{self.PREFIX}{prefix}*", count=500))
+        if keys:
+            self.client.delete(*keys)
+
+    def stats(self):
+        return {'backend': 'redis'}
@@ -0,0 +1,66 @@
+import logging
+
+from sqlalchemy import func, text
+
+logger = logging.getLogger(__name__)
+
+TRIGRAM_INDEXES = """
+    CREATE INDEX IF NOT EXISTS idx_eod_terminal_trgm ON transaksi_eod USING gin (terminal_name gin_trgm_ops);
+    CREATE INDEX IF NOT EXISTS idx_emerchant_merchant_trgm ON transaksi_emerchant USING gin (merchant_code gin_trgm_ops);
+"""
+
+# Mod prefix: carian pada nilai yang dinormalkan (lower), B-tree text_pattern_ops
+PREFIX_INDEXES = """
+    CREATE INDEX IF NOT EXISTS idx_eod_terminal_prefix
+        ON transaksi_eod (uploaded_by, lower(terminal_name) text_pattern_ops);
+    CREATE INDEX IF NOT EXISTS idx_emerchant_merchant_prefix
+        ON transaksi_emerchant (uploaded_by, lower(merchant_code) text_pattern_ops);
+"""
+
+# 'contains' = ILIKE '%term%' (GIN trigram); 'prefix' = lower(kolum) LIKE 'term%' (B-tree)
+SEARCH_MODES = ('contains', 'prefix')
+
+
+def setup_search_indexes(db_engine):
+    """Cipta index carian; pulangkan True jika pg_trgm tersedia.
+
+    Index prefix sentiasa dicipta. CREATE EXTENSION perlukan hak superuser/owner;
+    jika gagal, carian default jadi mod prefix (lihat search_mode).
+    """
+    with db_engine.begin() as conn:
+        conn.execute(text(PREFIX_INDEXES))
+
+    try:
+        with db_engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            conn.execute(text(TRIGRAM_INDEXES))
+        return True
+    except Exception as e:
+        logger.warning(f"pg_trgm tidak tersedia, carian default guna mod prefix: {e}")
+        return False
+
+
+def escape_like(term):
+    """Escape wildcard LIKE (\\, %, _) dalam input pengguna; guna dengan ESCAPE '\\'."""
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def search_mode(requested, trigram=True):
+    """Mod carian: yang diminta jika sah, selain itu 'contains' (dengan pg_trgm) atau 'prefix'."""
+    if requested in SEARCH_MODES:
+        return requested
+    return 'contains' if trigram else 'prefix'
+
+
+def contains_filter(column, term, mode='contains'):
+    """Penapis carian teks; wildcard dalam input pengguna di-escape.
+
+    'contains': ILIKE '%term%' (GIN trigram bila term >= 3 aksara; term lebih
+    pendek tetap substring, tanpa index).
+    'prefix': lower(kolum) LIKE 'term%' (B-tree text_pattern_ops). Semantik
+    berbeza dari substring, jadi pemanggil perlu maklumkan pengguna.
+    """
+    escaped = escape_like(term.strip())
+    if mode == 'prefix':
+        return func.lower(column).like(f'{escaped.lower()}%', escape='\\')
+    return column.ilike(f'%{escaped}%', escape='\\')
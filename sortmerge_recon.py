@@ -0,0 +1,233 @@
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from recon_processor import tag_status
+
+# Susunan kolum sama dengan ReconProcessor.df_recon
+RECON_COLUMNS = [
+    'eod_date', 'merch_date', 'eod_card', 'eod_receipt', 'eod_auth',
+    'merch_auth', 'eod_amount', 'merch_amount', 'merch_card', 'status'
+]
+
+
+# Had bilangan pasangan calon yang dibina serentak dalam window join
+WINDOW_MAX_PAIRS = 2000000
+
+
+class SortMergeRecon:
+    """Reconciliation EOD vs merchant dalam memori (NumPy sort-merge) untuk run offline.
+
+    Alternatif kepada ReconProcessor untuk what-if dan backtest: setiap belah
+    dibaca sekali sebagai array kolum, kemudian run() boleh diulang tanpa
+    menyentuh PostgreSQL. Kunci join sama dengan SQL: (hari, auth code, amaun
+    dalam sen). Output df_recon sama bentuk dan kandungan dengan ReconProcessor.
+
+    Dengan time_tolerance / amount_tolerance / fee_pct, hari dan amaun tak
+    perlu sama tepat: auth code mesti sama, masa dalam ±time_tolerance dan
+    beza amaun dalam max(amount_tolerance, fee_pct% amaun EOD).
+
+    Window masa dalam saat hanya digunakan bila time_tolerance diberi dan
+    tran_date merchant ada masa sebenar. tran_date yang tarikh sahaja (tengah
+    malam) dibandingkan ikut hari, dengan toleransi hari penuh dari
+    time_tolerance (kurang dari sehari = hari yang sama).
+    """
+
+    def __init__(self, db_engine, start_date=None, end_date=None,
+                 time_tolerance=None, amount_tolerance=0.0, fee_pct=0.0):
+        self.engine = db_engine
+        self.start_date = start_date
+        self.end_date = end_date
+        self.time_tolerance = time_tolerance
+        self.amount_tolerance = amount_tolerance
+        self.fee_pct = fee_pct
+        self.eod = None
+        self.merchant = None
+        self.df_recon = None
+
+    def load(self):
+        """Baca kolum yang perlu sahaja dari kedua-dua table (julat tarikh ditapis di server)."""
+        eod_where, params = self._date_filter('date_of_transaction', timestamp=True)
+        merch_where, _ = self._date_filter('tran_day')
+        self.eod = pd.read_sql(text(f"""
+            SELECT date_of_transaction, card_number, receipt, approval_code, amount_rm
+            FROM transaksi_eod {eod_where}
+        """), self.engine, params=params)
+        self.merchant = pd.read_sql(text(f"""
+            SELECT tran_date, card_number, auth_code, amount
+            FROM transaksi_merchant {merch_where}
+        """), self.engine, params=params)
+        return self
+
+    def run(self):
+        """Sort-merge kedua-dua belah dan pulangkan df_recon (baris tanpa pasangan sahaja)."""
+        if self.eod is None or self.merchant is None:
+            self.load()
+
+        eod, merchant = self.eod, self.merchant
+        # Auth code di-factorize bersama supaya kod integer sama di kedua-dua belah
+        auth_codes, _ = pd.factorize(pd.concat([eod['approval_code'], merchant['auth_code']], ignore_index=True))
+        if self.has_tolerance:
+            seconds = int(self.time_tolerance.total_seconds()) if self.time_tolerance else 0
+            if seconds and has_time_of_day(merchant['tran_date']):
+                unit, window = 's', seconds
+            else:
+                unit, window = 'D', seconds // 86400
+            eod_keys = recon_keys(eod['date_of_transaction'], auth_codes[:len(eod)], eod['amount_rm'], unit=unit)
+            merch_keys = recon_keys(merchant['tran_date'], auth_codes[len(eod):], merchant['amount'], unit=unit)
+            eod_only, merch_only = window_unmatched_masks(
+                eod_keys, merch_keys, window,
+                int(round(self.amount_tolerance * 100)),
+                self.fee_pct
+            )
+        else:
+            eod_keys = recon_keys(eod['date_of_transaction'], auth_codes[:len(eod)], eod['amount_rm'])
+            merch_keys = recon_keys(merchant['tran_date'], auth_codes[len(eod):], merchant['amount'])
+            eod_only, merch_only = unmatched_masks(eod_keys, merch_keys)
+
+        eod_rows = eod[eod_only]
+        merch_rows = merchant[merch_only]
+        df = pd.concat([
+            pd.DataFrame({
+                'eod_date': eod_rows['date_of_transaction'],
+                'eod_card': eod_rows['card_number'],
+                'eod_receipt': eod_rows['receipt'],
+                'eod_auth': eod_rows['approval_code'],
+                'eod_amount': eod_rows['amount_rm'],
+            }),
+            pd.DataFrame({
+                'merch_date': merch_rows['tran_date'],
+                'merch_auth': merch_rows['auth_code'],
+                'merch_amount': merch_rows['amount'],
+                'merch_card': merch_rows['card_number'],
+            }),
+        ], ignore_index=True).reindex(columns=RECON_COLUMNS)
+
+        self.df_recon = tag_status(df)
+        return self.df_recon
+
+    @property
+    def has_tolerance(self):
+        return bool(self.time_tolerance) or self.amount_tolerance > 0 or self.fee_pct > 0
+
+    def _date_filter(self, column, timestamp=False):
+        params = {}
+        where = []
+        if self.start_date:
+            params['start_date'] = self.start_date
+            where.append(f"{column} >= :start_date")
+        if self.end_date:
+            params['end_date'] = self.end_date
+            # Kolum timestamp: julat separuh terbuka supaya hari terakhir penuh dan partition boleh di-prune
+            where.append(f"{column} < CAST(:end_date AS date) + 1" if timestamp else f"{column} <= :end_date")
+        return (f"WHERE {' AND '.join(where)}" if where else ""), params
+
+
+def has_time_of_day(timestamps):
+    """True jika ada nilai yang bukan tepat tengah malam (kolum ada masa, bukan tarikh sahaja)."""
+    ts = pd.to_datetime(timestamps).dropna()
+    return bool(len(ts)) and bool((ts != ts.dt.normalize()).any())
+
+
+def recon_keys(timestamps, auth_codes, amounts, unit='D'):
+    """Kunci join sebagai array int64: (masa sejak epoch, kod auth, sen) dan mask sah.
+
+    unit: 'D' (hari, untuk join tepat) atau 's' (saat, untuk window join).
+    Baris dengan mana-mana kunci NULL tak akan padan (sama seperti '=' dalam SQL).
+    """
+    # Input boleh Series atau ndarray: to_datetime/to_numeric pulangkan jenis berbeza untuk ndarray
+    ts = np.asarray(pd.to_datetime(timestamps), dtype='datetime64[ns]')
+    days = ts.astype(f'datetime64[{unit}]').astype(np.int64)
+    amount = np.asarray(pd.to_numeric(amounts, errors='coerce'), dtype=float)
+    valid = ~np.isnat(ts) & (np.asarray(auth_codes) >= 0) & ~np.isnan(amount)
+    cents = np.where(valid, np.rint(np.nan_to_num(amount) * 100), 0).astype(np.int64)
+    return days, np.asarray(auth_codes, dtype=np.int64), cents, valid
+
+
+def unmatched_masks(left, right):
+    """Mask baris kiri/kanan yang tiada pasangan berkunci sama di belah lain.
+
+    Kedua-dua belah disusun bersama sekali (lexsort), kemudian setiap kumpulan
+    kunci yang sama dikira berapa baris dari setiap belah. Sama semantik dengan
+    FULL OUTER JOIN ... WHERE salah satu belah NULL.
+    """
+    n_left = len(left[0])
+    day, auth, cents, valid = (np.concatenate([l, r]) for l, r in zip(left, right))
+    is_right = np.arange(len(day)) >= n_left
+
+    idx = np.flatnonzero(valid)
+    order = idx[np.lexsort((cents[idx], auth[idx], day[idx]))]
+    matched = np.zeros(len(day), dtype=bool)
+    if len(order):
+        d, a, c = day[order], auth[order], cents[order]
+        boundary = np.empty(len(order), dtype=bool)
+        boundary[0] = True
+        boundary[1:] = (d[1:] != d[:-1]) | (a[1:] != a[:-1]) | (c[1:] != c[:-1])
+        group = np.cumsum(boundary) - 1
+
+        side = is_right[order]
+        has_right = np.bincount(group, weights=side) > 0
+        has_left = np.bincount(group, weights=~side) > 0
+        matched[order] = np.where(side, has_left[group], has_right[group])
+
+    return ~matched[:n_left], ~matched[n_left:]
+
+
+def window_unmatched_masks(left, right, time_tolerance, amount_tolerance, fee_pct=0.0,
+                           max_pairs=WINDOW_MAX_PAIRS):
+    """Seperti unmatched_masks, tapi masa dan amaun padan dalam toleransi.
+
+    left/right: output recon_keys (unit yang sama). time_tolerance dalam unit
+    kunci (saat untuk unit='s', hari untuk unit='D'), amount_tolerance dalam
+    sen, fee_pct dalam peratus amaun belah kiri.
+
+    Belah kanan disusun sekali ikut (auth code, masa). Untuk setiap baris kiri,
+    searchsorted beri julat window [masa - toleransi, masa + toleransi] dalam
+    auth code yang sama; hanya pasangan dalam window dibina dan disemak
+    amaunnya. Tiada nested loop atau cross join; pasangan dibina secara chunk
+    (max_pairs) supaya auth code yang sangat kerap tak meletupkan memori.
+    """
+    l_time, l_auth, l_cents, l_valid = left
+    r_time, r_auth, r_cents, r_valid = right
+    matched_left = np.zeros(len(l_time), dtype=bool)
+    matched_right = np.zeros(len(r_time), dtype=bool)
+
+    l_idx = np.flatnonzero(l_valid)
+    r_idx = np.flatnonzero(r_valid)
+    if not len(l_idx) or not len(r_idx):
+        return ~matched_left, ~matched_right
+
+    # Kunci komposit satu int64: auth * span + masa; span > julat masa + 2 x toleransi
+    # jadi window tak pernah melintasi sempadan auth code
+    t_min = min(l_time[l_idx].min(), r_time[r_idx].min())
+    span = max(l_time[l_idx].max(), r_time[r_idx].max()) - t_min + 2 * time_tolerance + 1
+    l_key = l_auth[l_idx] * span + (l_time[l_idx] - t_min)
+    r_key = r_auth[r_idx] * span + (r_time[r_idx] - t_min)
+
+    r_order = np.argsort(r_key, kind='stable')
+    r_sorted = r_key[r_order]
+    lo = np.searchsorted(r_sorted, l_key - time_tolerance, side='left')
+    hi = np.searchsorted(r_sorted, l_key + time_tolerance, side='right')
+    counts = hi - lo
+
+    l_tolerance = np.maximum(amount_tolerance, np.rint(np.abs(l_cents[l_idx]) * fee_pct / 100)).astype(np.int64)
+    bounds = np.cumsum(counts)
+    start = 0
+    while start < len(l_idx):
+        # Potong belah kiri supaya setiap chunk bina paling banyak ~max_pairs pasangan
+        offset = bounds[start - 1] if start else 0
+        stop = max(int(np.searchsorted(bounds, offset + max_pairs, side='right')), start + 1)
+        chunk_counts = counts[start:stop]
+        total = int(chunk_counts.sum())
+        if total:
+            pair_left = np.repeat(np.arange(start, stop), chunk_counts)
+            first = np.cumsum(chunk_counts) - chunk_counts
+            pair_pos = np.arange(total) - np.repeat(first, chunk_counts) + np.repeat(lo[start:stop], chunk_counts)
+            pair_right = r_order[pair_pos]
+
+            ok = np.abs(l_cents[l_idx[pair_left]] - r_cents[r_idx[pair_right]]) <= l_tolerance[pair_left]
+            matched_left[l_idx[pair_left[ok]]] = True
+            matched_right[r_idx[pair_right[ok]]] = True
+        start = stop
+
+    return ~matched_left, ~matched_right
@@ -0,0 +1,181 @@
+import csv
+import io
+import os
+import uuid
+from itertools import islice
+
+import pandas as pd
+
+# Fail .xls (format lama) tak boleh dibaca secara streaming oleh openpyxl
+STREAMABLE_EXCEL = ('.xlsx',)
+
+
+def spool_upload(file_storage, upload_folder, filename):
+    """Simpan upload ke disk (Werkzeug salin secara chunk) dan pulangkan path-nya."""
+    os.makedirs(upload_folder, exist_ok=True)
+    path = os.path.join(upload_folder, f"{uuid.uuid4().hex}_{filename}")
+    file_storage.save(path)
+    return path
+
+
+def find_header_row(rows, marker, occurrence=1):
+    """Index baris ke-`occurrence` yang mengandungi marker (case-insensitive).
+
+    rows boleh jadi baris teks mentah atau list nilai; berhenti sebaik jumpa.
+    """
+    return _nth_match(rows, marker, occurrence)[0]
+
+
+def locate_header(source, marker, occurrence=1, max_rows=None, filename=None):
+    """Cari baris header terus dari baris awal fail, tanpa bina DataFrame untuk preamble.
+
+    source: path fail atau kandungan bytes (perlu filename untuk tentukan jenis).
+    Pulangkan (index baris, nilai header) atau (None, None) jika tak jumpa.
+    """
+    name = (filename or source).lower()
+
+    if name.endswith('.csv'):
+        with _open_text(source) as f:
+            lines = islice(f, max_rows) if max_rows else f
+            idx, line = _nth_match(lines, marker, occurrence)
+        if idx is None:
+            return None, None
+        return idx, next(csv.reader([line]))
+
+    if name.endswith(STREAMABLE_EXCEL):
+        from openpyxl import load_workbook
+        workbook = load_workbook(_open_binary(source), read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(max_row=max_rows, values_only=True)
+            idx, row = _nth_match(rows, marker, occurrence)
+        finally:
+            workbook.close()
+        return (idx, list(row)) if idx is not None else (None, None)
+
+    df = pd.read_excel(_open_binary(source), header=None, nrows=max_rows, dtype=str)
+    idx = find_header_row(df.values, marker, occurrence)
+    return (idx, df.iloc[idx].tolist()) if idx is not None else (None, None)
+
+
+def _nth_match(rows, marker, occurrence):
+    marker = marker.lower()
+    seen = 0
+    for i, row in enumerate(rows):
+        row_text = row if isinstance(row, str) else ' '.join(str(x) for x in row)
+        if marker in row_text.lower():
+            seen += 1
+            if seen == occurrence:
+                return i, row
+    return None, None
+
+
+def _open_text(source):
+    if isinstance(source, bytes):
+        return io.TextIOWrapper(io.BytesIO(source), encoding='utf-8', errors='replace', newline='')
+    return open(source, encoding='utf-8', errors='replace', newline='')
+
+
+def _open_binary(source):
+    return io.BytesIO(source) if isinstance(source, bytes) else source
+
+
+def iter_frames(path, chunksize, skiprows=0, has_header=False, n_columns=None):
+    """Yield DataFrame chunk dari fail CSV/XLSX di disk tanpa load keseluruhan fail.
+
+    has_header: baris pertama selepas skiprows dijadikan nama kolum.
+    n_columns: paksa lebar frame (untuk fail yang ada preamble tak sekata).
+    """
+    lower = path.lower()
+    if lower.endswith('.csv'):
+        yield from _iter_csv(path, chunksize, skiprows, has_header, n_columns)
+    elif lower.endswith(STREAMABLE_EXCEL):
+        yield from _iter_xlsx(path, chunksize, skiprows, has_header, n_columns)
+    else:
+        # .xls: fallback baca penuh, tapi tetap dipecah ikut chunksize
+        df = pd.read_excel(path, header=0 if has_header else None, skiprows=skiprows)
+        if n_columns is not None:
+            df = fit_width(df, n_columns)
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize].reset_index(drop=True)
+
+
+def _iter_csv(path, chunksize, skiprows, has_header, n_columns):
+    options = {
+        'skiprows': skiprows,
+        'chunksize': chunksize,
+        'dtype': str,
+        'encoding': 'utf-8',
+        'encoding_errors': 'replace',
+    }
+    if has_header:
+        options['header'] = 0
+    else:
+        options['header'] = None
+        if n_columns is not None:
+            # index_col=False: baris yang lebih lebar dipotong, bukan dijadikan index
+            options['names'] = list(range(n_columns))
+            options['index_col'] = False
+
+    with pd.read_csv(path, **options) as reader:
+        for chunk in reader:
+            yield chunk.reset_index(drop=True)
+
+
+def _iter_xlsx(path, chunksize, skiprows, has_header, n_columns):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(min_row=skiprows + 1, values_only=True)
+        columns = None
+        if has_header:
+            header = next(rows, None)
+            if header is None:
+                return
+            columns = [str(col) if col is not None else f'unnamed_{i}' for i, col in enumerate(header)]
+
+        while True:
+            block = [list(row) for row in islice(rows, chunksize)]
+            if not block:
+                break
+            df = pd.DataFrame(block)
+            if columns is not None:
+                df = fit_width(df, len(columns))
+                df.columns = columns
+            elif n_columns is not None:
+                df = fit_width(df, n_columns)
+            yield df
+    finally:
+        workbook.close()
+
+
+def fit_width(df, n_columns):
+    """Potong atau pad kolum supaya lebar frame tepat n_columns."""
+    if df.shape[1] > n_columns:
+        df = df.iloc[:, :n_columns]
+    elif df.shape[1] < n_columns:
+        for i in range(df.shape[1], n_columns):
+            df[i] = None
+    df.columns = list(range(n_columns))
+    return df
+
+
+def estimate_row_count(path):
+    """Anggaran bilangan baris (untuk ETA). CSV: kira newline; XLSX: dimensi sheet."""
+    lower = path.lower()
+    if lower.endswith('.csv'):
+        count = 0
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                count += block.count(b'\n')
+        return count
+
+    if lower.endswith(STREAMABLE_EXCEL):
+        from openpyxl import load_workbook
+        workbook = load_workbook(path, read_only=True)
+        try:
+            return workbook.worksheets[0].max_row
+        finally:
+            workbook.close()
+
+    return None